@@ -0,0 +1,139 @@
+import argparse
+import hashlib
+import json
+import sys
+import time
+from collections.abc import Callable
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "src"))
+
+from gateway.admission import estimate_prompt_tokens, requested_tokens  # noqa: E402
+from gateway.body import read_body  # noqa: E402
+from gateway.cache import is_cacheable  # noqa: E402
+from gateway.routing import render_prefix  # noqa: E402
+
+PATH = "/v1/chat/completions"
+VERSION = "google/gemma-3-1b-it"
+PREFIX_CHARS = 256
+MAX_MODEL_LEN = 2048
+
+
+def _load_prompts(path: Path) -> list[str]:
+    prompts = []
+    with path.open("r", encoding="utf-8") as handle:
+        for line in handle:
+            line = line.strip()
+            if line:
+                prompts.append(json.loads(line)["prompt"])
+    return prompts
+
+
+def _conversation(prompts: list[str], turns: int, reply_chars: int) -> bytes:
+    """Multi-turn chat body built by cycling the workload prompts."""
+    messages: list[dict[str, str]] = [
+        {"role": "system", "content": "You are a concise, helpful assistant."}
+    ]
+    for i in range(turns):
+        messages.append({"role": "user", "content": prompts[i % len(prompts)]})
+        if i < turns - 1:
+            reply = (f"Answer {i}: " + "lorem ipsum dolor sit amet ") * reply_chars
+            messages.append({"role": "assistant", "content": reply[:reply_chars]})
+    payload = {
+        "model": "base",
+        "messages": messages,
+        "temperature": 0,
+        "max_tokens": 128,
+        "stream": True,
+    }
+    return json.dumps(payload).encode("utf-8")
+
+
+def _naive(raw: bytes) -> bytes:
+    """What the gateway did per request before the fast path (stdlib, full parse)."""
+    payload = json.loads(raw)
+    if is_cacheable(payload):
+        canonical = {
+            k: v for k, v in payload.items() if k not in ("stream", "stream_options", "user")
+        }
+        blob = json.dumps([PATH, VERSION, canonical], sort_keys=True, separators=(",", ":"))
+        hashlib.blake2b(blob.encode("utf-8"), digest_size=16).hexdigest()
+    render_prefix(payload, PREFIX_CHARS)
+    requested_tokens(payload, estimate_prompt_tokens(payload), MAX_MODEL_LEN)
+    payload = {**payload, "model": VERSION}
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+def _fast(raw: bytes, model: str = VERSION) -> bytes:
+    """The gateway's current path: orjson decode, original bytes forwarded."""
+    payload = read_body(raw)
+    if is_cacheable(payload):
+        payload.cache_key(PATH, VERSION)
+    payload.prefix(PREFIX_CHARS)
+    requested_tokens(payload, payload.prompt_tokens(), MAX_MODEL_LEN)
+    if payload.get("model") != model:
+        payload = payload.with_field("model", model)
+    return payload.raw
+
+
+def _cpu_us(handle: Callable[[bytes], bytes], raw: bytes, iterations: int) -> float:
+    for _ in range(min(iterations, 50)):
+        handle(raw)
+    start = time.process_time()
+    for _ in range(iterations):
+        handle(raw)
+    return (time.process_time() - start) / iterations * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="CPU per request of gateway request-body handling, before and after."
+    )
+    parser.add_argument(
+        "--prompts", default=str(REPO_ROOT / "loadtest" / "workloads" / "prompts_long.jsonl")
+    )
+    parser.add_argument("--turns", default="1,8,32,128", help="Comma-separated history lengths")
+    parser.add_argument("--reply-chars", type=int, default=600)
+    parser.add_argument("--budget-s", type=float, default=1.0, help="CPU time per measurement")
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    prompts = _load_prompts(Path(args.prompts))
+    variants: dict[str, Callable[[bytes], bytes]] = {
+        "naive": _naive,
+        "fast_path": _fast,
+        # Model name already what the backend serves: bytes go through as received.
+        "fast_passthrough": lambda raw: _fast(raw, model="base"),
+    }
+    rows: list[dict[str, Any]] = []
+    for turns in (int(t) for t in args.turns.split(",")):
+        raw = _conversation(prompts, turns, args.reply_chars)
+        # Both paths must send the backend the same request.
+        expected = json.loads(_naive(raw))
+        if json.loads(_fast(raw)) != expected:
+            raise RuntimeError("fast path produced a different upstream body")
+        probe_us = _cpu_us(_naive, raw, 20)
+        iterations = max(20, int(args.budget_s * 1e6 / max(probe_us, 1.0)))
+        row: dict[str, Any] = {"turns": turns, "body_bytes": len(raw)}
+        for name, handle in variants.items():
+            row[f"{name}_us"] = _cpu_us(handle, raw, iterations)
+        row["speedup"] = row["naive_us"] / row["fast_path_us"]
+        rows.append(row)
+        print(
+            f"turns={turns:<4} bytes={len(raw):<8} naive={row['naive_us']:.1f}us "
+            f"fast_path={row['fast_path_us']:.1f}us "
+            f"fast_passthrough={row['fast_passthrough_us']:.1f}us speedup={row['speedup']:.1f}x"
+        )
+
+    if args.out:
+        out_path = Path(args.out)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        summary = {"rows": rows, "timestamp": datetime.now(timezone.utc).isoformat()}
+        out_path.write_text(json.dumps(summary, ensure_ascii=True, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""Compare bench/perf.py result files: the first is the baseline, each other is a candidate.
+
+Percentile deltas get bootstrap confidence intervals. Resampling ``n``
+requests from a run and taking the ``k``-th smallest is the same as reading
+the run's distribution at a quantile drawn from ``Beta(k, n + 1 - k)``, so
+each resample costs one histogram lookup instead of ``n`` draws.
+
+Rates (requests/s, tokens/s) are a single number per run, so their intervals
+model where the run's noise comes from. A closed-loop run sends a fixed number
+of requests and its rate follows the mean latency, which is resampled. An
+open-loop run's rate follows the Poisson count of arrivals.
+
+A metric regresses when the whole interval of its relative delta is worse
+than the threshold: the candidate is worse by more than the threshold with the
+chosen confidence. The intervals only cover sampling noise within each run,
+and reruns on the same setup also drift by a few percent; the threshold is what
+absorbs that. Percentile deltas within twice the histograms' relative error
+are below their resolution and never count. Any regression makes the exit
+code 1.
+
+Deltas only mean something between runs of the same load: closed or open loop,
+streaming, concurrency or arrival profile, duration and workload. When those
+differ, the candidate gets no verdict and the exit code is 2, unless ``--force``
+is given; then the differences are printed as a warning. Model and URL are
+expected to differ (base against FT) and are not checked.
+"""
+
+import argparse
+import json
+import math
+import random
+import sys
+from pathlib import Path
+from typing import Any
+
+from hdr import LogHistogram
+
+DISTRIBUTIONS = ("latency_ms", "ttft_ms", "tpot_ms", "itl_ms")
+RATES = ("throughput_rps", "output_tokens_per_s")
+PERCENTILES = (50, 95, 99)
+# Summary fields of bench/perf.py that describe the load rather than the result.
+SETUP = (
+    "mode",
+    "stream",
+    "concurrency",
+    "arrival",
+    "profile",
+    "duration_s",
+    "warmup_s",
+    "workload",
+)
+
+
+def setup_differences(base: dict[str, Any], candidate: dict[str, Any]) -> list[str]:
+    """The load settings two runs disagree on, as ``"name: base != candidate"``."""
+    differences = []
+    for key in SETUP:
+        # Files from before open-loop runs have no mode; they were all closed loop.
+        default = "closed" if key == "mode" else None
+        b, c = base.get(key, default), candidate.get(key, default)
+        if b != c:
+            differences.append(f"{key}: {b!r} != {c!r}")
+    return differences
+
+
+def _histograms(run: dict[str, Any]) -> dict[str, LogHistogram]:
+    if "histograms" in run:
+        return {name: LogHistogram.from_dict(data) for name, data in run["histograms"].items()}
+    # Files written before histograms were stored carry the raw lists instead.
+    hists = {}
+    for name, key in (
+        ("latency_ms", "latencies_ms"),
+        ("ttft_ms", "ttft_ms"),
+        ("tpot_ms", "tpot_ms"),
+    ):
+        if isinstance(run.get(key), list) and run[key]:
+            hists[name] = LogHistogram()
+            for value in run[key]:
+                hists[name].record(value)
+    return hists
+
+
+def _resample_percentile(hist: LogHistogram, pct: float, rng: random.Random) -> float:
+    n = hist.count
+    k = max(1, math.ceil(pct / 100.0 * n))
+    return hist.percentile(100.0 * rng.betavariate(k, n + 1 - k))
+
+
+def _rate_noise(run: dict[str, Any], hists: dict[str, LogHistogram]) -> float:
+    """Relative standard error of a run's request rate."""
+    count = run.get("success_count") or 0
+    if count < 1:
+        return 0.0
+    latency = hists.get("latency_ms")
+    if run.get("mode", "closed") == "closed" and latency is not None and latency.mean:
+        # Fixed request count: elapsed time, and so the rate, moves with the mean latency.
+        return latency.stddev / latency.mean / math.sqrt(count)
+    return 1.0 / math.sqrt(count)
+
+
+def _interval(deltas: list[float], confidence: float) -> tuple[float, float]:
+    deltas = sorted(deltas)
+    tail = (1 - confidence) / 2
+    low = deltas[int(tail * (len(deltas) - 1))]
+    high = deltas[math.ceil((1 - tail) * (len(deltas) - 1))]
+    return low, high
+
+
+def _relative(candidate: float, base: float) -> float:
+    return (candidate - base) / base if base else 0.0
+
+
+def compare(
+    base: dict[str, Any],
+    candidate: dict[str, Any],
+    resamples: int,
+    confidence: float,
+    latency_threshold: float,
+    throughput_threshold: float,
+    rng: random.Random,
+) -> list[dict[str, Any]]:
+    rows = []
+    base_hists, cand_hists = _histograms(base), _histograms(candidate)
+    for name in DISTRIBUTIONS:
+        if name not in base_hists or name not in cand_hists:
+            continue
+        b, c = base_hists[name], cand_hists[name]
+        for pct in PERCENTILES:
+            deltas = [
+                _relative(_resample_percentile(c, pct, rng), _resample_percentile(b, pct, rng))
+                for _ in range(resamples)
+            ]
+            rows.append(
+                _row(
+                    f"{name}_p{pct}",
+                    b.percentile(pct),
+                    c.percentile(pct),
+                    _interval(deltas, confidence),
+                    # Higher latency is worse.
+                    worse=1.0,
+                    threshold=latency_threshold,
+                    resolution=2 * max(b.relative_error, c.relative_error),
+                )
+            )
+    b_noise = _rate_noise(base, base_hists)
+    c_noise = _rate_noise(candidate, cand_hists)
+    for name in RATES:
+        if not base.get(name) or not candidate.get(name):
+            continue
+        deltas = []
+        for _ in range(resamples):
+            # Normal approximations; the runs have at least tens of requests.
+            b_scale = max(1e-9, rng.gauss(1.0, b_noise))
+            c_scale = max(1e-9, rng.gauss(1.0, c_noise))
+            deltas.append(_relative(candidate[name] * c_scale, base[name] * b_scale))
+        rows.append(
+            _row(
+                name,
+                base[name],
+                candidate[name],
+                _interval(deltas, confidence),
+                # Lower throughput is worse.
+                worse=-1.0,
+                threshold=throughput_threshold,
+            )
+        )
+    return rows
+
+
+def _row(
+    metric: str,
+    base: float,
+    candidate: float,
+    interval: tuple[float, float],
+    worse: float,
+    threshold: float,
+    resolution: float = 0.0,
+) -> dict[str, Any]:
+    delta = _relative(candidate, base)
+    low, high = interval
+    significant = low > resolution or high < -resolution
+    # The interval as "how much worse": both ends must clear the threshold.
+    worst, best = sorted((low * worse, high * worse), reverse=True)
+    return {
+        "metric": metric,
+        "base": base,
+        "candidate": candidate,
+        "delta": delta,
+        "ci_low": low,
+        "ci_high": high,
+        "significant": significant,
+        "regression": significant and best > threshold,
+        "improvement": significant and -worst > threshold,
+    }
+
+
+def _load(path: Path) -> dict[str, Any]:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _print_table(base_name: str, name: str, rows: list[dict[str, Any]], confidence: float) -> None:
+    print(f"{base_name} -> {name}")
+    ci = f"{confidence:.0%} CI"
+    print(f"  {'metric':<22}{'base':>10}{'candidate':>11}{'delta':>10}  {ci:<21}")
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else "better" if row["improvement"] else ""
+        if not flag and not row["significant"]:
+            flag = "~"
+        interval = f"[{row['ci_low']:+.1%}, {row['ci_high']:+.1%}]"
+        print(
+            f"  {row['metric']:<22}{row['base']:>10.1f}{row['candidate']:>11.1f}"
+            f"{row['delta']:>+10.1%}  {interval:<21}{flag}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare perf result files against the first one, with bootstrap CIs."
+    )
+    parser.add_argument("files", nargs="+", help="Baseline first, then one or more candidates")
+    parser.add_argument("--resamples", type=int, default=2000)
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument(
+        "--latency-threshold",
+        type=float,
+        default=0.05,
+        help="Relative latency increase that counts as a regression",
+    )
+    parser.add_argument(
+        "--throughput-threshold",
+        type=float,
+        default=0.05,
+        help="Relative throughput decrease that counts as a regression",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Compare runs with different load settings anyway",
+    )
+    parser.add_argument("--out", default=None, help="Also write the comparison as JSON")
+    args = parser.parse_args()
+    if len(args.files) < 2:
+        parser.error("need a baseline and at least one candidate")
+
+    rng = random.Random(args.seed)
+    paths = [Path(f) for f in args.files]
+    base = _load(paths[0])
+    comparisons = {}
+    regressed = mismatched = False
+    for path in paths[1:]:
+        candidate = _load(path)
+        differences = setup_differences(base, candidate)
+        if differences:
+            detail = "; ".join(differences)
+            if not args.force:
+                print(
+                    f"{paths[0].name} -> {path.name}: not comparable ({detail}); "
+                    "pass --force to compare anyway",
+                    file=sys.stderr,
+                )
+                comparisons[path.name] = {"not_comparable": differences}
+                mismatched = True
+                continue
+            print(f"warning: {paths[0].name} -> {path.name}: {detail}", file=sys.stderr)
+        rows = compare(
+            base,
+            candidate,
+            args.resamples,
+            args.confidence,
+            args.latency_threshold,
+            args.throughput_threshold,
+            rng,
+        )
+        _print_table(paths[0].name, path.name, rows, args.confidence)
+        comparisons[path.name] = rows
+        regressed = regressed or any(row["regression"] for row in rows)
+
+    if args.out:
+        out_path = Path(args.out)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        summary = {
+            "baseline": paths[0].name,
+            "confidence": args.confidence,
+            "latency_threshold": args.latency_threshold,
+            "throughput_threshold": args.throughput_threshold,
+            "comparisons": comparisons,
+        }
+        out_path.write_text(json.dumps(summary, ensure_ascii=True, indent=2) + "\n")
+    sys.exit(2 if mismatched else 1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = (len(values) - 1) * (pct / 100.0)
+    f = int(k)
+    c = min(f + 1, len(values) - 1)
+    if f == c:
+        return values[f]
+    d = k - f
+    return values[f] + (values[c] - values[f]) * d
+
+
+def _spawn(cmd: list[str], env: dict[str, str] | None = None) -> subprocess.Popen:
+    return subprocess.Popen(
+        cmd,
+        cwd=REPO_ROOT,
+        env={**os.environ, **(env or {})},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def _wait_ready(url: str, timeout_seconds: float = 30.0) -> None:
+    deadline = time.time() + timeout_seconds
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server not ready at {url} after {timeout_seconds}s")
+
+
+def _stop(proc: subprocess.Popen) -> None:
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def _measure(
+    client: httpx.Client, api_url: str, payload: dict[str, Any], n: int, warmup: int
+) -> list[float]:
+    url = f"{api_url}/v1/chat/completions"
+    latencies: list[float] = []
+    for i in range(warmup + n):
+        t0 = time.perf_counter()
+        if payload.get("stream"):
+            with client.stream("POST", url, json=payload) as response:
+                response.raise_for_status()
+                for _ in response.iter_raw():
+                    pass
+        else:
+            response = client.post(url, json=payload)
+            response.raise_for_status()
+        if i >= warmup:
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+    return latencies
+
+
+def _summarize(latencies: list[float]) -> dict[str, float]:
+    return {pct: _percentile(latencies, p) for pct, p in (("p50", 50), ("p95", 95), ("p99", 99))}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Measure latency added by the gateway against a stand-in backend."
+    )
+    parser.add_argument("--backend-url", help="Existing backend; default spawns bench/sim_vllm.py")
+    parser.add_argument("--gateway-url", help="Existing gateway; default spawns one locally")
+    parser.add_argument("--backend-port", type=int, default=18000)
+    parser.add_argument("--gateway-port", type=int, default=18080)
+    parser.add_argument("--model", default="ft")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--max-tokens", type=int, default=16)
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    with ExitStack() as stack:
+        backend_url = args.backend_url
+        if not backend_url:
+            backend_url = f"http://127.0.0.1:{args.backend_port}"
+            proc = _spawn([sys.executable, "bench/sim_vllm.py", "--port", str(args.backend_port)])
+            stack.callback(_stop, proc)
+        _wait_ready(f"{backend_url}/v1/models")
+
+        gateway_url = args.gateway_url
+        if not gateway_url:
+            gateway_url = f"http://127.0.0.1:{args.gateway_port}"
+            proc = _spawn(
+                [
+                    sys.executable,
+                    "-m",
+                    "uvicorn",
+                    "gateway.main:app",
+                    "--port",
+                    str(args.gateway_port),
+                    "--log-level",
+                    "warning",
+                ],
+                env={
+                    "PYTHONPATH": str(REPO_ROOT / "src"),
+                    "BASE_API_URL": backend_url,
+                    "FT_API_URL": backend_url,
+                },
+            )
+            stack.callback(_stop, proc)
+        _wait_ready(f"{gateway_url}/health")
+
+        payload = {
+            "model": args.model,
+            "messages": [{"role": "user", "content": "Say hello in one sentence."}],
+            "temperature": 0,
+            "max_tokens": args.max_tokens,
+            "stream": args.stream,
+        }
+        with httpx.Client(timeout=30) as client:
+            direct = _measure(client, backend_url, payload, args.requests, args.warmup)
+            via_gateway = _measure(client, gateway_url, payload, args.requests, args.warmup)
+
+    direct_stats = _summarize(direct)
+    gateway_stats = _summarize(via_gateway)
+    overhead = {pct: gateway_stats[pct] - direct_stats[pct] for pct in direct_stats}
+    summary = {
+        "backend_url": backend_url,
+        "gateway_url": gateway_url,
+        "stream": args.stream,
+        "requests": args.requests,
+        "direct_ms": direct_stats,
+        "gateway_ms": gateway_stats,
+        "overhead_ms": overhead,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+    for pct in ("p50", "p95", "p99"):
+        print(
+            f"{pct}: direct={direct_stats[pct]:.2f}ms gateway={gateway_stats[pct]:.2f}ms "
+            f"overhead={overhead[pct]:.2f}ms"
+        )
+    if args.out:
+        out_path = Path(args.out)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_text(json.dumps(summary, ensure_ascii=True, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
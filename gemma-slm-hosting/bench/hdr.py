@@ -0,0 +1,155 @@
+"""Log-bucketed latency histogram, in the spirit of HdrHistogram.
+
+Bucket ``i`` covers ``[lowest * g**i, lowest * g**(i + 1))`` with
+``g = (1 + e) / (1 - e)``, and reports ``2 * low * high / (low + high)``, the
+harmonic mean of its bounds, which is within ``e`` (``relative_error``) of every
+value in it; the arithmetic midpoint would be off by ``e / (1 - e)`` at the low
+end. Values below ``lowest`` share bucket 0, so for those the error is at most
+``lowest`` in absolute terms; values above ``highest`` share the top bucket.
+Memory is therefore bounded by the range, not the number of samples: 1 µs to
+about 3 hours in milliseconds at 0.5 % is about 2,300 buckets, and only those
+that were hit are stored.
+
+Histograms with the same parameters merge by adding counts, so per-worker or
+per-run histograms combine exactly. ``to_dict`` stores the counts as
+delta-encoded varints, zlib-compressed and base64'd: about 2 KB for 200,000
+samples, which as a JSON list would take 4 MB.
+"""
+
+import base64
+import math
+import zlib
+from typing import Any
+
+
+def _varints(values: list[int]) -> bytes:
+    out = bytearray()
+    for value in values:
+        while value > 0x7F:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+    return bytes(out)
+
+
+def _unvarints(data: bytes) -> list[int]:
+    values = []
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(value)
+            value = shift = 0
+    return values
+
+
+class LogHistogram:
+    def __init__(
+        self, lowest: float = 1e-3, highest: float = 1e7, relative_error: float = 0.005
+    ) -> None:
+        if not 0 < lowest < highest or not 0 < relative_error < 1:
+            raise ValueError("need 0 < lowest < highest and 0 < relative_error < 1")
+        self.lowest = lowest
+        self.highest = highest
+        self.relative_error = relative_error
+        self._log_growth = math.log((1 + relative_error) / (1 - relative_error))
+        self._top = self._index(highest)
+        self.counts: dict[int, int] = {}
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _index(self, value: float) -> int:
+        if value <= self.lowest:
+            return 0
+        return int(math.log(value / self.lowest) / self._log_growth)
+
+    def _value(self, index: int) -> float:
+        """Harmonic mean of the bucket's bounds: within ``relative_error`` of both."""
+        low = self.lowest * math.exp(index * self._log_growth)
+        growth = math.exp(self._log_growth)
+        return 2 * low * growth / (1 + growth)
+
+    def record(self, value: float, count: int = 1) -> None:
+        index = min(self._index(value), self._top)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.count += count
+        self.sum += value * count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: "LogHistogram") -> None:
+        if (other.lowest, other.highest, other.relative_error) != (
+            self.lowest,
+            self.highest,
+            self.relative_error,
+        ):
+            raise ValueError("can only merge histograms with the same parameters")
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    @property
+    def stddev(self) -> float:
+        """From bucket values, so also within ``relative_error``."""
+        if self.count < 2:
+            return 0.0
+        mean = self.mean
+        squares = sum(count * (self._value(i) - mean) ** 2 for i, count in self.counts.items())
+        return math.sqrt(squares / (self.count - 1))
+
+    def percentile(self, pct: float) -> float:
+        """Nearest-rank percentile, within ``relative_error`` of the exact one."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(pct / 100.0 * self.count))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(max(self._value(index), self.min), self.max)
+        return self.max
+
+    def to_dict(self) -> dict[str, Any]:
+        indices = sorted(self.counts)
+        pairs = []
+        previous = 0
+        for index in indices:
+            pairs += [index - previous, self.counts[index]]
+            previous = index
+        encoded = base64.b64encode(zlib.compress(_varints(pairs))).decode("ascii")
+        return {
+            "lowest": self.lowest,
+            "highest": self.highest,
+            "relative_error": self.relative_error,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "counts": encoded,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "LogHistogram":
+        hist = cls(data["lowest"], data["highest"], data["relative_error"])
+        pairs = _unvarints(zlib.decompress(base64.b64decode(data["counts"])))
+        index = 0
+        for delta, count in zip(pairs[::2], pairs[1::2], strict=True):
+            index += delta
+            hist.counts[index] = count
+        hist.count = data["count"]
+        hist.sum = data["sum"]
+        if hist.count:
+            hist.min = data["min"]
+            hist.max = data["max"]
+        return hist
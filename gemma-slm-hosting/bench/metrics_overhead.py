@@ -0,0 +1,140 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "src"))
+
+from gateway.metrics import PROBE_KEY, GatewayMetrics, MetricsMiddleware  # noqa: E402
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = (len(values) - 1) * (pct / 100.0)
+    f = int(k)
+    c = min(f + 1, len(values) - 1)
+    if f == c:
+        return values[f]
+    d = k - f
+    return values[f] + (values[c] - values[f]) * d
+
+
+def _sse_chunks(tokens: int) -> list[bytes]:
+    chunks = [
+        b'data: {"choices":[{"index":0,"delta":{"content":"tok"},"finish_reason":null}]}\n\n'
+        for _ in range(tokens)
+    ]
+    chunks.append(b'data: {"choices":[],"usage":{"completion_tokens":%d}}\n\n' % tokens)
+    chunks.append(b"data: [DONE]\n\n")
+    return chunks
+
+
+def _make_app(chunks: list[bytes]) -> Any:
+    """Bare ASGI endpoint that plays a canned SSE stream, like the proxy does."""
+    start = {
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"text/event-stream")],
+    }
+
+    async def app(scope: dict[str, Any], receive: Any, send: Any) -> None:
+        probe = scope.get(PROBE_KEY)
+        if probe is not None:
+            probe.begin("ft")
+            probe.backend = "http://127.0.0.1:8000"
+        await send(start)
+        for chunk in chunks:
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    return app
+
+
+async def _run(app: Any, requests: int) -> list[float]:
+    async def receive() -> dict[str, Any]:
+        return {"type": "http.disconnect"}
+
+    async def send(message: dict[str, Any]) -> None:
+        return None
+
+    samples: list[float] = []
+    for _ in range(requests):
+        scope = {"type": "http", "path": "/v1/chat/completions", "app": app.state_holder}
+        t0 = time.perf_counter()
+        await app(scope, receive, send)
+        samples.append((time.perf_counter() - t0) * 1e6)
+    return samples
+
+
+def _instrumented(inner: Any, metrics: GatewayMetrics | None) -> Any:
+    wrapped = MetricsMiddleware(inner)
+    wrapped.state_holder = SimpleNamespace(state=SimpleNamespace(metrics=metrics))
+    return wrapped
+
+
+def _summarize(samples: list[float]) -> dict[str, float]:
+    return {f"p{p}": _percentile(samples, p) for p in (50, 95, 99)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Per-request CPU cost of gateway metrics instrumentation (in-process)."
+    )
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--warmup", type=int, default=1000)
+    parser.add_argument("--tokens", type=int, default=64, help="SSE chunks per request")
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    inner = _make_app(_sse_chunks(args.tokens))
+    metrics = GatewayMetrics()
+    variants = {
+        "disabled": _instrumented(inner, None),
+        "enabled": _instrumented(inner, metrics),
+    }
+    results: dict[str, dict[str, float]] = {}
+    for name, app in variants.items():
+        asyncio.run(_run(app, args.warmup))
+        results[name] = _summarize(asyncio.run(_run(app, args.requests)))
+
+    t0 = time.perf_counter()
+    exposition = metrics.render()
+    render_us = (time.perf_counter() - t0) * 1e6
+
+    overhead = {p: results["enabled"][p] - results["disabled"][p] for p in results["disabled"]}
+    summary = {
+        "requests": args.requests,
+        "tokens_per_request": args.tokens,
+        "disabled_us": results["disabled"],
+        "enabled_us": results["enabled"],
+        "overhead_us": overhead,
+        "overhead_per_chunk_us": overhead["p50"] / (args.tokens + 2),
+        "render_us": render_us,
+        "exposition_bytes": len(exposition),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+    for pct in ("p50", "p95", "p99"):
+        print(
+            f"{pct}: disabled={results['disabled'][pct]:.1f}us "
+            f"enabled={results['enabled'][pct]:.1f}us overhead={overhead[pct]:.1f}us"
+        )
+    print(
+        f"per chunk: {summary['overhead_per_chunk_us']:.2f}us  "
+        f"/metrics render: {render_us:.0f}us ({len(exposition)} bytes)"
+    )
+    if args.out:
+        out_path = Path(args.out)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_text(json.dumps(summary, ensure_ascii=True, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
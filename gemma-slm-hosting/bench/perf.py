@@ -1,12 +1,52 @@
 import argparse
 import asyncio
+import bisect
 import json
+import multiprocessing
+import os
+import random
+import threading
 import time
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
 
 import httpx
+from hdr import LogHistogram
+from server_metrics import Scraper, headline
+from workload import Workload, from_prompts, load_workload
+
+PERCENTILES = (50, 90, 95, 99)
+# A worker process busier than this is likely the bottleneck, not the server.
+CLIENT_BOUND_UTILIZATION = 0.8
+
+
+@dataclass
+class RequestResult:
+    ok: bool
+    latency_ms: float
+    # Streaming only: first content chunk, and the gaps between content chunks.
+    ttft_ms: float | None = None
+    itl_ms: list[float] = field(default_factory=list)
+    prompt_tokens: int | None = None
+    completion_tokens: int | None = None
+    # Open loop only: intended send time from the start of the run, and how late
+    # the request actually went out. Latency and TTFT count from the intended time.
+    scheduled_s: float = 0.0
+    send_lag_ms: float = 0.0
+    finished_s: float = 0.0
+    workload_class: str = ""
+
+    @property
+    def tpot_ms(self) -> float | None:
+        """Mean time per output token after the first one."""
+        if self.ttft_ms is None or not self.completion_tokens or self.completion_tokens < 2:
+            return None
+        return (self.latency_ms - self.ttft_ms) / (self.completion_tokens - 1)
 
 
 def _normalize_url(url: str) -> str:
@@ -16,38 +56,92 @@ def _normalize_url(url: str) -> str:
     return url.rstrip("/")
 
 
-def _load_prompts(path: Path) -> list[dict[str, Any]]:
+def _load_workload(args: argparse.Namespace) -> Workload:
+    """``--workload`` if given, else every prompt in ``--prompts`` in turn."""
+    if args.workload:
+        return load_workload(Path(args.workload), args.max_tokens, args.temperature)
+    path = Path(args.prompts)
     if not path.exists():
         raise FileNotFoundError(f"Missing prompts file: {path}")
-    prompts: list[dict[str, Any]] = []
-    with path.open("r", encoding="utf-8") as handle:
-        for raw in handle:
-            line = raw.strip()
-            if not line:
+    return from_prompts(path, args.max_tokens, args.temperature)
+
+
+def _percentiles(hist: LogHistogram, prefix: str) -> dict[str, float]:
+    return {f"{prefix}_p{pct}": hist.percentile(pct) for pct in PERCENTILES}
+
+
+def _usage(data: dict[str, Any], result: RequestResult) -> None:
+    usage = data.get("usage")
+    if isinstance(usage, dict):
+        result.prompt_tokens = usage.get("prompt_tokens")
+        result.completion_tokens = usage.get("completion_tokens")
+
+
+async def _post(
+    client: httpx.AsyncClient,
+    url: str,
+    payload: dict[str, Any],
+    timeout: int,
+    t0: float | None = None,
+) -> RequestResult:
+    """POST and time it; ``t0`` (``perf_counter``) overrides when the clock starts."""
+    t0 = time.perf_counter() if t0 is None else t0
+    response = await client.post(url, json=payload, timeout=timeout)
+    result = RequestResult(response.status_code == 200, (time.perf_counter() - t0) * 1000.0)
+    if result.ok:
+        _usage(response.json(), result)
+    return result
+
+
+async def _stream(
+    client: httpx.AsyncClient,
+    url: str,
+    payload: dict[str, Any],
+    timeout: int,
+    t0: float | None = None,
+) -> RequestResult:
+    """Consume the SSE stream, timing every chunk that carries output text."""
+    payload = {**payload, "stream": True, "stream_options": {"include_usage": True}}
+    t0 = time.perf_counter() if t0 is None else t0
+    first = last = 0.0
+    itl_ms: list[float] = []
+    chunks = 0
+    result = RequestResult(False, 0.0)
+    async with client.stream("POST", url, json=payload, timeout=timeout) as response:
+        if response.status_code != 200:
+            await response.aread()
+            result.latency_ms = (time.perf_counter() - t0) * 1000.0
+            return result
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
                 continue
-            data = json.loads(line)
-            if "id" not in data or "messages" not in data:
-                raise ValueError("Prompt must include 'id' and 'messages'")
-            prompts.append(data)
-    return prompts
-
-
-def _percentile(values: list[float], pct: float) -> float:
-    if not values:
-        return 0.0
-    values = sorted(values)
-    k = (len(values) - 1) * (pct / 100.0)
-    f = int(k)
-    c = min(f + 1, len(values) - 1)
-    if f == c:
-        return values[f]
-    d = k - f
-    return values[f] + (values[c] - values[f]) * d
-
-
-async def _fetch_first_model(
-    client: httpx.AsyncClient, api_url: str, timeout: int
-) -> str:
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            now = time.perf_counter()
+            event = json.loads(data)
+            _usage(event, result)
+            choices = event.get("choices") or []
+            if not any((c.get("delta") or {}).get("content") or c.get("text") for c in choices):
+                continue
+            chunks += 1
+            if first:
+                itl_ms.append((now - last) * 1000.0)
+            else:
+                first = now
+            last = now
+    result.ok = True
+    result.latency_ms = (time.perf_counter() - t0) * 1000.0
+    result.itl_ms = itl_ms
+    if first:
+        result.ttft_ms = (first - t0) * 1000.0
+    if result.completion_tokens is None:
+        # No usage chunk: one chunk per token, as vLLM sends them when not batching output.
+        result.completion_tokens = chunks
+    return result
+
+
+async def _fetch_first_model(client: httpx.AsyncClient, api_url: str, timeout: int) -> str:
     response = await client.get(f"{api_url}/v1/models", timeout=timeout)
     response.raise_for_status()
     data = response.json()
@@ -57,58 +151,450 @@ async def _fetch_first_model(
     return models[0]["id"]
 
 
+def _parse_profile(spec: str) -> list[tuple[float, float]]:
+    """``"RPS:SECONDS,RPS:SECONDS,..."`` into ``(rps, seconds)`` steps."""
+    steps = []
+    for part in spec.split(","):
+        rate, _, seconds = part.strip().partition(":")
+        try:
+            step = (float(rate), float(seconds))
+        except ValueError:
+            raise ValueError(f"Profile steps must be RPS:SECONDS, got {part!r}") from None
+        if step[0] < 0 or step[1] <= 0:
+            raise ValueError(f"Profile step needs RPS >= 0 and SECONDS > 0, got {part!r}")
+        steps.append(step)
+    return steps
+
+
+def _arrivals(steps: list[tuple[float, float]], process: str, seed: int | None) -> list[float]:
+    """Intended send times, in seconds from the start, for piecewise-constant rates.
+
+    ``poisson`` draws exponential gaps (independent arrivals, like many users);
+    ``constant`` spaces requests exactly ``1/rps`` apart.
+    """
+    rng = random.Random(seed)
+    times: list[float] = []
+    begin = 0.0
+    for rate, seconds in steps:
+        end = begin + seconds
+        if rate > 0:
+            poisson = process == "poisson"
+            t = begin + rng.expovariate(rate) if poisson else begin
+            while t < end:
+                times.append(t)
+                t += rng.expovariate(rate) if poisson else 1.0 / rate
+        begin = end
+    return times
+
+
+async def _start(start_at: float | None) -> float:
+    """``perf_counter`` time the run starts at: now, or the wall-clock ``start_at``.
+
+    Workers share ``start_at``; one that starts late shows it as send lag.
+    """
+    start = time.perf_counter()
+    if start_at is not None:
+        start += start_at - time.time()
+        await asyncio.sleep(max(0.0, start - time.perf_counter()))
+    return start
+
+
+class Recorder:
+    """Folds results into histograms as requests finish; memory stays flat however long the run."""
+
+    HISTOGRAMS = (
+        "latency_ms",
+        "ttft_ms",
+        "tpot_ms",
+        "itl_ms",
+        "prompt_tokens",
+        "completion_tokens",
+        "send_lag_ms",
+    )
+
+    def __init__(self, by_class: bool = False) -> None:
+        self.success = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.last_finished_s = 0.0
+        self.hists = {name: LogHistogram() for name in self.HISTOGRAMS}
+        # Workload class -> its own recorder, when kept.
+        self.classes: dict[str, Recorder] | None = {} if by_class else None
+
+    def add(self, result: RequestResult) -> None:
+        if self.classes is not None:
+            self.classes.setdefault(result.workload_class, Recorder()).add(result)
+        hists = self.hists
+        hists["send_lag_ms"].record(result.send_lag_ms)
+        self.last_finished_s = max(self.last_finished_s, result.finished_s)
+        if not result.ok:
+            self.errors += 1
+            return
+        self.success += 1
+        hists["latency_ms"].record(result.latency_ms)
+        if result.prompt_tokens is not None:
+            self.prompt_tokens += result.prompt_tokens
+            hists["prompt_tokens"].record(result.prompt_tokens)
+        if result.completion_tokens is not None:
+            self.completion_tokens += result.completion_tokens
+            hists["completion_tokens"].record(result.completion_tokens)
+        if result.ttft_ms is not None:
+            hists["ttft_ms"].record(result.ttft_ms)
+        tpot = result.tpot_ms
+        if tpot is not None:
+            hists["tpot_ms"].record(tpot)
+        for gap in result.itl_ms:
+            hists["itl_ms"].record(gap)
+
+    def merge(self, other: "Recorder") -> None:
+        self.success += other.success
+        self.errors += other.errors
+        self.prompt_tokens += other.prompt_tokens
+        self.completion_tokens += other.completion_tokens
+        self.last_finished_s = max(self.last_finished_s, other.last_finished_s)
+        for name, hist in other.hists.items():
+            self.hists[name].merge(hist)
+        if self.classes is not None and other.classes:
+            for name, recorder in other.classes.items():
+                self.classes.setdefault(name, Recorder()).merge(recorder)
+
+
+@dataclass
+class Step:
+    """One step of an open-loop profile."""
+
+    rps: float
+    start_s: float
+    seconds: float
+    # Requests scheduled during the step, and successful responses that came back during it.
+    sent: Recorder = field(default_factory=Recorder)
+    completed: int = 0
+
+
+class Timeline:
+    """Results of the current interval; every ``interval_s`` they go to ``emit`` and reset.
+
+    Intervals are rolled by a ticker rather than by completions, so a stall
+    shows up as empty intervals instead of no rows.
+    """
+
+    def __init__(self, interval_s: float, emit: Callable[[int, Recorder, int], None]) -> None:
+        self.interval_s = interval_s
+        self.emit = emit
+        self.window = Recorder()
+        self.index = 0
+        self.in_flight = 0
+
+    def roll(self) -> None:
+        self.emit(self.index, self.window, self.in_flight)
+        self.window = Recorder()
+        self.index += 1
+
+    async def tick(self, start: float) -> None:
+        while True:
+            await asyncio.sleep(start + (self.index + 1) * self.interval_s - time.perf_counter())
+            self.roll()
+
+
+async def _run_open_loop(
+    api_url: str,
+    model: str,
+    workload: Workload,
+    arrivals: list[float],
+    steps: list[tuple[float, float]],
+    timeout: int,
+    stream: bool = False,
+    max_connections: int = 1000,
+    start_at: float | None = None,
+    warmup_s: float = 0.0,
+    timeline: Timeline | None = None,
+) -> tuple[Recorder, list[Step], float]:
+    """Send each request at its arrival time, whether or not earlier ones finished.
+
+    A closed loop waits for a free slot, so a slow server slows the client down
+    and the requests that should have been sent meanwhile are never measured
+    (coordinated omission). Here latency runs from the intended send time: time
+    spent waiting on the client, for a connection or the event loop, counts
+    against the server like real users' waiting would. ``send_lag_ms`` shows
+    how much of that was the client itself falling behind.
+
+    Requests scheduled in the first ``warmup_s`` are left out of the returned
+    recorder (but not out of the per-step stats or the timeline).
+    """
+    recorder = Recorder(by_class=True)
+    step_stats = []
+    begin = 0.0
+    for rate, seconds in steps:
+        step_stats.append(Step(rate, begin, seconds))
+        begin += seconds
+    step_starts = [step.start_s for step in step_stats]
+    send = _stream if stream else _post
+    url = f"{api_url}/v1/chat/completions"
+    limits = httpx.Limits(
+        max_connections=max_connections, max_keepalive_connections=max_connections
+    )
+
+    async with httpx.AsyncClient(limits=limits) as client:
+        start = await _start(start_at)
+
+        ticker = asyncio.create_task(timeline.tick(start)) if timeline else None
+
+        async def one_request(idx: int, intended: float) -> None:
+            workload_class, body = workload.request(idx)
+            payload = {"model": model, **body}
+            lag_ms = (time.perf_counter() - intended) * 1000.0
+            if timeline:
+                timeline.in_flight += 1
+            try:
+                result = await send(client, url, payload, timeout, intended)
+            except Exception:
+                result = RequestResult(False, (time.perf_counter() - intended) * 1000.0)
+            result.scheduled_s = intended - start
+            result.send_lag_ms = lag_ms
+            result.finished_s = time.perf_counter() - start
+            result.workload_class = workload_class
+            if result.scheduled_s >= warmup_s:
+                recorder.add(result)
+            if timeline:
+                timeline.in_flight -= 1
+                timeline.window.add(result)
+            step_stats[bisect.bisect_right(step_starts, result.scheduled_s) - 1].sent.add(result)
+            if result.ok:
+                done = step_stats[bisect.bisect_right(step_starts, result.finished_s) - 1]
+                if result.finished_s < done.start_s + done.seconds:
+                    done.completed += 1
+
+        tasks = []
+        for idx, offset in enumerate(arrivals):
+            delay = start + offset - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(one_request(idx, start + offset)))
+        await asyncio.gather(*tasks)
+        total_elapsed = time.perf_counter() - start
+        if ticker:
+            ticker.cancel()
+            timeline.roll()
+
+    return recorder, step_stats, total_elapsed
+
+
 async def _run_perf(
     api_url: str,
     model: str,
-    prompts: list[dict[str, Any]],
-    total_requests: int,
+    workload: Workload,
+    total_requests: int | None,
     concurrency: int,
-    temperature: float,
-    max_tokens: int,
     timeout: int,
-) -> tuple[list[float], int, int, float]:
-    latencies: list[float] = []
-    success_count = 0
-    error_count = 0
-    lock = asyncio.Lock()
-    sem = asyncio.Semaphore(concurrency)
-
-    async with httpx.AsyncClient() as client:
-        start = time.perf_counter()
-
-        async def one_request(idx: int) -> None:
-            nonlocal success_count, error_count
-            prompt = prompts[idx % len(prompts)]
-            payload = {
-                "model": model,
-                "messages": prompt["messages"],
-                "temperature": temperature,
-                "max_tokens": max_tokens,
-            }
-            async with sem:
+    stream: bool = False,
+    start_at: float | None = None,
+    duration_s: float | None = None,
+    warmup_s: float = 0.0,
+    timeline: Timeline | None = None,
+) -> tuple[Recorder, float]:
+    """Keep ``concurrency`` requests in flight until ``total_requests`` are sent or,
+    with ``duration_s``, until that many seconds have passed.
+
+    Requests started in the first ``warmup_s`` are left out of the returned recorder.
+    """
+    recorder = Recorder(by_class=True)
+    send = _stream if stream else _post
+    url = f"{api_url}/v1/chat/completions"
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    issued = 0
+
+    async with httpx.AsyncClient(limits=limits) as client:
+        start = await _start(start_at)
+        deadline = None if duration_s is None else start + duration_s
+        ticker = asyncio.create_task(timeline.tick(start)) if timeline else None
+
+        async def user() -> None:
+            nonlocal issued
+            while total_requests is None or issued < total_requests:
                 t0 = time.perf_counter()
+                if deadline is not None and t0 >= deadline:
+                    return
+                workload_class, body = workload.request(issued)
+                payload = {"model": model, **body}
+                issued += 1
+                if timeline:
+                    timeline.in_flight += 1
                 try:
-                    response = await client.post(
-                        f"{api_url}/v1/chat/completions",
-                        json=payload,
-                        timeout=timeout,
-                    )
-                    latency_ms = (time.perf_counter() - t0) * 1000.0
-                    async with lock:
-                        if response.status_code == 200:
-                            latencies.append(latency_ms)
-                            success_count += 1
-                        else:
-                            error_count += 1
+                    result = await send(client, url, payload, timeout)
                 except Exception:
-                    async with lock:
-                        error_count += 1
+                    result = RequestResult(False, (time.perf_counter() - t0) * 1000.0)
+                result.workload_class = workload_class
+                if t0 - start >= warmup_s:
+                    recorder.add(result)
+                if timeline:
+                    timeline.in_flight -= 1
+                    timeline.window.add(result)
 
-        tasks = [one_request(i) for i in range(total_requests)]
-        await asyncio.gather(*tasks)
+        await asyncio.gather(*(user() for _ in range(concurrency)))
         total_elapsed = time.perf_counter() - start
+        if ticker:
+            ticker.cancel()
+            timeline.roll()
+
+    return recorder, total_elapsed
+
+
+def _summarize(recorder: Recorder, elapsed_s: float, stream: bool) -> dict[str, Any]:
+    hists = recorder.hists
+    summary: dict[str, Any] = {
+        "success_count": recorder.success,
+        "error_count": recorder.errors,
+        **_percentiles(hists["latency_ms"], "latency_ms"),
+        "throughput_rps": recorder.success / elapsed_s if elapsed_s > 0 else 0.0,
+    }
+    if hists["completion_tokens"].count:
+        output = recorder.completion_tokens
+        summary["output_tokens_per_s"] = output / elapsed_s if elapsed_s > 0 else 0.0
+        summary["total_tokens_per_s"] = (
+            (output + recorder.prompt_tokens) / elapsed_s if elapsed_s > 0 else 0.0
+        )
+        summary.update(_percentiles(hists["completion_tokens"], "completion_tokens"))
+    if hists["prompt_tokens"].count:
+        summary.update(_percentiles(hists["prompt_tokens"], "prompt_tokens"))
+    if stream:
+        summary.update(_percentiles(hists["ttft_ms"], "ttft_ms"))
+        summary.update(_percentiles(hists["tpot_ms"], "tpot_ms"))
+        summary.update(_percentiles(hists["itl_ms"], "itl_ms"))
+    # The distributions themselves, compactly; bench/hdr.py reads them back.
+    summary["histograms"] = {name: h.to_dict() for name, h in hists.items() if h.count}
+    return summary
+
+
+def _summarize_classes(recorder: Recorder, elapsed_s: float, stream: bool) -> dict[str, Any]:
+    """``_summarize`` for each workload class, plus its share of the requests."""
+    total = recorder.success + recorder.errors
+    classes = {}
+    for name in sorted(recorder.classes or {}):
+        part = recorder.classes[name]
+        sent = part.success + part.errors
+        classes[name] = {"share": sent / total if total else 0.0}
+        classes[name].update(_summarize(part, elapsed_s, stream))
+    return classes
+
+
+def _summarize_open_loop(
+    recorder: Recorder, steps: list[Step], warmup_s: float = 0.0
+) -> dict[str, Any]:
+    """Offered vs achieved load, overall (after warmup) and per profile step.
 
-    return latencies, success_count, error_count, total_elapsed
+    A step's achieved rate counts responses that finished inside it, so a
+    server that falls behind during a burst shows up as a shortfall there and a
+    surplus in the steps after it, while it drains the backlog.
+    """
+    end = sum(step.seconds for step in steps)
+    duration = end - warmup_s
+    sent = recorder.success + recorder.errors
+    finished = recorder.last_finished_s
+    summary: dict[str, Any] = {
+        "offered_rps": sent / duration if duration > 0 else 0.0,
+        "achieved_rps": recorder.success / max(duration, finished - warmup_s, 1e-9),
+        "drain_s": max(0.0, finished - end),
+        **_percentiles(recorder.hists["send_lag_ms"], "send_lag_ms"),
+    }
+    summary["steps"] = [
+        {
+            "start_s": step.start_s,
+            "seconds": step.seconds,
+            "target_rps": step.rps,
+            "offered_rps": (step.sent.success + step.sent.errors) / step.seconds,
+            "achieved_rps": step.completed / step.seconds,
+            "error_count": step.sent.errors,
+            # Latency of the requests sent during the step, not finished in it.
+            **_percentiles(step.sent.hists["latency_ms"], "latency_ms"),
+        }
+        for step in steps
+    ]
+    return summary
+
+
+def _run_share(job: dict[str, Any]) -> tuple[Recorder, list[Step], float, float]:
+    """Run one worker's share of the load on its own event loop and connection pool.
+
+    Returns its recorder, per-step stats (open loop only), elapsed seconds and CPU seconds.
+    """
+    queue = job.pop("timeline_queue", None)
+    if queue is not None:
+        job["timeline"] = Timeline(job.pop("interval_s"), lambda *window: queue.put(window))
+    cpu = time.process_time()
+    if "arrivals" in job:
+        recorder, steps, elapsed = asyncio.run(_run_open_loop(**job))
+    else:
+        recorder, elapsed = asyncio.run(_run_perf(**job))
+        steps = []
+    return recorder, steps, elapsed, time.process_time() - cpu
+
+
+class TimelineWriter:
+    """Appends one JSONL row per interval, once every worker has reported it.
+
+    Each row is flushed as it is written, so a run that dies part way through
+    still leaves its timeline behind.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        workers: int,
+        interval_s: float,
+        warmup_s: float,
+        stream: bool,
+        scraper: Scraper | None = None,
+    ) -> None:
+        self.handle = path.open("w", encoding="utf-8")
+        self.workers = workers
+        self.interval_s = interval_s
+        self.warmup_s = warmup_s
+        self.stream = stream
+        self.scraper = scraper
+        # interval -> [workers reported, merged window, requests in flight]
+        self.pending: dict[int, list[Any]] = {}
+
+    def add(self, index: int, window: Recorder, in_flight: int) -> None:
+        entry = self.pending.setdefault(index, [0, Recorder(), 0])
+        entry[0] += 1
+        entry[1].merge(window)
+        entry[2] += in_flight
+        if entry[0] == self.workers:
+            self._write(index)
+
+    def _write(self, index: int) -> None:
+        _, window, in_flight = self.pending.pop(index)
+        start_s = index * self.interval_s
+        row = {
+            "time": datetime.now(timezone.utc).isoformat(),
+            "t_s": start_s,
+            "warmup": start_s < self.warmup_s,
+            "in_flight": in_flight,
+            "success_count": window.success,
+            "error_count": window.errors,
+            "throughput_rps": window.success / self.interval_s,
+            "output_tokens_per_s": window.completion_tokens / self.interval_s,
+            **_percentiles(window.hists["latency_ms"], "latency_ms"),
+        }
+        if self.stream:
+            row.update(_percentiles(window.hists["ttft_ms"], "ttft_ms"))
+            row.update(_percentiles(window.hists["tpot_ms"], "tpot_ms"))
+        if self.scraper is not None and self.scraper.current:
+            # Server gauges as last scraped, e.g. running and waiting requests.
+            row["server"] = self.scraper.current
+        self.handle.write(json.dumps(row, ensure_ascii=True) + "\n")
+        self.handle.flush()
+
+    def close(self) -> None:
+        # Intervals a worker never reported (it finished early) still get written.
+        for index in sorted(self.pending):
+            self._write(index)
+        self.handle.close()
+
+
+def _split(total: int, parts: int, index: int) -> int:
+    return total // parts + (index < total % parts)
 
 
 def _default_out_path() -> Path:
@@ -120,67 +606,252 @@ def main() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("--url", required=True)
     parser.add_argument("--prompts", default="data/prompts.jsonl")
+    parser.add_argument(
+        "--workload",
+        help="JSON mix of weighted prompt sources and synthetic length classes "
+        "(see bench/workload.py); replaces --prompts",
+    )
     parser.add_argument("--model")
     parser.add_argument("--temperature", type=float, default=0.0)
     parser.add_argument("--max-tokens", type=int, default=128)
     parser.add_argument("--concurrency", type=int, default=1)
     parser.add_argument("--requests", type=int, default=50)
     parser.add_argument("--timeout", type=int, default=60)
+    parser.add_argument(
+        "--stream", action="store_true", help="Stream responses and record TTFT, TPOT and ITL"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Client processes, each with its own event loop and connection pool; "
+        "concurrency, requests or arrivals are split between them",
+    )
+    soak = parser.add_argument_group("soak", "Run for a fixed time and record a timeline")
+    soak.add_argument(
+        "--duration",
+        type=float,
+        help="Seconds to measure for, after --warmup; replaces --requests",
+    )
+    soak.add_argument(
+        "--warmup",
+        type=float,
+        default=0.0,
+        help="Seconds at the start whose requests are left out of the summary",
+    )
+    soak.add_argument(
+        "--timeline",
+        help="JSONL file for per-interval stats (default with --duration: next to --out)",
+    )
+    soak.add_argument("--interval", type=float, default=1.0, help="Timeline interval in seconds")
+    open_loop = parser.add_argument_group(
+        "open loop", "Send on an arrival schedule instead of keeping --concurrency in flight"
+    )
+    open_loop.add_argument(
+        "--rate", type=float, help="Offered requests/s; the run lasts --requests / --rate seconds"
+    )
+    open_loop.add_argument(
+        "--profile",
+        help="Steps of RPS:SECONDS, e.g. 2:30,10:5,2:30 for a burst or 1:20,2:20,4:20 for a ramp",
+    )
+    open_loop.add_argument("--arrival", choices=("poisson", "constant"), default="poisson")
+    open_loop.add_argument("--seed", type=int, default=None, help="Seed for Poisson arrivals")
+    open_loop.add_argument("--max-connections", type=int, default=1000)
+    server = parser.add_argument_group(
+        "server metrics", "Scrape the backend's Prometheus metrics during the run"
+    )
+    server.add_argument("--metrics-url", help="Default: <url>/metrics")
+    server.add_argument("--scrape-interval", type=float, default=1.0)
+    server.add_argument("--no-scrape", action="store_true")
     parser.add_argument("--out", default=None)
     args = parser.parse_args()
+    if args.rate is not None and args.rate <= 0:
+        parser.error("--rate must be positive")
+    if args.duration is not None and (args.duration <= 0 or args.profile):
+        parser.error("--duration must be positive and cannot be combined with --profile")
+    if args.warmup < 0 or args.interval <= 0 or args.scrape_interval <= 0:
+        parser.error(
+            "--warmup cannot be negative and --interval and --scrape-interval must be positive"
+        )
+    steps = None
+    if args.profile:
+        try:
+            steps = _parse_profile(args.profile)
+        except ValueError as exc:
+            parser.error(str(exc))
+    elif args.rate is not None:
+        seconds = args.requests / args.rate if args.duration is None else args.duration
+        steps = [(args.rate, args.warmup + seconds)]
+
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    arrivals = _arrivals(steps, args.arrival, args.seed) if steps is not None else []
 
     api_url = _normalize_url(args.url)
-    prompts = _load_prompts(Path(args.prompts))
+    workload = _load_workload(args)
     out_path = Path(args.out) if args.out else _default_out_path()
     out_path.parent.mkdir(parents=True, exist_ok=True)
+    timeline_path = None
+    if args.timeline:
+        timeline_path = Path(args.timeline)
+    elif args.duration is not None:
+        timeline_path = out_path.with_suffix(".timeline.jsonl")
 
-    async def runner() -> None:
+    async def first_model() -> str:
         async with httpx.AsyncClient() as client:
-            model = args.model or await _fetch_first_model(
-                client, api_url, args.timeout
-            )
-        latencies, success_count, error_count, total_elapsed = await _run_perf(
-            api_url=api_url,
-            model=model,
-            prompts=prompts,
-            total_requests=args.requests,
-            concurrency=args.concurrency,
-            temperature=args.temperature,
-            max_tokens=args.max_tokens,
-            timeout=args.timeout,
+            return await _fetch_first_model(client, api_url, args.timeout)
+
+    model = args.model or asyncio.run(first_model())
+    common = {
+        "api_url": api_url,
+        "model": model,
+        "timeout": args.timeout,
+        "stream": args.stream,
+        "warmup_s": args.warmup,
+    }
+    workers = args.workers if steps is not None else min(args.workers, args.concurrency)
+    jobs = []
+    for w in range(workers):
+        # Reseeded so the workers do not all send the same prompts in lockstep.
+        job = {**common, "workload": workload.reseeded(w)}
+        if steps is None:
+            job["concurrency"] = _split(args.concurrency, workers, w)
+            if args.duration is None:
+                job["total_requests"] = _split(args.requests, workers, w)
+            else:
+                job["total_requests"] = None
+                job["duration_s"] = args.warmup + args.duration
+        else:
+            job["arrivals"] = arrivals[w::workers]
+            job["steps"] = steps
+            job["max_connections"] = args.max_connections
+        jobs.append(job)
+    # Give worker processes time to start; they all count from the same instant.
+    start_at = None if workers == 1 else time.time() + 1.0 + 0.1 * workers
+    scraper = None
+    if not args.no_scrape:
+        lead = 0.0 if start_at is None else start_at - time.time()
+        scraper = Scraper(
+            args.metrics_url or f"{api_url}/metrics", args.scrape_interval, args.warmup + lead
+        ).start()
+    writer = None
+    if timeline_path is not None:
+        timeline_path.parent.mkdir(parents=True, exist_ok=True)
+        writer = TimelineWriter(
+            timeline_path, workers, args.interval, args.warmup, args.stream, scraper
         )
+    if workers == 1:
+        if writer is not None:
+            jobs[0]["timeline"] = Timeline(args.interval, writer.add)
+        shares = [_run_share(jobs[0])]
+    else:
+        for job in jobs:
+            job["start_at"] = start_at
+        with ExitStack() as stack:
+            if writer is not None:
+                # Workers send their closed intervals back; a thread here merges them.
+                queue = stack.enter_context(multiprocessing.Manager()).Queue()
+                for job in jobs:
+                    job["timeline_queue"] = queue
+                    job["interval_s"] = args.interval
+                drain = threading.Thread(
+                    target=lambda: [writer.add(*window) for window in iter(queue.get, None)]
+                )
+                drain.start()
+            with ProcessPoolExecutor(workers) as pool:
+                shares = list(pool.map(_run_share, jobs))
+            if writer is not None:
+                queue.put(None)
+                drain.join()
+    if writer is not None:
+        writer.close()
+    server = scraper.stop() if scraper is not None else None
 
-        latency_p50 = _percentile(latencies, 50)
-        latency_p95 = _percentile(latencies, 95)
-        throughput = success_count / total_elapsed if total_elapsed > 0 else 0.0
-
-        summary = {
-            "url": api_url,
-            "model": model,
-            "concurrency": args.concurrency,
-            "total_requests": args.requests,
-            "success_count": success_count,
-            "error_count": error_count,
-            "latency_ms_p50": latency_p50,
-            "latency_ms_p95": latency_p95,
-            "throughput_rps": throughput,
-            "latencies_ms": latencies,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-        }
+    recorder = Recorder(by_class=True)
+    step_stats: list[Step] = []
+    for share_recorder, share_steps, _, _ in shares:
+        recorder.merge(share_recorder)
+        if not step_stats:
+            step_stats = share_steps
+            continue
+        for step, share_step in zip(step_stats, share_steps, strict=True):
+            step.sent.merge(share_step.sent)
+            step.completed += share_step.completed
+    total_elapsed = max(elapsed for _, _, elapsed, _ in shares)
+    measured_s = max(total_elapsed - args.warmup, 1e-9)
+    utilization = [cpu / elapsed if elapsed > 0 else 0.0 for _, _, elapsed, cpu in shares]
 
-        print(f"url={api_url}")
-        print(f"model={model}")
-        print(f"concurrency={args.concurrency}")
-        print(f"total_requests={args.requests}")
-        print(f"success_count={success_count}")
-        print(f"error_count={error_count}")
-        print(f"latency_ms_p50={latency_p50:.2f}")
-        print(f"latency_ms_p95={latency_p95:.2f}")
-        print(f"throughput_rps={throughput:.2f}")
+    if steps is None:
+        load: dict[str, Any] = {"concurrency": args.concurrency}
+    else:
+        load = {"arrival": args.arrival, "profile": [list(step) for step in steps]}
+    if args.duration is not None:
+        load["duration_s"] = args.duration
+    if args.warmup:
+        load["warmup_s"] = args.warmup
+    if timeline_path is not None:
+        load["timeline"] = str(timeline_path)
+    summary = {
+        "url": api_url,
+        "model": model,
+        "stream": args.stream,
+        "mode": "closed" if steps is None else "open",
+        **load,
+        "total_requests": recorder.success + recorder.errors,
+        **_summarize(recorder, measured_s, args.stream),
+    }
+    if steps is not None:
+        summary.update(_summarize_open_loop(recorder, step_stats, args.warmup))
+    if args.workload:
+        summary["workload"] = args.workload
+        summary["classes"] = _summarize_classes(recorder, measured_s, args.stream)
+    if server is not None:
+        summary["server"] = server
+    summary["client"] = {
+        "workers": workers,
+        "cpus": os.cpu_count(),
+        # CPU seconds over wall seconds per worker process; near 1.0 means the
+        # worker's event loop, not the server, set the pace.
+        "cpu_utilization": utilization,
+        "client_bound": max(utilization) >= CLIENT_BOUND_UTILIZATION,
+    }
+    summary["timestamp"] = datetime.now(timezone.utc).isoformat()
 
-        out_path.write_text(json.dumps(summary, ensure_ascii=True, indent=2) + "\n")
+    print(f"url={api_url}")
+    print(f"model={model}")
+    if steps is None:
+        print(f"concurrency={args.concurrency}")
+    else:
+        print(f"arrival={args.arrival} profile={args.profile or args.rate}")
+    print(f"total_requests={summary['total_requests']}")
+    for key, value in summary.items():
+        if key.endswith(("_count", "_rps", "_per_s")) or key[-3:] in ("p50", "p95", "p99"):
+            print(f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}")
+    for step in summary.get("steps", []):
+        print(
+            f"step t={step['start_s']:.0f}s target={step['target_rps']:.2f}rps "
+            f"offered={step['offered_rps']:.2f} achieved={step['achieved_rps']:.2f} "
+            f"errors={step['error_count']} p50={step['latency_ms_p50']:.0f}ms "
+            f"p99={step['latency_ms_p99']:.0f}ms"
+        )
+    for name, part in summary.get("classes", {}).items():
+        print(
+            f"class={name} share={part['share']:.0%} errors={part['error_count']} "
+            f"rps={part['throughput_rps']:.2f} p50={part['latency_ms_p50']:.0f}ms "
+            f"p95={part['latency_ms_p95']:.0f}ms"
+            + (f" ttft_p95={part['ttft_ms_p95']:.0f}ms" if args.stream else "")
+        )
+    if server is not None:
+        if not server["scrapes"]:
+            print(f"server metrics: no successful scrape of {server['url']}")
+        for line in headline(server):
+            print(line)
+    print(
+        f"client_workers={workers} client_cpu_max={max(utilization):.0%}"
+        + (" (client-bound: add --workers)" if summary["client"]["client_bound"] else "")
+    )
 
-    asyncio.run(runner())
+    out_path.write_text(json.dumps(summary, ensure_ascii=True, indent=2) + "\n")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,275 @@
+"""How much shared prompt prefixes gain from the server's prefix cache.
+
+Requests come in families that share a prefix (a system prompt, optionally
+followed by few-shot turns) and differ in a short final user message. For
+every combination of prefix length, reuse (requests per family) and order, a
+fresh set of families is sent and streamed:
+
+- ``grouped`` sends each family's requests back to back, the best case for a
+  cache.
+- ``shuffled`` interleaves the families, so a prefix has to survive the other
+  families' traffic until its next use; with many long prefixes the cache
+  evicts and hit rates drop.
+
+Reuse 1 is the no-sharing baseline. Each family's first request has to compute
+the prefix; the rest can reuse it, so TTFT is reported for both. Prefill
+throughput is prompt tokens per second of TTFT. At ``--concurrency 1`` that
+is pure prefill time; above it, queueing counts too, and requests of a family
+that run at the same time as its first one miss the cache.
+
+Every run uses new random prefixes, so nothing is cached before a cell starts.
+The server's hit rate comes from its ``/metrics`` when it exports prefix-cache
+counters (vLLM does with ``--enable-prefix-caching``, and so does
+``bench/sim_vllm.py``).
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from perf import _fetch_first_model, _normalize_url, _percentiles, _run_perf  # noqa: E402
+from server_metrics import Scraper  # noqa: E402
+from workload import _TEMPLATE_TOKENS, _Sizer, _synthetic_text  # noqa: E402
+
+# Template tokens around one message (see gateway/tokens.py).
+_TOKENS_PER_TURN = 5
+
+
+class FamilyRequests:
+    """Requests in a fixed order, labelled ``first`` or ``repeat`` within their family."""
+
+    def __init__(self, requests: list[tuple[str, dict[str, Any]]]) -> None:
+        self.requests = requests
+
+    def request(self, idx: int) -> tuple[str, dict[str, Any]]:
+        return self.requests[idx]
+
+
+def _prefix(rng: random.Random, tokens: int, shots: int, tag: str, sizer: _Sizer) -> list:
+    """A system message, then ``shots`` user/assistant pairs, ``tokens`` in all."""
+    turns = 1 + 2 * shots
+    per_turn = max(1, tokens // turns - _TOKENS_PER_TURN)
+    # The tag makes every family's prefix unique, across cells and across runs.
+    messages = [{"role": "system", "content": f"[{tag}] {_synthetic_text(rng, per_turn, sizer)}"}]
+    for _ in range(shots):
+        messages.append({"role": "user", "content": _synthetic_text(rng, per_turn, sizer)})
+        messages.append({"role": "assistant", "content": _synthetic_text(rng, per_turn, sizer)})
+    return messages
+
+
+def build_requests(
+    rng: random.Random,
+    prefix_tokens: int,
+    suffix_tokens: int,
+    shots: int,
+    families: int,
+    reuse: int,
+    order: str,
+    max_tokens: int,
+    tag: str,
+    sizer: _Sizer,
+) -> list[tuple[str, dict[str, Any]]]:
+    bodies = []
+    for family in range(families):
+        prefix = _prefix(rng, prefix_tokens, shots, f"{tag} family {family}", sizer)
+        for _ in range(reuse):
+            suffix = _synthetic_text(rng, max(1, suffix_tokens - _TEMPLATE_TOKENS), sizer)
+            messages = prefix + [{"role": "user", "content": suffix}]
+            bodies.append(
+                (family, {"messages": messages, "temperature": 0.0, "max_tokens": max_tokens})
+            )
+    if order == "shuffled":
+        rng.shuffle(bodies)
+    seen: set[int] = set()
+    requests = []
+    for family, body in bodies:
+        requests.append(("repeat" if family in seen else "first", body))
+        seen.add(family)
+    return requests
+
+
+def _hit_rate(server: dict[str, Any]) -> float | None:
+    counters = server.get("counters", {})
+    # vLLM v1 names, then v0's.
+    for hits, queries in (
+        ("prefix_cache_hits_total", "prefix_cache_queries_total"),
+        ("gpu_prefix_cache_hits_total", "gpu_prefix_cache_queries_total"),
+    ):
+        if hits in counters and queries in counters:
+            total = counters[queries]["delta"]
+            return counters[hits]["delta"] / total if total else None
+    gauge = server.get("gauges", {}).get("gpu_prefix_cache_hit_rate")
+    return gauge["mean"] if gauge else None
+
+
+async def run_cell(
+    args: argparse.Namespace,
+    api_url: str,
+    model: str,
+    requests: list[tuple[str, dict[str, Any]]],
+) -> dict[str, Any]:
+    scraper = None if args.no_scrape else Scraper(f"{api_url}/metrics", 1.0).start()
+    recorder, elapsed = await _run_perf(
+        api_url=api_url,
+        model=model,
+        workload=FamilyRequests(requests),
+        total_requests=len(requests),
+        concurrency=args.concurrency,
+        timeout=args.timeout,
+        stream=True,
+    )
+    ttft = recorder.hists["ttft_ms"]
+    row: dict[str, Any] = {
+        "requests": len(requests),
+        "error_count": recorder.errors,
+        "elapsed_s": elapsed,
+        **_percentiles(ttft, "ttft_ms"),
+        "ttft_ms_mean": ttft.mean,
+        "prompt_tokens_mean": recorder.hists["prompt_tokens"].mean,
+        # Prompt tokens per second of time to first token.
+        "prefill_tokens_per_s": recorder.prompt_tokens / (ttft.sum / 1000.0) if ttft.sum else 0.0,
+    }
+    for name, part in sorted((recorder.classes or {}).items()):
+        hist = part.hists["ttft_ms"]
+        row[f"ttft_ms_{name}_p50"] = hist.percentile(50)
+        row[f"ttft_ms_{name}_mean"] = hist.mean
+    if scraper is not None:
+        server = scraper.stop()
+        row["server_hit_rate"] = _hit_rate(server)
+    return row
+
+
+def _grid(value: str) -> list[int]:
+    return [int(v) for v in value.split(",")]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Measure TTFT and prefill throughput of requests sharing prompt prefixes, "
+        "by prefix length, reuse and order."
+    )
+    parser.add_argument("--url", required=True)
+    parser.add_argument("--model")
+    parser.add_argument(
+        "--prefix-tokens", default="256,1024", help="Comma-separated shared prefix lengths"
+    )
+    parser.add_argument(
+        "--suffix-tokens", type=int, default=64, help="Unique tokens at the end of each request"
+    )
+    parser.add_argument(
+        "--reuse", default="1,8", help="Comma-separated requests per family (1: no sharing)"
+    )
+    parser.add_argument("--families", type=int, default=8, help="Families per cell")
+    parser.add_argument(
+        "--shots", type=int, default=0, help="Few-shot user/assistant pairs in each prefix"
+    )
+    parser.add_argument(
+        "--order", default="grouped,shuffled", help="Comma-separated: grouped, shuffled"
+    )
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument(
+        "--max-tokens", type=int, default=1, help="Completion tokens; only the first is timed"
+    )
+    parser.add_argument(
+        "--tokenizer", help="tokenizer.json, model directory or Hub id, for exact prompt lengths"
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--timeout", type=int, default=60)
+    parser.add_argument("--no-scrape", action="store_true", help="Skip the server's /metrics")
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+    orders = args.order.split(",")
+    if any(order not in ("grouped", "shuffled") for order in orders):
+        parser.error("--order takes grouped and/or shuffled")
+
+    api_url = _normalize_url(args.url)
+    sizer = _Sizer(args.tokenizer)
+    rng = random.Random(args.seed)
+    # Part of every prefix, so a rerun with the same --seed still starts with a cold cache.
+    run_id = uuid.uuid4().hex[:8]
+    stamp = datetime.now(timezone.utc)
+    out_path = (
+        Path(args.out)
+        if args.out
+        else Path("runs/perf") / f"prefix_cache_{stamp.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+
+    async def runner() -> tuple[str, list[dict[str, Any]]]:
+        async with httpx.AsyncClient() as client:
+            model = args.model or await _fetch_first_model(client, api_url, args.timeout)
+        rows = []
+        print(
+            f"{'prefix':>7}{'reuse':>6}{'share':>7} {'order':<9}{'ttft p50':>9}{'first':>8}"
+            f"{'repeat':>8}{'prefill tok/s':>15}{'hit rate':>10}"
+        )
+        for prefix_tokens in _grid(args.prefix_tokens):
+            for reuse in _grid(args.reuse):
+                for order in orders:
+                    cell = len(rows)
+                    requests = build_requests(
+                        rng,
+                        prefix_tokens,
+                        args.suffix_tokens,
+                        args.shots,
+                        args.families,
+                        reuse,
+                        order,
+                        args.max_tokens,
+                        f"run {run_id} cell {cell}",
+                        sizer,
+                    )
+                    share = prefix_tokens / (prefix_tokens + args.suffix_tokens)
+                    row = {
+                        "prefix_tokens": prefix_tokens,
+                        "suffix_tokens": args.suffix_tokens,
+                        "reuse": reuse,
+                        "order": order,
+                        # Fraction of each prompt that is shared, and of all prompt
+                        # tokens that a perfect cache would not recompute.
+                        "share_ratio": share,
+                        "reusable_ratio": share * (reuse - 1) / reuse,
+                        **await run_cell(args, api_url, model, requests),
+                    }
+                    rows.append(row)
+                    hit_rate = row.get("server_hit_rate")
+                    first, repeat = (
+                        f"{row[key]:>6.0f}ms" if key in row else f"{'-':>8}"
+                        for key in ("ttft_ms_first_p50", "ttft_ms_repeat_p50")
+                    )
+                    print(
+                        f"{prefix_tokens:>7}{reuse:>6}{share:>7.0%} {order:<9}"
+                        f"{row['ttft_ms_p50']:>7.0f}ms{first}{repeat}"
+                        f"{row['prefill_tokens_per_s']:>15.0f}"
+                        + (f"{hit_rate:>10.0%}" if hit_rate is not None else f"{'-':>10}")
+                    )
+        return model, rows
+
+    model, rows = asyncio.run(runner())
+    summary = {
+        "url": api_url,
+        "model": model,
+        "families": args.families,
+        "shots": args.shots,
+        "concurrency": args.concurrency,
+        "max_tokens": args.max_tokens,
+        "tokenizer": args.tokenizer,
+        "rows": rows,
+        "timestamp": stamp.isoformat(),
+    }
+    out_path.write_text(json.dumps(summary, ensure_ascii=True, indent=2) + "\n")
+    print(f"wrote {out_path}")
+
+
+if __name__ == "__main__":
+    main()
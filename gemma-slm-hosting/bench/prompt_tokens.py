@@ -0,0 +1,121 @@
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "src"))
+
+from gateway import codec  # noqa: E402
+from gateway.admission import estimate_prompt_tokens  # noqa: E402
+from gateway.tokens import PromptCounter, load_tokenizer  # noqa: E402
+
+SYSTEM_PROMPT = (
+    "You are a concise, helpful assistant for an internal support desk. Answer in plain "
+    "English, cite the relevant policy section when there is one, and say so when you do "
+    "not know. Never invent ticket numbers. "
+) * 8
+
+
+def _load_prompts(path: Path) -> list[str]:
+    prompts = []
+    with path.open("r", encoding="utf-8") as handle:
+        for line in handle:
+            line = line.strip()
+            if line:
+                prompts.append(json.loads(line)["prompt"])
+    return prompts
+
+
+def _chat(prompts: list[str], turns: int, reply_chars: int) -> list[bytes]:
+    """Bodies of one conversation as a client resends it, one request per turn."""
+    messages: list[dict[str, str]] = [{"role": "system", "content": SYSTEM_PROMPT}]
+    bodies = []
+    for i in range(turns):
+        messages.append({"role": "user", "content": prompts[i % len(prompts)]})
+        payload = {"model": "base", "messages": messages, "max_tokens": 256}
+        bodies.append(codec.dumps(payload))
+        reply = (f"Answer {i}: " + "lorem ipsum dolor sit amet ") * reply_chars
+        messages.append({"role": "assistant", "content": reply[:reply_chars]})
+    return bodies
+
+
+def _count_us(counter: PromptCounter | None, bodies: list[bytes], repeats: int) -> float:
+    """CPU per request; bodies are decoded up front so only counting is timed."""
+    elapsed = 0.0
+    for _ in range(repeats):
+        # Freshly decoded strings, like every request the gateway receives.
+        payloads = [codec.loads(raw) for raw in bodies]
+        start = time.process_time()
+        for payload in payloads:
+            if counter is None:
+                estimate_prompt_tokens(payload)
+            else:
+                counter.count(payload)
+        elapsed += time.process_time() - start
+    return elapsed / (repeats * len(bodies)) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="CPU cost of exact prompt token counts, cached and not, vs chars/4."
+    )
+    parser.add_argument(
+        "--tokenizer",
+        default="google/gemma-3-1b-it",
+        help="tokenizer.json path, model directory or Hub id",
+    )
+    parser.add_argument(
+        "--prompts", default=str(REPO_ROOT / "loadtest" / "workloads" / "prompts_long.jsonl")
+    )
+    parser.add_argument("--turns", default="1,8,32", help="Comma-separated conversation lengths")
+    parser.add_argument("--reply-chars", type=int, default=600)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    tokenizer = load_tokenizer(args.tokenizer)
+    prompts = _load_prompts(Path(args.prompts))
+    rows: list[dict[str, Any]] = []
+    for turns in (int(t) for t in args.turns.split(",")):
+        bodies = _chat(prompts, turns, args.reply_chars)
+        cold = PromptCounter(cache_entries=0)
+        warm = PromptCounter()
+        cold.tokenizer = warm.tokenizer = tokenizer
+        last = codec.loads(bodies[-1])
+        exact = cold.count(last)[0]
+        estimate = estimate_prompt_tokens(last)
+        row: dict[str, Any] = {
+            "turns": turns,
+            "prompt_tokens": exact,
+            "estimate_tokens": estimate,
+            "estimate_error": (estimate - exact) / exact,
+            "estimate_us": _count_us(None, bodies, args.repeats),
+            "uncached_us": _count_us(cold, bodies, args.repeats),
+            "cached_us": _count_us(warm, bodies, args.repeats),
+            "cache_hit_rate": warm.stats.hits / max(1, warm.stats.hits + warm.stats.misses),
+        }
+        rows.append(row)
+        print(
+            f"turns={turns:<4} tokens={exact:<6} estimate={estimate:<6} "
+            f"({row['estimate_error']:+.0%}) estimate={row['estimate_us']:.1f}us "
+            f"uncached={row['uncached_us']:.1f}us cached={row['cached_us']:.1f}us "
+            f"hit_rate={row['cache_hit_rate']:.2f}"
+        )
+
+    if args.out:
+        out_path = Path(args.out)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        summary = {
+            "tokenizer": args.tokenizer,
+            "rows": rows,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        }
+        out_path.write_text(json.dumps(summary, ensure_ascii=True, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
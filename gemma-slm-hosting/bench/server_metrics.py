@@ -0,0 +1,266 @@
+"""Scrape the backend's Prometheus ``/metrics`` while a benchmark runs.
+
+vLLM's own series say why a run was slow where the client can only say that
+it was: time in the queue, KV-cache usage, preemptions, running batch size.
+``Scraper`` polls ``/metrics`` from a thread next to the load generator and
+``summary()`` reduces the run window to one dict:
+
+- counters (``*_total``): the increase over the window and its rate per second
+- gauges: mean and max over the scrapes in the window, and the last value
+- histograms: the window's count, mean and p50/p95/p99, from the bucket
+  deltas (interpolated within a bucket, as Prometheus' ``histogram_quantile``)
+
+Series that differ only in labels other than ``le`` (``model_name``,
+``engine``, ``finished_reason``) are summed, so multi-engine servers report one
+number per metric. A server restart mid-run resets its counters; the window
+then counts from the restart.
+
+Only families whose name starts with ``prefix`` (``vllm:``) are parsed; the
+rest of the page (process and Python collectors, a few hundred lines on a real
+server) is skipped by a ``startswith`` check, so scraping every second costs
+well under a millisecond of client CPU.
+"""
+
+import math
+import threading
+import time
+from typing import Any
+
+import httpx
+
+PERCENTILES = (50, 95, 99)
+_HISTOGRAM_SUFFIXES = ("_bucket", "_sum", "_count")
+
+
+def parse(text: str, prefix: str = "vllm:") -> tuple[dict[str, str], dict[Any, float]]:
+    """``({family: type}, {sample: value})`` for the families starting with ``prefix``.
+
+    Samples are keyed by name, or by ``(name, le)`` for histogram buckets.
+    """
+    types: dict[str, str] = {}
+    samples: dict[Any, float] = {}
+    type_header = "# TYPE " + prefix
+    for line in text.splitlines():
+        if not line.startswith(prefix):
+            if line.startswith(type_header):
+                _, _, name, kind = line.split(" ", 3)
+                types[name] = kind.strip()
+            continue
+        brace = line.find("{")
+        if brace == -1:
+            name, _, rest = line.partition(" ")
+            labels = ""
+        else:
+            close = line.rfind("}")
+            name, labels, rest = line[:brace], line[brace + 1 : close], line[close + 1 :]
+        if name.endswith("_created"):
+            continue
+        # "value" or "value timestamp"
+        value = float(rest.split()[0])
+        key: Any = name
+        if name.endswith("_bucket"):
+            start = labels.find('le="')
+            if start != -1:
+                end = labels.index('"', start + 4)
+                key = (name, float(labels[start + 4 : end]))
+        samples[key] = samples.get(key, 0.0) + value
+    return types, samples
+
+
+def _family(sample: str, types: dict[str, str]) -> str:
+    for suffix in _HISTOGRAM_SUFFIXES + ("_total",):
+        if sample.endswith(suffix) and sample[: -len(suffix)] in types:
+            return sample[: -len(suffix)]
+    return sample
+
+
+def _histogram_quantile(buckets: list[tuple[float, float]], q: float) -> float:
+    """Quantile ``q`` (0-1) from cumulative ``(upper bound, count)`` pairs."""
+    total = buckets[-1][1]
+    if total <= 0:
+        return 0.0
+    rank = q * total
+    lower, below = 0.0, 0.0
+    for bound, cumulative in buckets:
+        if cumulative >= rank:
+            if math.isinf(bound):
+                # Past the last finite bucket: all that is known is the lower bound.
+                return lower
+            if cumulative == below:
+                return bound
+            return lower + (bound - lower) * (rank - below) / (cumulative - below)
+        lower, below = bound, cumulative
+    return lower
+
+
+class Scraper:
+    """Polls ``url`` every ``interval_s`` on a background thread.
+
+    The window starts at the first scrape at least ``warmup_s`` after
+    ``start()`` and ends at the scrape ``stop()`` takes. Only the window's two
+    ends and running gauge sums are kept, so memory does not grow with the run.
+    """
+
+    def __init__(
+        self, url: str, interval_s: float = 1.0, warmup_s: float = 0.0, prefix: str = "vllm:"
+    ) -> None:
+        self.url = url
+        self.interval_s = interval_s
+        self.warmup_s = warmup_s
+        self.prefix = prefix
+        self.types: dict[str, str] = {}
+        self.first: tuple[float, dict[Any, float]] | None = None
+        self.last: tuple[float, dict[Any, float]] | None = None
+        # gauge -> [sum, max, scrapes]
+        self.gauges: dict[str, list[float]] = {}
+        # Latest gauge values, for timeline rows.
+        self.current: dict[str, float] = {}
+        self.scrapes = 0
+        self.errors = 0
+        self.parse_ms = 0.0
+        self._client = httpx.Client(timeout=max(1.0, interval_s))
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._start = 0.0
+
+    def start(self) -> "Scraper":
+        self._start = time.monotonic()
+        self._thread = threading.Thread(target=self._loop, name="metrics-scraper", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> dict[str, Any]:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.scrape()
+        self._client.close()
+        return self.summary()
+
+    def _loop(self) -> None:
+        tick = 0
+        while True:
+            self.scrape()
+            tick += 1
+            delay = self._start + tick * self.interval_s - time.monotonic()
+            if self._stop.wait(max(0.0, delay)):
+                return
+
+    def scrape(self) -> None:
+        now = time.monotonic() - self._start
+        try:
+            response = self._client.get(self.url)
+            response.raise_for_status()
+        except httpx.HTTPError:
+            self.errors += 1
+            return
+        t0 = time.perf_counter()
+        types, samples = parse(response.text, self.prefix)
+        self.parse_ms += (time.perf_counter() - t0) * 1000.0
+        self.types.update(types)
+        self.scrapes += 1
+        gauges = {
+            name: value
+            for name, value in samples.items()
+            if isinstance(name, str) and self.types.get(name) == "gauge"
+        }
+        self.current = {name.removeprefix(self.prefix): value for name, value in gauges.items()}
+        if now < self.warmup_s and self.first is None:
+            # The latest warmup scrape is the baseline until the window opens.
+            self.last = (now, samples)
+            return
+        if self.first is None:
+            self.first = self.last or (now, samples)
+        self.last = (now, samples)
+        for name, value in gauges.items():
+            entry = self.gauges.setdefault(name, [0.0, -math.inf, 0])
+            entry[0] += value
+            entry[1] = max(entry[1], value)
+            entry[2] += 1
+
+    def summary(self) -> dict[str, Any]:
+        summary: dict[str, Any] = {
+            "url": self.url,
+            "scrapes": self.scrapes,
+            "scrape_errors": self.errors,
+            "parse_ms_mean": self.parse_ms / self.scrapes if self.scrapes else 0.0,
+        }
+        if self.first is None or self.last is None:
+            return summary
+        (t_first, first), (t_last, last) = self.first, self.last
+        window = t_last - t_first
+        summary["window_s"] = window
+
+        def delta(key: Any) -> float:
+            now, before = last.get(key, 0.0), first.get(key, 0.0)
+            # Counters only go down when the server restarts and they start over.
+            return now - before if now >= before else now
+
+        counters: dict[str, Any] = {}
+        buckets: dict[str, list[tuple[float, float]]] = {}
+        for key in last:
+            if isinstance(key, tuple):
+                family = _family(key[0], self.types)
+                buckets.setdefault(family, []).append((key[1], delta(key)))
+                continue
+            family = _family(key, self.types)
+            kind = self.types.get(family)
+            if kind == "counter":
+                d = delta(key)
+                counters[key.removeprefix(self.prefix)] = {
+                    "delta": d,
+                    "rate_per_s": d / window if window > 0 else 0.0,
+                }
+        summary["counters"] = counters
+        summary["gauges"] = {
+            name.removeprefix(self.prefix): {
+                "mean": total / n,
+                "max": peak,
+                "last": last.get(name, 0.0),
+            }
+            for name, (total, peak, n) in self.gauges.items()
+        }
+        histograms = {}
+        for family, pairs in buckets.items():
+            pairs.sort()
+            count = delta(f"{family}_count")
+            entry = {"count": count, "mean": delta(f"{family}_sum") / count if count else 0.0}
+            for pct in PERCENTILES:
+                entry[f"p{pct}"] = _histogram_quantile(pairs, pct / 100.0)
+            histograms[family.removeprefix(self.prefix)] = entry
+        summary["histograms"] = histograms
+        return summary
+
+
+def headline(server: dict[str, Any]) -> list[str]:
+    """A few lines pointing at the usual bottlenecks, for printing after a run."""
+    gauges = server.get("gauges", {})
+    counters = server.get("counters", {})
+    histograms = server.get("histograms", {})
+    lines = []
+    for name in ("num_requests_running", "num_requests_waiting"):
+        if name in gauges:
+            lines.append(
+                f"server_{name}_mean={gauges[name]['mean']:.1f} "
+                f"server_{name}_max={gauges[name]['max']:.0f}"
+            )
+    # vLLM v1 renamed the KV-cache gauge.
+    for name in ("kv_cache_usage_perc", "gpu_cache_usage_perc"):
+        if name in gauges:
+            lines.append(f"server_kv_cache_usage_max={gauges[name]['max']:.0%}")
+            break
+    if "num_preemptions_total" in counters:
+        lines.append(f"server_preemptions={counters['num_preemptions_total']['delta']:.0f}")
+    for name in ("generation_tokens_total", "prompt_tokens_total"):
+        if name in counters:
+            lines.append(
+                f"server_{name[: -len('_total')]}_per_s={counters[name]['rate_per_s']:.1f}"
+            )
+    for name in ("request_queue_time_seconds", "time_to_first_token_seconds"):
+        if name in histograms and histograms[name]["count"]:
+            hist = histograms[name]
+            lines.append(
+                f"server_{name}_mean={hist['mean'] * 1000:.0f}ms "
+                f"server_{name}_p95={hist['p95'] * 1000:.0f}ms"
+            )
+    return lines
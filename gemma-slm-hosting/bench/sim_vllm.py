@@ -0,0 +1,657 @@
+"""Stand-in for a vLLM OpenAI-compatible server, for CPU-only benchmarks.
+
+By default every request is timed on its own (``--latency-ms`` to the first
+token, ``--token-delay-ms`` per token), which is all the gateway overhead
+benchmarks need. With ``--engine`` requests go through a model of vLLM's
+continuous batching scheduler instead, so load curves look like a GPU's:
+
+- at most ``--max-num-seqs`` sequences run; the rest wait in a FCFS queue
+- every engine step costs ``--decode-ms``, stretched by ``--batch-slowdown`` per
+  extra running sequence, plus ``--prefill-ms-per-token`` for the prompt tokens
+  prefilled in that step
+- prompts are prefilled in chunks so that a step holds at most
+  ``--max-num-batched-tokens`` tokens, decodes first (chunked prefill)
+- a prompt's first token comes out of the step that finishes its prefill
+- a request whose client disconnects is aborted and leaves the batch
+- with ``--enable-prefix-caching``, prompt blocks computed before are reused
+  and skip prefill, as with vLLM's automatic prefix caching
+
+Prompt lengths are estimated from characters (no tokenizer), and requests that
+do not fit ``--max-model-len`` are rejected with 400, as vLLM does. Streams carry
+a ``usage`` chunk when ``stream_options.include_usage`` is set, and ``/metrics``
+exports the ``vllm:`` series dashboards and ``bench`` scrapers read.
+"""
+
+import argparse
+import asyncio
+import bisect
+import json
+import random
+import time
+import uuid
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+
+WORD = "tok"
+CHARS_PER_TOKEN = 4
+BLOCK_TOKENS = 16
+
+_LATENCY_BUCKETS = (
+    0.001, 0.005, 0.01, 0.02, 0.04, 0.06, 0.08, 0.1, 0.25, 0.5, 0.75, 1.0,
+    2.5, 5.0, 7.5, 10.0, 20.0, 40.0, 80.0,
+)  # fmt: skip
+
+
+def _prompt_tokens(payload: dict[str, Any]) -> int:
+    messages = payload.get("messages")
+    if isinstance(messages, list):
+        chars = 0
+        for message in messages:
+            content = message.get("content") if isinstance(message, dict) else None
+            if isinstance(content, list):
+                content = "".join(p.get("text", "") for p in content if isinstance(p, dict))
+            # Chat template tokens around every turn.
+            chars += len(content or "") + 5 * CHARS_PER_TOKEN
+        return max(1, chars // CHARS_PER_TOKEN)
+    prompt = payload.get("prompt")
+    if isinstance(prompt, list):
+        if prompt and all(isinstance(p, int) for p in prompt):
+            return len(prompt)
+        prompt = "".join(str(p) for p in prompt)
+    return max(1, len(str(prompt or "")) // CHARS_PER_TOKEN)
+
+
+def _prompt_blocks(payload: dict[str, Any]) -> tuple[int, ...]:
+    """Hashes of the prompt's full blocks, each chained to the ones before it.
+
+    Two prompts share the leading blocks where their rendered text agrees, so
+    equal hashes mean equal prefixes, as with vLLM's block hashes.
+    """
+    messages = payload.get("messages")
+    if isinstance(messages, list):
+        text = "".join(
+            f"<{m.get('role')}>{m.get('content')}" for m in messages if isinstance(m, dict)
+        )
+    else:
+        text = str(payload.get("prompt") or "")
+    size = BLOCK_TOKENS * CHARS_PER_TOKEN
+    blocks = []
+    block_hash = 0
+    for start in range(0, len(text) - size + 1, size):
+        block_hash = hash((block_hash, text[start : start + size]))
+        blocks.append(block_hash)
+    return tuple(blocks)
+
+
+def _error(status_code: int, message: str, err_type: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code,
+        content={
+            "object": "error",
+            "message": message,
+            "type": err_type,
+            "param": None,
+            "code": status_code,
+        },
+    )
+
+
+class _Histogram:
+    def __init__(self) -> None:
+        self.counts = [0] * (len(_LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.n = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(_LATENCY_BUCKETS, value)] += 1
+        self.total += value
+        self.n += 1
+
+    def render(self, name: str, labels: str) -> list[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(_LATENCY_BUCKETS, self.counts, strict=False):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.n}')
+        lines.append(f"{name}_sum{{{labels}}} {self.total}")
+        lines.append(f"{name}_count{{{labels}}} {self.n}")
+        return lines
+
+
+@dataclass
+class EngineConfig:
+    max_num_seqs: int = 128
+    max_num_batched_tokens: int = 2048
+    max_model_len: int = 2048
+    prefill_ms_per_token: float = 0.05
+    decode_ms: float = 8.0
+    batch_slowdown: float = 0.01
+    # Blocks kept for prefix caching (0 disables it); least recently used go first.
+    prefix_cache_blocks: int = 0
+
+
+@dataclass(eq=False)
+class Sequence:
+    prompt_tokens: int
+    max_tokens: int
+    arrival: float
+    blocks: tuple[int, ...] = ()
+    prefilled: int = 0
+    generated: int = 0
+    scheduled_at: float = 0.0
+    first_token_at: float = 0.0
+    finished: bool = False
+    aborted: bool = False
+    progress: asyncio.Event = field(default_factory=asyncio.Event)
+
+    @property
+    def context(self) -> int:
+        return self.prefilled + self.generated
+
+
+class Stats:
+    """What ``/metrics`` reports, for both timing modes."""
+
+    def __init__(self) -> None:
+        self.running = 0
+        self.waiting = 0
+        self.kv_usage = 0.0
+        self.prompt_tokens = 0
+        self.generation_tokens = 0
+        self.finished: dict[str, int] = {"length": 0, "abort": 0}
+        self.steps = 0
+        # Prompt tokens looked up in the prefix cache, and found there.
+        self.prefix_queries = 0
+        self.prefix_hits = 0
+        self.ttft = _Histogram()
+        self.tpot = _Histogram()
+        self.e2e = _Histogram()
+        self.queue = _Histogram()
+
+    def record(self, seq: Sequence, now: float) -> None:
+        self.prompt_tokens += seq.prompt_tokens
+        self.generation_tokens += seq.generated
+        self.finished["abort" if seq.aborted else "length"] += 1
+        if seq.aborted:
+            return
+        self.queue.observe(seq.scheduled_at - seq.arrival)
+        self.ttft.observe(seq.first_token_at - seq.arrival)
+        self.e2e.observe(now - seq.arrival)
+        if seq.generated > 1:
+            self.tpot.observe((now - seq.first_token_at) / (seq.generated - 1))
+
+    def render(self, model: str) -> str:
+        labels = f'model_name="{model}"'
+        lines = [
+            "# TYPE vllm:num_requests_running gauge",
+            f"vllm:num_requests_running{{{labels}}} {self.running}",
+            "# TYPE vllm:num_requests_waiting gauge",
+            f"vllm:num_requests_waiting{{{labels}}} {self.waiting}",
+            "# TYPE vllm:gpu_cache_usage_perc gauge",
+            f"vllm:gpu_cache_usage_perc{{{labels}}} {self.kv_usage}",
+            "# TYPE vllm:num_preemptions_total counter",
+            f"vllm:num_preemptions_total{{{labels}}} 0",
+            "# TYPE vllm:prompt_tokens_total counter",
+            f"vllm:prompt_tokens_total{{{labels}}} {self.prompt_tokens}",
+            "# TYPE vllm:generation_tokens_total counter",
+            f"vllm:generation_tokens_total{{{labels}}} {self.generation_tokens}",
+            "# TYPE vllm:engine_steps_total counter",
+            f"vllm:engine_steps_total{{{labels}}} {self.steps}",
+            "# TYPE vllm:prefix_cache_queries_total counter",
+            f"vllm:prefix_cache_queries_total{{{labels}}} {self.prefix_queries}",
+            "# TYPE vllm:prefix_cache_hits_total counter",
+            f"vllm:prefix_cache_hits_total{{{labels}}} {self.prefix_hits}",
+            "# TYPE vllm:request_success_total counter",
+        ]
+        for reason, count in self.finished.items():
+            lines.append(
+                f'vllm:request_success_total{{{labels},finished_reason="{reason}"}} {count}'
+            )
+        for name, hist in (
+            ("vllm:time_to_first_token_seconds", self.ttft),
+            ("vllm:time_per_output_token_seconds", self.tpot),
+            ("vllm:e2e_request_latency_seconds", self.e2e),
+            ("vllm:request_queue_time_seconds", self.queue),
+        ):
+            lines.append(f"# TYPE {name} histogram")
+            lines.extend(hist.render(name, labels))
+        return "\n".join(lines) + "\n"
+
+
+class Engine:
+    """Step loop modelled on vLLM's scheduler; one forward pass per ``step``."""
+
+    def __init__(self, config: EngineConfig, stats: Stats) -> None:
+        self.config = config
+        self.stats = stats
+        self.waiting: deque[Sequence] = deque()
+        self.running: list[Sequence] = []
+        self.cached: OrderedDict[int, None] = OrderedDict()
+        self._wake = asyncio.Event()
+
+    def submit(self, seq: Sequence) -> None:
+        self.waiting.append(seq)
+        self.stats.waiting = len(self.waiting)
+        self._wake.set()
+
+    def abort(self, seq: Sequence) -> None:
+        if seq.finished:
+            return
+        seq.aborted = True
+        if seq in self.waiting:
+            self.waiting.remove(seq)
+            self._finish(seq, time.monotonic())
+
+    def _finish(self, seq: Sequence, now: float) -> None:
+        seq.finished = True
+        seq.progress.set()
+        self.stats.record(seq, now)
+
+    def _schedule(self, now: float) -> tuple[list[Sequence], list[tuple[Sequence, int]]]:
+        """Decodes for every running sequence, then prefill chunks within the token budget."""
+        config = self.config
+        while self.waiting and len(self.running) < config.max_num_seqs:
+            seq = self.waiting.popleft()
+            seq.scheduled_at = now
+            if config.prefix_cache_blocks:
+                self._lookup(seq)
+            self.running.append(seq)
+        decodes = [seq for seq in self.running if seq.prefilled == seq.prompt_tokens]
+        budget = config.max_num_batched_tokens - len(decodes)
+        prefills = []
+        for seq in self.running:
+            if budget <= 0:
+                break
+            remaining = seq.prompt_tokens - seq.prefilled
+            if remaining:
+                chunk = min(remaining, budget)
+                prefills.append((seq, chunk))
+                budget -= chunk
+        return decodes, prefills
+
+    def _lookup(self, seq: Sequence) -> None:
+        """Skip the prefill of the leading blocks already in the cache."""
+        hits = 0
+        for block in seq.blocks:
+            if block not in self.cached:
+                break
+            self.cached.move_to_end(block)
+            hits += 1
+        # As in vLLM, the last prompt token is always computed, to produce logits.
+        seq.prefilled = min(hits * BLOCK_TOKENS, seq.prompt_tokens - 1)
+        self.stats.prefix_queries += seq.prompt_tokens
+        self.stats.prefix_hits += seq.prefilled
+
+    def _cache(self, seq: Sequence) -> None:
+        for block in seq.blocks:
+            self.cached[block] = None
+            self.cached.move_to_end(block)
+        while len(self.cached) > self.config.prefix_cache_blocks:
+            self.cached.popitem(last=False)
+
+    def _step_s(self, decodes: int, prefill_tokens: int) -> float:
+        config = self.config
+        batch = max(decodes, 1)
+        step_ms = config.decode_ms * (1 + config.batch_slowdown * (batch - 1))
+        return (step_ms + config.prefill_ms_per_token * prefill_tokens) / 1000.0
+
+    async def run(self) -> None:
+        next_step = time.monotonic()
+        while True:
+            for seq in self.running:
+                if seq.aborted:
+                    self._finish(seq, time.monotonic())
+            self.running = [seq for seq in self.running if not seq.finished]
+            if not self.running and not self.waiting:
+                self.stats.running = self.stats.waiting = 0
+                self._wake.clear()
+                await self._wake.wait()
+            # Steps are paced on a deadline; one that overran pushes the next back.
+            next_step = max(next_step, time.monotonic())
+            decodes, prefills = self._schedule(next_step)
+            self.stats.running = len(self.running)
+            self.stats.waiting = len(self.waiting)
+            next_step += self._step_s(len(decodes), sum(chunk for _, chunk in prefills))
+            await asyncio.sleep(max(0.0, next_step - time.monotonic()))
+            now = time.monotonic()
+            self.stats.steps += 1
+            for seq, chunk in prefills:
+                seq.prefilled += chunk
+                if seq.prefilled == seq.prompt_tokens and self.config.prefix_cache_blocks:
+                    self._cache(seq)
+                if seq.prefilled == seq.prompt_tokens and not seq.aborted:
+                    seq.first_token_at = now
+                    seq.generated = 1
+                    seq.progress.set()
+            for seq in decodes:
+                if not seq.aborted:
+                    seq.generated += 1
+                    seq.progress.set()
+            for seq in self.running:
+                if seq.aborted or seq.generated >= seq.max_tokens:
+                    self._finish(seq, now)
+            self.running = [seq for seq in self.running if not seq.finished]
+            capacity = self.config.max_num_seqs * self.config.max_model_len
+            self.stats.kv_usage = sum(seq.context for seq in self.running) / capacity
+
+
+async def _finished(seq: Sequence) -> None:
+    while not seq.finished:
+        await seq.progress.wait()
+        seq.progress.clear()
+
+
+async def _disconnected(request: Request) -> None:
+    # The body has been read, so receive() only returns once the client goes away.
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+
+def create_app(
+    models: list[str],
+    tokens: int,
+    latency_ms: float,
+    token_delay_ms: float,
+    error_rate: float = 0.0,
+    straggler_rate: float = 0.0,
+    straggler_ms: float = 0.0,
+    engine_config: EngineConfig | None = None,
+) -> FastAPI:
+    models = list(models)
+    stats = Stats()
+    engine = Engine(engine_config, stats) if engine_config is not None else None
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        task = asyncio.create_task(engine.run()) if engine is not None else None
+        yield
+        if task is not None:
+            task.cancel()
+
+    app = FastAPI(lifespan=lifespan)
+
+    @app.get("/v1/models")
+    def list_models() -> dict[str, Any]:
+        return {
+            "object": "list",
+            "data": [{"id": name, "object": "model", "owned_by": "sim"} for name in models],
+        }
+
+    @app.get("/metrics")
+    def metrics() -> Response:
+        return PlainTextResponse(stats.render(models[0]), media_type="text/plain; version=0.0.4")
+
+    async def _complete(request: Request, chat: bool) -> Response:
+        payload = await request.json()
+        if error_rate and random.random() < error_rate:
+            return JSONResponse(
+                status_code=503,
+                content={"error": {"message": "simulated failure", "type": "server_error"}},
+            )
+        model = payload.get("model", models[0])
+        if model not in models:
+            return JSONResponse(
+                status_code=404,
+                content={
+                    "error": {
+                        "message": f"The model `{model}` does not exist.",
+                        "type": "NotFoundError",
+                    }
+                },
+            )
+        requested = int(payload.get("max_completion_tokens") or payload.get("max_tokens") or 0)
+        # --tokens caps what is generated; the length check uses what was asked for.
+        n_tokens = max(1, min(requested or tokens, tokens))
+        prompt_tokens = _prompt_tokens(payload)
+        if engine is not None and prompt_tokens + requested > engine.config.max_model_len:
+            return _error(
+                400,
+                f"This model's maximum context length is {engine.config.max_model_len} tokens. "
+                f"However, you requested {prompt_tokens + requested} tokens ({prompt_tokens} in "
+                f"the messages, {requested} in the completion). Please reduce the length of the "
+                "messages or completion.",
+                "BadRequestError",
+            )
+        created = int(time.time())
+        req_id = f"{'chatcmpl' if chat else 'cmpl'}-{uuid.uuid4().hex}"
+        obj = "chat.completion" if chat else "text_completion"
+        chunk_obj = f"{obj}.chunk" if chat else obj
+        include_usage = bool((payload.get("stream_options") or {}).get("include_usage"))
+
+        def usage(completion_tokens: int) -> dict[str, int]:
+            return {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            }
+
+        def chunk(choices: list[dict[str, Any]], **extra: Any) -> str:
+            body = {
+                "id": req_id,
+                "object": chunk_obj,
+                "created": created,
+                "model": model,
+                "choices": choices,
+                **extra,
+            }
+            return f"data: {json.dumps(body)}\n\n"
+
+        def pieces(start: int, end: int) -> list[str]:
+            out = []
+            for i in range(start, end):
+                piece = WORD if i == 0 else f" {WORD}"
+                choice: dict[str, Any] = {"index": 0, "finish_reason": None}
+                if chat:
+                    choice["delta"] = {"content": piece}
+                else:
+                    choice["text"] = piece
+                out.append(chunk([choice]))
+            return out
+
+        def tail(generated: int) -> list[str]:
+            final = {"index": 0, "finish_reason": "length"}
+            final.update({"delta": {}} if chat else {"text": ""})
+            out = [chunk([final])]
+            if include_usage:
+                out.append(chunk([], usage=usage(generated)))
+            out.append("data: [DONE]\n\n")
+            return out
+
+        def whole(generated: int) -> JSONResponse:
+            text = " ".join([WORD] * generated)
+            choice: dict[str, Any] = {"index": 0, "finish_reason": "length"}
+            if chat:
+                choice["message"] = {"role": "assistant", "content": text}
+            else:
+                choice["text"] = text
+            return JSONResponse(
+                {
+                    "id": req_id,
+                    "object": obj,
+                    "created": created,
+                    "model": model,
+                    "choices": [choice],
+                    "usage": usage(generated),
+                }
+            )
+
+        if engine is not None:
+            blocks = _prompt_blocks(payload) if engine.config.prefix_cache_blocks else ()
+            seq = Sequence(prompt_tokens, n_tokens, time.monotonic(), blocks)
+            engine.submit(seq)
+            if not payload.get("stream"):
+                disconnect = asyncio.ensure_future(_disconnected(request))
+                finished = asyncio.ensure_future(_finished(seq))
+                try:
+                    await asyncio.wait((disconnect, finished), return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    disconnect.cancel()
+                    finished.cancel()
+                if not seq.finished:
+                    engine.abort(seq)
+                    return Response(status_code=499)
+                return whole(seq.generated)
+
+            async def engine_events() -> AsyncIterator[str]:
+                sent = 0
+                try:
+                    while True:
+                        await seq.progress.wait()
+                        seq.progress.clear()
+                        for piece in pieces(sent, seq.generated):
+                            yield piece
+                        sent = seq.generated
+                        if seq.finished:
+                            break
+                    for piece in tail(sent):
+                        yield piece
+                finally:
+                    engine.abort(seq)
+
+            return StreamingResponse(engine_events(), media_type="text/event-stream")
+
+        first_token_ms = latency_ms
+        if straggler_rate and random.random() < straggler_rate:
+            first_token_ms += straggler_ms
+        seq = Sequence(prompt_tokens, n_tokens, time.monotonic())
+        seq.scheduled_at = seq.arrival
+        stats.running += 1
+
+        def done() -> None:
+            stats.running -= 1
+            seq.generated = n_tokens
+            seq.first_token_at = seq.first_token_at or time.monotonic()
+            stats.record(seq, time.monotonic())
+
+        if not payload.get("stream"):
+            try:
+                await asyncio.sleep((first_token_ms + token_delay_ms * n_tokens) / 1000.0)
+            finally:
+                done()
+            return whole(n_tokens)
+
+        async def events() -> AsyncIterator[str]:
+            try:
+                await asyncio.sleep(first_token_ms / 1000.0)
+                seq.first_token_at = time.monotonic()
+                for i in range(n_tokens):
+                    if token_delay_ms:
+                        await asyncio.sleep(token_delay_ms / 1000.0)
+                    yield pieces(i, i + 1)[0]
+                for piece in tail(n_tokens):
+                    yield piece
+            finally:
+                done()
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    # Runtime LoRA management, as with VLLM_ALLOW_RUNTIME_LORA_UPDATING=True.
+    @app.post("/v1/load_lora_adapter")
+    async def load_lora_adapter(request: Request) -> Response:
+        name = (await request.json())["lora_name"]
+        if name in models:
+            return JSONResponse(status_code=400, content={"error": f"{name} already loaded"})
+        models.append(name)
+        return Response(f"Success: LoRA adapter '{name}' added successfully.")
+
+    @app.post("/v1/unload_lora_adapter")
+    async def unload_lora_adapter(request: Request) -> Response:
+        name = (await request.json())["lora_name"]
+        if name not in models:
+            return JSONResponse(status_code=404, content={"error": f"{name} not found"})
+        models.remove(name)
+        return Response(f"Success: LoRA adapter '{name}' removed successfully.")
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request) -> Response:
+        return await _complete(request, chat=True)
+
+    @app.post("/v1/completions")
+    async def completions(request: Request) -> Response:
+        return await _complete(request, chat=False)
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--model", action="append", dest="models")
+    parser.add_argument("--tokens", type=int, default=16, help="Cap on completion tokens")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--token-delay-ms", type=float, default=0.0)
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="Fraction of completions answered 503"
+    )
+    parser.add_argument(
+        "--straggler-rate", type=float, default=0.0, help="Fraction of completions delayed"
+    )
+    parser.add_argument("--straggler-ms", type=float, default=1000.0)
+    engine = parser.add_argument_group("continuous batching (--engine)")
+    engine.add_argument("--engine", action="store_true", help="Model vLLM's batch scheduler")
+    defaults = EngineConfig()
+    engine.add_argument("--max-num-seqs", type=int, default=defaults.max_num_seqs)
+    engine.add_argument(
+        "--max-num-batched-tokens", type=int, default=defaults.max_num_batched_tokens
+    )
+    engine.add_argument("--max-model-len", type=int, default=defaults.max_model_len)
+    engine.add_argument("--prefill-ms-per-token", type=float, default=defaults.prefill_ms_per_token)
+    engine.add_argument(
+        "--decode-ms", type=float, default=defaults.decode_ms, help="Step time at batch size 1"
+    )
+    engine.add_argument(
+        "--batch-slowdown",
+        type=float,
+        default=defaults.batch_slowdown,
+        help="Step time added per extra running sequence, as a fraction of --decode-ms",
+    )
+    engine.add_argument(
+        "--enable-prefix-caching",
+        action="store_true",
+        help=f"Reuse computed {BLOCK_TOKENS}-token prompt blocks, as vLLM does",
+    )
+    engine.add_argument(
+        "--prefix-cache-blocks",
+        type=int,
+        help="Blocks the prefix cache holds (default: --max-num-seqs x --max-model-len worth)",
+    )
+    args = parser.parse_args()
+
+    engine_config = None
+    if args.engine:
+        engine_config = EngineConfig(
+            max_num_seqs=args.max_num_seqs,
+            max_num_batched_tokens=args.max_num_batched_tokens,
+            max_model_len=args.max_model_len,
+            prefill_ms_per_token=args.prefill_ms_per_token,
+            decode_ms=args.decode_ms,
+            batch_slowdown=args.batch_slowdown,
+        )
+        if args.enable_prefix_caching:
+            engine_config.prefix_cache_blocks = args.prefix_cache_blocks or (
+                args.max_num_seqs * args.max_model_len // BLOCK_TOKENS
+            )
+    app = create_app(
+        models=args.models or ["google/gemma-3-1b-it", "ft"],
+        tokens=args.tokens,
+        latency_ms=args.latency_ms,
+        token_delay_ms=args.token_delay_ms,
+        error_rate=args.error_rate,
+        straggler_rate=args.straggler_rate,
+        straggler_ms=args.straggler_ms,
+        engine_config=engine_config,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
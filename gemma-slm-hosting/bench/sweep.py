@@ -0,0 +1,275 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from perf import (  # noqa: E402
+    _arrivals,
+    _fetch_first_model,
+    _load_workload,
+    _normalize_url,
+    _run_open_loop,
+    _run_perf,
+    _summarize,
+    _summarize_open_loop,
+)
+from server_metrics import Scraper  # noqa: E402
+from workload import Workload  # noqa: E402
+
+
+def _parse_targets(values: list[str]) -> dict[str, str]:
+    targets = {}
+    for value in values:
+        name, sep, url = value.partition("=")
+        if not sep or not name or not url:
+            raise ValueError(f"Targets must be NAME=URL, got {value!r}")
+        targets[name] = _normalize_url(url)
+    return targets
+
+
+class Sweep:
+    """Runs one load level at a time against one target and checks it against the SLO."""
+
+    def __init__(self, args: argparse.Namespace, url: str, model: str, workload: Workload) -> None:
+        self.args = args
+        self.url = url
+        self.model = model
+        self.workload = workload
+        self.points: dict[float, dict[str, Any]] = {}
+
+    async def measure(self, load: float) -> dict[str, Any]:
+        if load in self.points:
+            return self.points[load]
+        args = self.args
+        common = {
+            "api_url": self.url,
+            "model": self.model,
+            # Every level draws the same sequence of requests.
+            "workload": self.workload.reseeded(0),
+            "timeout": args.timeout,
+            "stream": args.stream,
+        }
+        scraper = None
+        if not args.no_scrape:
+            scraper = Scraper(f"{self.url}/metrics", args.scrape_interval).start()
+        if args.axis == "concurrency":
+            concurrency = int(load)
+            recorder, elapsed = await _run_perf(
+                total_requests=max(args.requests_per_point, concurrency * 2),
+                concurrency=concurrency,
+                **common,
+            )
+            summary = _summarize(recorder, elapsed, args.stream)
+        else:
+            # Two halves: the second shows whether responses keep up once the level is running.
+            steps = [(load, args.seconds_per_point / 2)] * 2
+            recorder, step_stats, elapsed = await _run_open_loop(
+                arrivals=_arrivals(steps, args.arrival, args.seed), steps=steps, **common
+            )
+            summary = _summarize(recorder, elapsed, args.stream)
+            summary.update(_summarize_open_loop(recorder, step_stats))
+            summary.pop("steps")
+        if scraper is not None:
+            summary["server"] = scraper.stop()
+
+        total = summary["success_count"] + summary["error_count"]
+        error_rate = summary["error_count"] / total if total else 1.0
+        observed = summary.get(f"{args.slo_metric}_p95", 0.0)
+        passed = error_rate <= args.slo_error_rate and observed <= args.slo_p95_ms
+        if args.axis == "rate":
+            # A short level can end before the queue grows enough to break the latency
+            # SLO; a server that cannot keep up with the offered load fails regardless.
+            second = step_stats[1]
+            sent = second.sent.success + second.sent.errors
+            passed = passed and second.completed >= args.min_achieved * sent
+        point = {args.axis: load, "error_rate": error_rate, "passed": passed, **summary}
+        self.points[load] = point
+        print(
+            f"{args.axis}={load:g} rps={summary['throughput_rps']:.2f} "
+            f"{args.slo_metric}_p95={observed:.0f}ms errors={error_rate:.1%} "
+            f"{'ok' if point['passed'] else 'SLO violated'}"
+        )
+        return point
+
+    async def grid(self, loads: list[float]) -> None:
+        for load in loads:
+            if not (await self.measure(load))["passed"]:
+                break
+
+    async def bisect(self, low: float, high: float, resolution: float) -> None:
+        """Largest passing load in [low, high], assuming latency grows with load."""
+        if not (await self.measure(low))["passed"] or (await self.measure(high))["passed"]:
+            return
+        while high - low > resolution:
+            mid = (low + high) / 2
+            if self.args.axis == "concurrency":
+                mid = float(int(mid))
+                if mid in (low, high):
+                    break
+            if (await self.measure(mid))["passed"]:
+                low = mid
+            else:
+                high = mid
+
+    def report(self) -> dict[str, Any]:
+        curve = [self.points[load] for load in sorted(self.points)]
+        passing = [p for p in curve if p["passed"]]
+        best = passing[-1] if passing else None
+        return {
+            "url": self.url,
+            "model": self.model,
+            "curve": curve,
+            "max_sustainable": None
+            if best is None
+            else {
+                self.args.axis: best[self.args.axis],
+                "throughput_rps": best["throughput_rps"],
+                f"{self.args.slo_metric}_p95": best.get(f"{self.args.slo_metric}_p95"),
+                "output_tokens_per_s": best.get("output_tokens_per_s"),
+            },
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Ramp concurrency or offered RPS until p95 latency or the error rate "
+        "breaks the SLO; writes the throughput/latency curve of every target to one file."
+    )
+    parser.add_argument(
+        "--target",
+        action="append",
+        default=[],
+        help="NAME=URL, repeatable (default: base=$BASE_API_URL and ft=$FT_API_URL)",
+    )
+    parser.add_argument("--prompts", default="data/prompts.jsonl")
+    parser.add_argument("--workload", help="Workload mix spec (see bench/workload.py)")
+    parser.add_argument("--model", help="Model name (default: first from each /v1/models)")
+    parser.add_argument("--axis", choices=("concurrency", "rate"), default="concurrency")
+    parser.add_argument(
+        "--grid", default="1,2,4,8,16,32,64,128", help="Comma-separated load levels, low to high"
+    )
+    parser.add_argument(
+        "--bisect",
+        metavar="LOW:HIGH",
+        help="Binary-search the knee in LOW:HIGH instead of walking --grid",
+    )
+    parser.add_argument(
+        "--resolution", type=float, default=1.0, help="Bisection stops at this load gap"
+    )
+    parser.add_argument("--slo-p95-ms", type=float, default=2000.0)
+    parser.add_argument(
+        "--slo-metric",
+        choices=("latency_ms", "ttft_ms"),
+        default="latency_ms",
+        help="Which p95 the SLO applies to (ttft_ms needs --stream)",
+    )
+    parser.add_argument("--slo-error-rate", type=float, default=0.01)
+    parser.add_argument(
+        "--requests-per-point",
+        type=int,
+        default=100,
+        help="Concurrency axis: requests per level (at least 2x the concurrency)",
+    )
+    parser.add_argument(
+        "--seconds-per-point", type=float, default=30.0, help="Rate axis: seconds per level"
+    )
+    parser.add_argument(
+        "--min-achieved",
+        type=float,
+        default=0.9,
+        help="Rate axis: a level fails if, over its second half, fewer responses than this "
+        "fraction of the requests sent come back",
+    )
+    parser.add_argument("--arrival", choices=("poisson", "constant"), default="poisson")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--temperature", type=float, default=0.0)
+    parser.add_argument("--max-tokens", type=int, default=128)
+    parser.add_argument("--timeout", type=int, default=60)
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument(
+        "--scrape-interval",
+        type=float,
+        default=1.0,
+        help="Seconds between scrapes of each target's /metrics during a level",
+    )
+    parser.add_argument("--no-scrape", action="store_true")
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+    if args.slo_metric == "ttft_ms" and not args.stream:
+        parser.error("--slo-metric ttft_ms needs --stream")
+
+    try:
+        targets = _parse_targets(args.target)
+    except ValueError as exc:
+        parser.error(str(exc))
+    if not targets:
+        for name, env in (("base", "BASE_API_URL"), ("ft", "FT_API_URL")):
+            if os.getenv(env):
+                targets[name] = _normalize_url(os.environ[env])
+    if not targets:
+        parser.error("no --target given and BASE_API_URL/FT_API_URL are unset")
+    if args.bisect:
+        low, _, high = args.bisect.partition(":")
+        try:
+            bounds = (float(low), float(high))
+            if not bounds[0] < bounds[1]:
+                raise ValueError
+        except ValueError:
+            parser.error("--bisect takes LOW:HIGH with LOW < HIGH")
+    else:
+        loads = [float(v) for v in args.grid.split(",")]
+    workload = _load_workload(args)
+    stamp = datetime.now(timezone.utc)
+    out_path = (
+        Path(args.out)
+        if args.out
+        else Path("runs/perf") / f"sweep_{stamp.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+
+    async def runner() -> dict[str, Any]:
+        reports = {}
+        for name, url in targets.items():
+            async with httpx.AsyncClient() as client:
+                model = args.model or await _fetch_first_model(client, url, args.timeout)
+            print(f"== {name} {url} model={model}")
+            sweep = Sweep(args, url, model, workload)
+            if args.bisect:
+                await sweep.bisect(*bounds, args.resolution)
+            else:
+                await sweep.grid(loads)
+            reports[name] = sweep.report()
+            best = reports[name]["max_sustainable"]
+            print(
+                f"{name}: max sustainable {args.axis}="
+                + ("none (lowest level broke the SLO)" if best is None else f"{best[args.axis]:g}")
+            )
+        return reports
+
+    summary = {
+        "axis": args.axis,
+        "slo": {
+            "metric": f"{args.slo_metric}_p95",
+            "threshold_ms": args.slo_p95_ms,
+            "error_rate": args.slo_error_rate,
+        },
+        "stream": args.stream,
+        "max_tokens": args.max_tokens,
+        **({"workload": args.workload} if args.workload else {}),
+        "targets": asyncio.run(runner()),
+        "timestamp": stamp.isoformat(),
+    }
+    out_path.write_text(json.dumps(summary, ensure_ascii=True, indent=2) + "\n")
+    print(f"wrote {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections.abc import Sequence
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+from opentelemetry.sdk.trace import ReadableSpan
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "src"))
+
+from gateway.metrics import PROBE_KEY, GatewayMetrics, MetricsMiddleware  # noqa: E402
+from gateway.tracing import TRACE_KEY, Tracing, TracingMiddleware  # noqa: E402
+
+BACKEND = "http://127.0.0.1:8000"
+
+
+class _CountingExporter(SpanExporter):
+    """Drops spans after counting them, so only the gateway side is measured."""
+
+    def __init__(self) -> None:
+        self.spans = 0
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        self.spans += len(spans)
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        return None
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = (len(values) - 1) * (pct / 100.0)
+    f = int(k)
+    c = min(f + 1, len(values) - 1)
+    if f == c:
+        return values[f]
+    d = k - f
+    return values[f] + (values[c] - values[f]) * d
+
+
+def _sse_chunks(tokens: int) -> list[bytes]:
+    chunks = [
+        b'data: {"choices":[{"index":0,"delta":{"content":"tok"},"finish_reason":null}]}\n\n'
+        for _ in range(tokens)
+    ]
+    chunks.append(b"data: [DONE]\n\n")
+    return chunks
+
+
+def _make_app(chunks: list[bytes]) -> Any:
+    """Canned SSE endpoint that stamps the trace the way the proxy path does."""
+    start = {
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"text/event-stream")],
+    }
+
+    async def app(scope: dict[str, Any], receive: Any, send: Any) -> None:
+        probe = scope.get(PROBE_KEY)
+        if probe is not None:
+            probe.begin("ft")
+            probe.backend = BACKEND
+        trace = scope.get(TRACE_KEY)
+        if trace is not None:
+            trace.model = "ft"
+            trace.queued = trace.admitted = time.time_ns()
+            attempt = trace.attempt(BACKEND, time.time_ns())
+            trace.traceparent()
+            attempt.headers = time.time_ns()
+            attempt.status = 200
+        await send(start)
+        for chunk in chunks:
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+        if trace is not None:
+            attempt.end = time.time_ns()
+
+    return app
+
+
+def _traced(inner: Any, metrics: GatewayMetrics, tracing: Tracing | None) -> Any:
+    """The gateway's stack: metrics outside, tracing inside."""
+    wrapped = MetricsMiddleware(TracingMiddleware(inner))
+    wrapped.state_holder = SimpleNamespace(state=SimpleNamespace(metrics=metrics, tracing=tracing))
+    return wrapped
+
+
+async def _run(app: Any, requests: int) -> list[float]:
+    async def receive() -> dict[str, Any]:
+        return {"type": "http.disconnect"}
+
+    async def send(message: dict[str, Any]) -> None:
+        return None
+
+    samples: list[float] = []
+    for _ in range(requests):
+        scope = {
+            "type": "http",
+            "path": "/v1/chat/completions",
+            "headers": [(b"content-type", b"application/json")],
+            "app": app.state_holder,
+        }
+        t0 = time.perf_counter()
+        await app(scope, receive, send)
+        samples.append((time.perf_counter() - t0) * 1e6)
+    return samples
+
+
+def _summarize(samples: list[float]) -> dict[str, float]:
+    return {f"p{p}": _percentile(samples, p) for p in (50, 95, 99)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Per-request CPU cost of gateway tracing, off vs sampled out vs kept "
+        "(metrics on throughout, as in the gateway)."
+    )
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--warmup", type=int, default=1000)
+    parser.add_argument("--tokens", type=int, default=64, help="SSE chunks per request")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    inner = _make_app(_sse_chunks(args.tokens))
+    metrics = GatewayMetrics()
+    exporter = _CountingExporter()
+    processor = BatchSpanProcessor(exporter)
+    variants = {
+        "off": _traced(inner, metrics, None),
+        # Sampled out: timestamps are taken, no spans are built.
+        "dropped": _traced(inner, metrics, Tracing(processor, 0.0, 3600.0, 3600.0)),
+        # Every request kept: spans built and queued for the export thread.
+        "kept": _traced(inner, metrics, Tracing(processor, 1.0, 3600.0, 3600.0)),
+    }
+    for app in variants.values():
+        asyncio.run(_run(app, args.warmup))
+    # Interleave the variants so drift (GC, histogram growth) hits all of them alike.
+    samples: dict[str, list[float]] = {name: [] for name in variants}
+    for _ in range(args.rounds):
+        for name, app in variants.items():
+            samples[name].extend(asyncio.run(_run(app, args.requests // args.rounds)))
+    processor.shutdown()
+    results = {name: _summarize(values) for name, values in samples.items()}
+
+    overhead = {
+        name: {p: results[name][p] - results["off"][p] for p in results["off"]}
+        for name in ("dropped", "kept")
+    }
+    summary = {
+        "requests": args.requests,
+        "tokens_per_request": args.tokens,
+        "latency_us": results,
+        "overhead_us": overhead,
+        "spans_exported": exporter.spans,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+    for pct in ("p50", "p95", "p99"):
+        print(
+            f"{pct}: off={results['off'][pct]:.1f}us "
+            f"dropped={results['dropped'][pct]:.1f}us (+{overhead['dropped'][pct]:.1f}) "
+            f"kept={results['kept'][pct]:.1f}us (+{overhead['kept'][pct]:.1f})"
+        )
+    print(f"spans exported: {exporter.spans}")
+    if args.out:
+        out_path = Path(args.out)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_text(json.dumps(summary, ensure_ascii=True, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
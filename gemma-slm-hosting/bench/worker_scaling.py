@@ -0,0 +1,238 @@
+"""Gateway throughput vs worker count against a stand-in backend (no GPU needed).
+
+For each worker count the gateway is started with ``python -m gateway.server``,
+driven closed-loop at ``--concurrency`` for ``--duration`` seconds, and stopped.
+Cache and coalescing are off so every request is proxied.
+
+The load generator, ``bench/sim_vllm.py`` and the gateway all need CPU. For a
+meaningful curve give the gateway its own cores with ``--gateway-cpus`` and
+keep the client and backend on the others; on a single-core box every worker
+competes with them and the numbers only show the per-process overhead.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = (len(values) - 1) * (pct / 100.0)
+    f = int(k)
+    c = min(f + 1, len(values) - 1)
+    if f == c:
+        return values[f]
+    d = k - f
+    return values[f] + (values[c] - values[f]) * d
+
+
+def _parse_cpus(spec: str) -> set[int]:
+    """``"2-5,8"`` -> ``{2, 3, 4, 5, 8}``."""
+    cpus: set[int] = set()
+    for part in spec.split(","):
+        if "-" in part:
+            lo, hi = part.split("-")
+            cpus.update(range(int(lo), int(hi) + 1))
+        elif part:
+            cpus.add(int(part))
+    return cpus
+
+
+def _spawn(
+    cmd: list[str], env: dict[str, str] | None = None, cpus: set[int] | None = None
+) -> subprocess.Popen:
+    preexec: Callable[[], None] | None = None
+    if cpus:
+        preexec = lambda: os.sched_setaffinity(0, cpus)  # noqa: E731
+    return subprocess.Popen(
+        cmd,
+        cwd=REPO_ROOT,
+        env={**os.environ, **(env or {})},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        preexec_fn=preexec,
+    )
+
+
+def _wait_ready(url: str, timeout_seconds: float = 30.0) -> None:
+    deadline = time.time() + timeout_seconds
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server not ready at {url} after {timeout_seconds}s")
+
+
+def _stop(proc: subprocess.Popen) -> None:
+    proc.terminate()
+    try:
+        proc.wait(timeout=40)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+async def _drive(
+    url: str,
+    payload: dict[str, Any],
+    concurrency: int,
+    warmup_s: float,
+    duration_s: float,
+) -> dict[str, Any]:
+    """Closed-loop load; only requests that start after the warmup are counted."""
+    latencies: list[float] = []
+    errors = 0
+    start = time.perf_counter()
+    measure_from = start + warmup_s
+    stop_at = measure_from + duration_s
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(timeout=60, limits=limits) as client:
+
+        async def user() -> None:
+            nonlocal errors
+            while True:
+                t0 = time.perf_counter()
+                if t0 >= stop_at:
+                    return
+                try:
+                    if payload.get("stream"):
+                        async with client.stream("POST", url, json=payload) as response:
+                            async for _ in response.aiter_raw():
+                                pass
+                    else:
+                        response = await client.post(url, json=payload)
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if t0 < measure_from:
+                    continue
+                if ok:
+                    latencies.append((time.perf_counter() - t0) * 1000.0)
+                else:
+                    errors += 1
+
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+    elapsed = max(time.perf_counter() - measure_from, 1e-9)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": _percentile(latencies, 50),
+        "p99_ms": _percentile(latencies, 99),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Gateway RPS vs worker count against a stand-in backend."
+    )
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds per run")
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--max-tokens", type=int, default=16)
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--backend-url", help="Existing backend; default spawns bench/sim_vllm.py")
+    parser.add_argument("--backend-port", type=int, default=18000)
+    parser.add_argument("--gateway-port", type=int, default=18080)
+    parser.add_argument("--gateway-cpus", default="", help="CPU list for the gateway, e.g. 2-5")
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    cpus = _parse_cpus(args.gateway_cpus) if args.gateway_cpus else None
+    payload = {
+        "model": "ft",
+        "messages": [{"role": "user", "content": "Say hello in one sentence."}],
+        "temperature": 0,
+        "max_tokens": args.max_tokens,
+        "stream": args.stream,
+    }
+    rows: list[dict[str, Any]] = []
+    with ExitStack() as stack:
+        backend_url = args.backend_url
+        if not backend_url:
+            backend_url = f"http://127.0.0.1:{args.backend_port}"
+            proc = _spawn([sys.executable, "bench/sim_vllm.py", "--port", str(args.backend_port)])
+            stack.callback(_stop, proc)
+        _wait_ready(f"{backend_url}/v1/models")
+
+        gateway_url = f"http://127.0.0.1:{args.gateway_port}"
+        for workers in (int(w) for w in args.workers.split(",")):
+            proc = _spawn(
+                [
+                    sys.executable,
+                    "-m",
+                    "gateway.server",
+                    "--port",
+                    str(args.gateway_port),
+                    "--workers",
+                    str(workers),
+                    "--log-level",
+                    "warning",
+                ],
+                env={
+                    "PYTHONPATH": str(REPO_ROOT / "src"),
+                    "BASE_API_URL": backend_url,
+                    "FT_API_URL": backend_url,
+                    "GATEWAY_CACHE_ENABLED": "0",
+                    "GATEWAY_COALESCE_ENABLED": "0",
+                },
+                cpus=cpus,
+            )
+            try:
+                _wait_ready(f"{gateway_url}/health")
+                row = asyncio.run(
+                    _drive(
+                        f"{gateway_url}/v1/chat/completions",
+                        payload,
+                        args.concurrency,
+                        args.warmup,
+                        args.duration,
+                    )
+                )
+            finally:
+                _stop(proc)
+            row = {"workers": workers, **row}
+            row["rps_per_worker"] = row["rps"] / workers
+            rows.append(row)
+            print(
+                f"workers={workers:<3} rps={row['rps']:.0f} p50={row['p50_ms']:.1f}ms "
+                f"p99={row['p99_ms']:.1f}ms errors={row['errors']}"
+            )
+
+    summary = {
+        "backend_url": backend_url,
+        "stream": args.stream,
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "gateway_cpus": sorted(cpus) if cpus else None,
+        "host_cpus": os.cpu_count(),
+        "rows": rows,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+    if args.out:
+        out_path = Path(args.out)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_text(json.dumps(summary, ensure_ascii=True, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
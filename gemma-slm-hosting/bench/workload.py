@@ -0,0 +1,251 @@
+"""Workload mixes for bench/perf.py: weighted request classes from files or generated.
+
+A spec is a JSON file::
+
+    {
+      "seed": 0,
+      "tokenizer": "google/gemma-3-1b-it",
+      "classes": [
+        {"name": "chat", "weight": 6, "source": "data/prompts.jsonl", "max_tokens": 128},
+        {"name": "short", "weight": 3, "source": "loadtest/workloads/prompts_short.jsonl",
+         "max_tokens": 32, "temperature": 0.7},
+        {"name": "long", "weight": 1, "synthetic": {
+          "input_tokens": {"dist": "lognormal", "median": 800, "sigma": 0.5, "max": 1600},
+          "output_tokens": {"dist": "uniform", "min": 100, "max": 300}}}
+      ]
+    }
+
+Each request picks a class by weight. File sources may use either prompt
+schema in the repo: ``{"messages": [...]}`` or ``{"prompt": "..."}``.
+Synthetic classes generate prompts whose lengths follow ``input_tokens``, and
+request ``output_tokens`` by setting both ``max_tokens`` and vLLM's
+``min_tokens``, so the completion length follows the distribution too.
+Lengths are distributions: ``fixed`` (``value``), ``uniform`` (``min``,
+``max``), ``normal`` (``mean``, ``std``) or ``lognormal`` (``median``,
+``sigma``), clipped to ``min``/``max``.
+
+Generated text is sized at the gateway's four characters per token unless
+``tokenizer`` names the model's tokenizer (a ``tokenizer.json`` path, model
+directory or Hub id), in which case every prompt is measured and trimmed to
+its target.
+"""
+
+import json
+import math
+import random
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Roughly what the chat template adds around one user message (see gateway/tokens.py).
+_TEMPLATE_TOKENS = 9
+_CHARS_PER_TOKEN = 4.0
+_WORDS = (
+    "the service request queue latency model token cache memory batch server client "
+    "response stream prompt answer question summary report policy support ticket user "
+    "account network storage compute budget forecast review release change incident "
+    "metric dashboard alert schedule window region replica shard index query result "
+    "customer invoice order shipment warehouse inventory supplier contract payment "
+    "quickly carefully often rarely always never mostly partly clearly briefly "
+    "explain describe compare list outline draft rewrite check verify estimate plan "
+    "about after before during within without between across under over into from"
+).split()
+
+
+@dataclass
+class Lengths:
+    dist: str
+    params: dict[str, float]
+    low: int = 1
+    high: int | None = None
+
+    @classmethod
+    def from_spec(cls, spec: dict[str, Any]) -> "Lengths":
+        spec = dict(spec)
+        dist = spec.pop("dist", "fixed")
+        if dist not in ("fixed", "uniform", "normal", "lognormal"):
+            raise ValueError(f"Unknown length distribution {dist!r}")
+        low = int(spec.pop("min", 1))
+        high = spec.pop("max", None)
+        return cls(dist, spec, low, None if high is None else int(high))
+
+    def sample(self, rng: random.Random) -> int:
+        p = self.params
+        if self.dist == "fixed":
+            value = p["value"]
+        elif self.dist == "uniform":
+            value = rng.uniform(self.low, self.high if self.high is not None else self.low)
+        elif self.dist == "normal":
+            value = rng.gauss(p["mean"], p["std"])
+        else:
+            value = rng.lognormvariate(math.log(p["median"]), p["sigma"])
+        value = max(self.low, round(value))
+        return value if self.high is None else min(self.high, value)
+
+
+@dataclass
+class WorkloadClass:
+    name: str
+    weight: float
+    prompts: list[list[dict[str, Any]]]
+    max_tokens: int
+    temperature: float
+    output_tokens: Lengths | None = None
+
+
+def _read_source(path: Path) -> list[list[dict[str, Any]]]:
+    prompts = []
+    with path.open("r", encoding="utf-8") as handle:
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            data = json.loads(line)
+            if "messages" in data:
+                prompts.append(data["messages"])
+            elif "prompt" in data:
+                prompts.append([{"role": "user", "content": data["prompt"]}])
+            else:
+                raise ValueError(f"{path}: each line needs 'messages' or 'prompt'")
+    if not prompts:
+        raise ValueError(f"No prompts found in {path}")
+    return prompts
+
+
+class _Sizer:
+    """Counts tokens of generated text with the model tokenizer, or estimates them."""
+
+    def __init__(self, tokenizer: str | None) -> None:
+        self.tokenizer = None
+        if tokenizer:
+            sys.path.insert(0, str(REPO_ROOT / "src"))
+            from gateway.tokens import load_tokenizer
+
+            self.tokenizer = load_tokenizer(tokenizer)
+
+    def count(self, text: str) -> int:
+        if self.tokenizer is None:
+            return max(1, round(len(text) / _CHARS_PER_TOKEN))
+        return len(self.tokenizer.encode(text, add_special_tokens=False))
+
+
+def _synthetic_text(rng: random.Random, tokens: int, sizer: _Sizer) -> str:
+    """Random words (no two texts share a prefix worth caching) sized to ``tokens``."""
+    target = max(1, tokens)
+    words: list[str] = []
+    chars = 0
+    while chars < target * _CHARS_PER_TOKEN * 1.5:
+        word = rng.choice(_WORDS)
+        words.append(word)
+        chars += len(word) + 1
+    # Binary search the word count whose token count is closest to the target.
+    low, high = 1, len(words)
+    while low < high:
+        mid = (low + high) // 2
+        if sizer.count(" ".join(words[:mid])) < target:
+            low = mid + 1
+        else:
+            high = mid
+    return " ".join(words[:low])
+
+
+class Workload:
+    """Draws request bodies from weighted classes.
+
+    Draws are sequential from ``seed``, so a run is repeatable for a given
+    order of requests. A workload of one file-backed class cycles through the
+    file in order instead, so a short run still sends every prompt.
+    """
+
+    def __init__(self, classes: list[WorkloadClass], seed: int = 0) -> None:
+        if not classes:
+            raise ValueError("A workload needs at least one class")
+        self.classes = classes
+        self.seed = seed
+        self._rng = random.Random(seed)
+        self._cumulative = []
+        total = 0.0
+        for wc in classes:
+            total += wc.weight
+            self._cumulative.append(total)
+
+    @property
+    def names(self) -> list[str]:
+        return [wc.name for wc in self.classes]
+
+    def reseeded(self, offset: int) -> "Workload":
+        """The same mix with its own sequence, for one of several workers."""
+        return Workload(self.classes, self.seed + offset)
+
+    def request(self, idx: int) -> tuple[str, dict[str, Any]]:
+        """The class and body fields (all but ``model``) of request ``idx``."""
+        if len(self.classes) == 1 and self.classes[0].output_tokens is None:
+            wc = self.classes[0]
+            messages = wc.prompts[(idx + self.seed) % len(wc.prompts)]
+        else:
+            wc = self._rng.choices(self.classes, cum_weights=self._cumulative)[0]
+            messages = wc.prompts[self._rng.randrange(len(wc.prompts))]
+        body: dict[str, Any] = {
+            "messages": messages,
+            "temperature": wc.temperature,
+            "max_tokens": wc.max_tokens,
+        }
+        if wc.output_tokens is not None:
+            body["max_tokens"] = body["min_tokens"] = wc.output_tokens.sample(self._rng)
+        return wc.name, body
+
+
+def from_prompts(path: Path, max_tokens: int, temperature: float) -> Workload:
+    """One class, ``default``, from a prompts file: what ``--prompts`` alone means."""
+    return Workload([WorkloadClass("default", 1.0, _read_source(path), max_tokens, temperature)])
+
+
+def load_workload(path: Path, max_tokens: int, temperature: float) -> Workload:
+    """Read a spec; ``max_tokens`` and ``temperature`` are the defaults for its classes."""
+    spec = json.loads(path.read_text(encoding="utf-8"))
+    seed = int(spec.get("seed", 0))
+    rng = random.Random(seed)
+    sizer: _Sizer | None = None
+    classes = []
+    for entry in spec.get("classes", []):
+        name = entry["name"]
+        if "source" in entry:
+            prompts = _read_source(Path(entry["source"]))
+            output_tokens = None
+        elif "synthetic" in entry:
+            synthetic = entry["synthetic"]
+            if sizer is None:
+                sizer = _Sizer(spec.get("tokenizer"))
+            input_tokens = Lengths.from_spec(synthetic["input_tokens"])
+            prompts = [
+                [
+                    {
+                        "role": "user",
+                        "content": _synthetic_text(
+                            rng, input_tokens.sample(rng) - _TEMPLATE_TOKENS, sizer
+                        ),
+                    }
+                ]
+                for _ in range(int(synthetic.get("count", 64)))
+            ]
+            output_spec = synthetic.get("output_tokens")
+            output_tokens = Lengths.from_spec(output_spec) if output_spec else None
+        else:
+            raise ValueError(f"Class {name!r} needs a 'source' or 'synthetic' section")
+        weight = float(entry.get("weight", 1.0))
+        if weight <= 0:
+            raise ValueError(f"Class {name!r} needs a positive weight")
+        classes.append(
+            WorkloadClass(
+                name=name,
+                weight=weight,
+                prompts=prompts,
+                max_tokens=int(entry.get("max_tokens", max_tokens)),
+                temperature=float(entry.get("temperature", temperature)),
+                output_tokens=output_tokens,
+            )
+        )
+    return Workload(classes, seed)
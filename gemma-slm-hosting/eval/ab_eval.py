@@ -1,4 +1,5 @@
 import argparse
+import asyncio
 import json
 import os
 import time
@@ -54,6 +55,45 @@ def _fetch_first_model(client: httpx.Client, api_url: str, timeout: int) -> str:
     return models[0]["id"]
 
 
+async def _afetch_first_model(client: httpx.AsyncClient, api_url: str, timeout: int) -> str:
+    response = await client.get(f"{api_url}/v1/models", timeout=timeout)
+    response.raise_for_status()
+    models = response.json().get("data", [])
+    if not models:
+        raise RuntimeError(f"No models returned from {api_url}/models")
+    return models[0]["id"]
+
+
+def _result(model: str, started: float, response: httpx.Response) -> dict[str, Any]:
+    latency_ms = int((time.perf_counter() - started) * 1000)
+    status = response.status_code
+    data = response.json() if response.content else {}
+    text = ""
+    usage = None
+    if status == 200:
+        choices = data.get("choices", [])
+        if choices:
+            text = choices[0]["message"]["content"]
+        usage = data.get("usage")
+    return {
+        "model": model,
+        "latency_ms": latency_ms,
+        "status": status,
+        "text": text,
+        "usage": usage,
+    }
+
+
+def _error(model: str, started: float, exc: Exception) -> dict[str, Any]:
+    latency_ms = int((time.perf_counter() - started) * 1000)
+    return {
+        "model": model,
+        "latency_ms": latency_ms,
+        "status": None,
+        "error": str(exc),
+    }
+
+
 def _chat(
     client: httpx.Client,
     api_url: str,
@@ -76,31 +116,120 @@ def _chat(
             json=payload,
             timeout=timeout,
         )
-        latency_ms = int((time.perf_counter() - started) * 1000)
-        status = response.status_code
-        data = response.json() if response.content else {}
-        text = ""
-        usage = None
-        if status == 200:
-            choices = data.get("choices", [])
-            if choices:
-                text = choices[0]["message"]["content"]
-            usage = data.get("usage")
-        return {
-            "model": model,
-            "latency_ms": latency_ms,
-            "status": status,
-            "text": text,
-            "usage": usage,
-        }
+        return _result(model, started, response)
     except Exception as exc:
-        latency_ms = int((time.perf_counter() - started) * 1000)
-        return {
-            "model": model,
-            "latency_ms": latency_ms,
-            "status": None,
-            "error": str(exc),
-        }
+        return _error(model, started, exc)
+
+
+async def _achat(
+    client: httpx.AsyncClient,
+    limit: asyncio.Semaphore,
+    api_url: str,
+    model: str,
+    messages: list[dict[str, Any]],
+    temperature: float,
+    max_tokens: int,
+    timeout: int,
+) -> tuple[datetime, dict[str, Any]]:
+    """``_chat`` on the event loop; latency counts from when ``limit`` lets it go.
+
+    Also returns when that was, so the record's timestamp is when the request
+    was sent rather than when it started queueing.
+    """
+    payload = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+    }
+    async with limit:
+        sent = datetime.now(timezone.utc)
+        started = time.perf_counter()
+        try:
+            response = await client.post(
+                f"{api_url}/v1/chat/completions",
+                json=payload,
+                timeout=timeout,
+            )
+            return sent, _result(model, started, response)
+        except Exception as exc:
+            return sent, _error(model, started, exc)
+
+
+def _record(
+    index: int,
+    prompt: dict[str, Any],
+    args: argparse.Namespace,
+    base_result: dict[str, Any],
+    ft_result: dict[str, Any],
+    ts: str,
+) -> dict[str, Any]:
+    return {
+        "index": index,
+        "prompt_id": str(prompt["id"]),
+        "request": {
+            "temperature": args.temperature,
+            "max_tokens": args.max_tokens,
+        },
+        "base": base_result,
+        "ft": ft_result,
+        "timestamp": ts,
+    }
+
+
+async def _run_async(
+    args: argparse.Namespace,
+    prompts: list[dict[str, Any]],
+    base_url: str,
+    ft_url: str,
+    out: Any,
+) -> None:
+    """Base and FT answer each prompt in parallel, each with its own concurrency limit.
+
+    Prompts finish out of order; records are held back until every earlier
+    prompt is written, so the file keeps prompt order. Progress counts
+    finished prompts.
+    """
+    base_limit = asyncio.Semaphore(args.concurrency)
+    ft_concurrency = args.ft_concurrency or args.concurrency
+    ft_limit = asyncio.Semaphore(ft_concurrency)
+    connections = args.concurrency + ft_concurrency
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    progress = tqdm(total=len(prompts), desc="A/B") if tqdm else None
+
+    async with httpx.AsyncClient(limits=limits) as client:
+        if args.model:
+            base_model = ft_model = args.model
+        else:
+            base_model, ft_model = await asyncio.gather(
+                _afetch_first_model(client, base_url, args.timeout),
+                _afetch_first_model(client, ft_url, args.timeout),
+            )
+
+        async def one(index: int, prompt: dict[str, Any]) -> tuple[int, dict[str, Any]]:
+            common = (prompt["messages"], args.temperature, args.max_tokens, args.timeout)
+            (base_sent, base_result), (ft_sent, ft_result) = await asyncio.gather(
+                _achat(client, base_limit, base_url, base_model, *common),
+                _achat(client, ft_limit, ft_url, ft_model, *common),
+            )
+            # As in the sequential loop: when the first of the pair went out.
+            ts = min(base_sent, ft_sent).isoformat()
+            return index, _record(index, prompt, args, base_result, ft_result, ts)
+
+        pending: dict[int, dict[str, Any]] = {}
+        written = 0
+        tasks = [asyncio.create_task(one(i, prompt)) for i, prompt in enumerate(prompts)]
+        for finished in asyncio.as_completed(tasks):
+            index, record = await finished
+            pending[index] = record
+            if progress is not None:
+                progress.update(1)
+            while written in pending:
+                out.write(json.dumps(pending.pop(written), ensure_ascii=True) + "\n")
+                written += 1
+            out.flush()
+    if progress is not None:
+        progress.close()
 
 
 def _resolve_out_path(out: str | None, out_dir: str | None) -> Path:
@@ -126,7 +255,21 @@ def main() -> None:
     parser.add_argument("--temperature", type=float, default=0.0)
     parser.add_argument("--max-tokens", type=int, default=128)
     parser.add_argument("--timeout", type=int, default=60)
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Call base and FT in parallel, several prompts at a time",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="With --async: requests in flight per backend"
+    )
+    parser.add_argument(
+        "--ft-concurrency", type=int, help="With --async: FT's limit, if not --concurrency"
+    )
     args = parser.parse_args()
+    if args.concurrency < 1 or (args.ft_concurrency is not None and args.ft_concurrency < 1):
+        parser.error("--concurrency and --ft-concurrency must be at least 1")
 
     prompts_path = Path(args.prompts)
     out_path = _resolve_out_path(args.out, args.out_dir)
@@ -138,6 +281,10 @@ def main() -> None:
         raise ValueError("BASE_API_URL and FT_API_URL must be set")
 
     prompts = _load_prompts(prompts_path)
+    if args.use_async:
+        with out_path.open("w", encoding="utf-8") as out:
+            asyncio.run(_run_async(args, prompts, base_url, ft_url, out))
+        return
     iterator = tqdm(prompts, desc="A/B") if tqdm else prompts
 
     with httpx.Client() as client, out_path.open("w", encoding="utf-8") as out:
@@ -147,8 +294,7 @@ def main() -> None:
         else:
             base_model = _fetch_first_model(client, base_url, args.timeout)
             ft_model = _fetch_first_model(client, ft_url, args.timeout)
-        for prompt in iterator:
-            prompt_id = str(prompt["id"])
+        for index, prompt in enumerate(iterator):
             messages = prompt["messages"]
             ts = datetime.now(timezone.utc).isoformat()
             base_result = _chat(
@@ -169,16 +315,7 @@ def main() -> None:
                 args.max_tokens,
                 args.timeout,
             )
-            record = {
-                "prompt_id": prompt_id,
-                "request": {
-                    "temperature": args.temperature,
-                    "max_tokens": args.max_tokens,
-                },
-                "base": base_result,
-                "ft": ft_result,
-                "timestamp": ts,
-            }
+            record = _record(index, prompt, args, base_result, ft_result, ts)
             out.write(json.dumps(record, ensure_ascii=True) + "\n")
 
 
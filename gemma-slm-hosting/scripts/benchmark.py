@@ -1,18 +1,15 @@
 import argparse
 import json
 import os
+import sys
 import time
 from pathlib import Path
 
 import requests
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "bench"))
 
-def _percentile(values: list[float], pct: float) -> float:
-    if not values:
-        return 0.0
-    values = sorted(values)
-    idx = int(round((pct / 100.0) * (len(values) - 1)))
-    return values[idx]
+from hdr import LogHistogram  # noqa: E402
 
 
 def _run(host: str, port: str, model: str, n: int) -> dict:
@@ -23,18 +20,19 @@ def _run(host: str, port: str, model: str, n: int) -> dict:
         "temperature": 0.2,
         "max_tokens": 64,
     }
-    latencies = []
+    latencies = LogHistogram(lowest=1e-6, highest=1e4)
     for _ in range(n):
         start = time.perf_counter()
         response = requests.post(url, json=payload, timeout=30)
         response.raise_for_status()
         _ = response.json()
-        latencies.append(time.perf_counter() - start)
+        latencies.record(time.perf_counter() - start)
     return {
-        "avg_latency_s": sum(latencies) / len(latencies),
-        "p50_latency_s": _percentile(latencies, 50),
-        "p95_latency_s": _percentile(latencies, 95),
-        "samples": len(latencies),
+        "avg_latency_s": latencies.mean,
+        "p50_latency_s": latencies.percentile(50),
+        "p95_latency_s": latencies.percentile(95),
+        "samples": latencies.count,
+        "histogram": latencies.to_dict(),
     }
 
 
@@ -1,2 +1,16 @@
 #!/usr/bin/env bash
-# Placeholder script
+# Runs the gateway in the foreground: N worker processes on uvloop/httptools.
+# Extra arguments go to the launcher, e.g. scripts/run_gateway.sh --workers 4 --port 8080
+# SIGTERM (docker stop, systemd) drains in-flight requests before exiting.
+set -euo pipefail
+
+script_dir="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+repo_root="$(cd "$script_dir/.." && pwd)"
+
+# shellcheck source=lib_env.sh
+. "$script_dir/lib_env.sh"
+load_env
+
+export PYTHONPATH="$repo_root/src${PYTHONPATH:+:$PYTHONPATH}"
+
+exec python -m gateway.server "$@"
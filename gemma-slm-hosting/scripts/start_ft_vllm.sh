@@ -85,6 +85,9 @@ if [[ "${ENFORCE_EAGER}" == "1" || "${ENFORCE_EAGER}" == "true" ]]; then
   extra_args+=(--enforce-eager)
 fi
 
+# Lets the gateway load/unload adapters at runtime (GATEWAY_LORA_HOT_RELOAD).
+export VLLM_ALLOW_RUNTIME_LORA_UPDATING="${VLLM_ALLOW_RUNTIME_LORA_UPDATING:-True}"
+
 python -m vllm.entrypoints.openai.api_server \
   --model "$BASE_MODEL_ID" \
   --host "$HOST" \
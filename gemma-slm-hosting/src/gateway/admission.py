@@ -0,0 +1,212 @@
+"""Token-budget admission control with a bounded priority queue and load shedding.
+
+vLLM runs at most ``MAX_NUM_SEQS`` sequences and otherwise queues internally
+with no upper bound on wait. The gateway keeps its own account of what each
+backend pool is already committed to (estimated prompt tokens + ``max_tokens``
+per request, and the request count) and makes the queueing explicit: requests
+that do not fit wait in a bounded priority queue, and requests whose projected
+wait exceeds the SLO are rejected up front with ``429`` + ``Retry-After``
+instead of joining a queue they would time out in.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from typing import Any
+
+# Weight of the newest sample in the hold-time moving average.
+_EWMA_ALPHA = 0.2
+
+# Average characters per token for English chat text; only used for estimates.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_prompt_tokens(payload: dict[str, Any]) -> int:
+    messages = payload.get("messages")
+    if isinstance(messages, list):
+        chars = 0
+        for message in messages:
+            if not isinstance(message, dict):
+                continue
+            content = message.get("content")
+            if isinstance(content, str):
+                chars += len(content)
+            elif isinstance(content, list):
+                chars += sum(
+                    len(part.get("text", "")) for part in content if isinstance(part, dict)
+                )
+            # Chat template adds a handful of tokens per turn.
+            chars += 4 * CHARS_PER_TOKEN
+        return max(1, chars // CHARS_PER_TOKEN)
+    prompt = payload.get("prompt")
+    if isinstance(prompt, list):
+        prompt = "".join(p for p in prompt if isinstance(p, str))
+    return max(1, len(str(prompt or "")) // CHARS_PER_TOKEN)
+
+
+def requested_tokens(payload: Mapping[str, Any], prompt_tokens: int, max_model_len: int) -> int:
+    """Prompt plus the completion budget vLLM will reserve for this request."""
+    max_tokens = payload.get("max_completion_tokens") or payload.get("max_tokens")
+    try:
+        completion = int(max_tokens)
+    except (TypeError, ValueError):
+        completion = max_model_len - prompt_tokens
+    return prompt_tokens + max(1, completion)
+
+
+class Overloaded(Exception):
+    def __init__(self, reason: str, retry_after_s: float) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after_s = retry_after_s
+
+
+@dataclass
+class Ticket:
+    tokens: int
+    priority: int
+    enqueued_at: float
+    admitted_at: float = 0.0
+    future: asyncio.Future[None] | None = field(default=None, repr=False)
+
+    @property
+    def queue_wait_s(self) -> float:
+        return self.admitted_at - self.enqueued_at
+
+
+@dataclass
+class AdmissionStats:
+    admitted: int = 0
+    queued: int = 0
+    shed_queue_full: int = 0
+    shed_slo: int = 0
+    shed_timeout: int = 0
+    abandoned: int = 0
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        token_budget: int,
+        max_seqs: int,
+        max_queue: int,
+        max_queue_wait_s: float,
+        slo_s: float,
+    ) -> None:
+        self.token_budget = token_budget
+        self.max_seqs = max_seqs
+        self.max_queue = max_queue
+        self.max_queue_wait_s = max_queue_wait_s
+        self.slo_s = slo_s
+        self.stats = AdmissionStats()
+        self.outstanding_tokens = 0
+        self.outstanding_seqs = 0
+        self.avg_hold_s = 0.0
+        self._queue: list[tuple[int, int, Ticket]] = []
+        self._queued_tokens = 0
+        self._seq = itertools.count()
+
+    def _fits(self, tokens: int) -> bool:
+        if self.outstanding_seqs >= self.max_seqs:
+            return False
+        # A request larger than the whole budget may still run alone.
+        return self.outstanding_tokens == 0 or self.outstanding_tokens + tokens <= self.token_budget
+
+    def projected_wait_s(self, tokens: int) -> float:
+        """Little's-law estimate: budget turnovers needed before ``tokens`` fits."""
+        if not self.avg_hold_s:
+            return 0.0
+        turnovers = max(
+            (self._queued_tokens + tokens) / self.token_budget,
+            (len(self._queue) + 1) / self.max_seqs,
+        )
+        return self.avg_hold_s * turnovers
+
+    def _grant(self, ticket: Ticket) -> None:
+        ticket.admitted_at = time.monotonic()
+        self.outstanding_tokens += ticket.tokens
+        self.outstanding_seqs += 1
+        self.stats.admitted += 1
+
+    async def acquire(self, tokens: int, priority: int = 1) -> Ticket:
+        ticket = Ticket(tokens=tokens, priority=priority, enqueued_at=time.monotonic())
+        if not self._queue and self._fits(tokens):
+            self._grant(ticket)
+            return ticket
+
+        if len(self._queue) >= self.max_queue:
+            self.stats.shed_queue_full += 1
+            raise Overloaded("admission queue full", self.projected_wait_s(tokens))
+        projected = self.projected_wait_s(tokens)
+        if projected > self.slo_s:
+            self.stats.shed_slo += 1
+            raise Overloaded(f"projected queue wait {projected:.1f}s exceeds SLO", projected)
+
+        ticket.future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._seq), ticket))
+        self._queued_tokens += tokens
+        self.stats.queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(ticket.future), self.max_queue_wait_s)
+        except TimeoutError:
+            if self._withdraw(ticket):
+                self.stats.shed_timeout += 1
+                raise Overloaded(
+                    "timed out in admission queue", self.projected_wait_s(tokens)
+                ) from None
+        except asyncio.CancelledError:
+            if not self._withdraw(ticket):
+                # Admitted in the same tick we were cancelled: hand the slot back.
+                self.release(ticket)
+            self.stats.abandoned += 1
+            raise
+        return ticket
+
+    def _withdraw(self, ticket: Ticket) -> bool:
+        """Drop a still-queued ticket; ``False`` if it was admitted meanwhile."""
+        for idx, (_, _, queued) in enumerate(self._queue):
+            if queued is ticket:
+                self._queue.pop(idx)
+                heapq.heapify(self._queue)
+                self._queued_tokens -= ticket.tokens
+                # The withdrawn ticket may have been blocking smaller ones behind it.
+                self._dispatch()
+                return True
+        return False
+
+    def release(self, ticket: Ticket) -> None:
+        self.outstanding_tokens -= ticket.tokens
+        self.outstanding_seqs -= 1
+        held = time.monotonic() - ticket.admitted_at
+        if self.avg_hold_s:
+            self.avg_hold_s += _EWMA_ALPHA * (held - self.avg_hold_s)
+        else:
+            self.avg_hold_s = held
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self._queue and self._fits(self._queue[0][2].tokens):
+            _, _, ticket = heapq.heappop(self._queue)
+            self._queued_tokens -= ticket.tokens
+            self._grant(ticket)
+            if ticket.future is not None and not ticket.future.done():
+                ticket.future.set_result(None)
+
+    def retry_after(self, exc: Overloaded) -> int:
+        return max(1, math.ceil(exc.retry_after_s or self.avg_hold_s or 1.0))
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "outstanding_tokens": self.outstanding_tokens,
+            "outstanding_seqs": self.outstanding_seqs,
+            "token_budget": self.token_budget,
+            "max_seqs": self.max_seqs,
+            "queue_depth": len(self._queue),
+            "queued_tokens": self._queued_tokens,
+            "avg_hold_s": self.avg_hold_s,
+            **vars(self.stats),
+        }
@@ -0,0 +1,114 @@
+"""Request bodies on the proxy path: decoded once, forwarded as the client sent them.
+
+The gateway only reads a handful of routing fields, but the body is mostly
+conversation history. Decoding it with orjson costs about 1 ns per byte, which
+is cheaper than any partial scan done in Python, so the body is decoded in full
+(see ``bench/body_overhead.py``). What is avoided is everything after that:
+the original bytes go upstream untouched, and when the registry maps the model
+name to a different one, only the ``model`` value is spliced in.
+"""
+
+import re
+from collections.abc import Mapping
+from typing import Any
+
+from . import codec
+from .admission import estimate_prompt_tokens
+from .cache import cache_key
+from .routing import render_prefix
+
+# A quoted name followed by a colon. Message text can hold the same bytes with
+# its quotes escaped (``\"model\":``), so a match is only a key if its opening
+# quote is not escaped, and only a top-level key at nesting depth 1.
+_KEY_TEMPLATE = rb'"%s"[ \t\r\n]*:[ \t\r\n]*'
+_NUMBER = re.compile(rb"-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?")
+# A whole string literal or a bracket; the regex engine skips over message text.
+_TOKEN = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"|[\[\]{}]')
+
+
+def _escaped(raw: bytes, pos: int) -> bool:
+    """Whether the byte at ``pos`` follows an odd run of backslashes."""
+    backslashes = 0
+    while pos - 1 - backslashes >= 0 and raw[pos - 1 - backslashes] == 0x5C:  # '\\'
+        backslashes += 1
+    return backslashes % 2 == 1
+
+
+def _depth(raw: bytes, pos: int) -> int:
+    """Nesting depth at ``pos``, which must not be inside a string literal."""
+    depth = 0
+    for token in _TOKEN.finditer(raw, 0, pos):
+        first = raw[token.start()]
+        if first in b"{[":
+            depth += 1
+        elif first in b"}]":
+            depth -= 1
+    return depth
+
+
+def _string_end(raw: bytes, pos: int) -> int | None:
+    """End offset of the JSON string literal starting at ``pos``."""
+    if raw[pos : pos + 1] != b'"':
+        return None
+    idx = pos + 1
+    while True:
+        idx = raw.find(b'"', idx)
+        if idx < 0:
+            return None
+        idx += 1
+        if not _escaped(raw, idx - 1):
+            return idx
+
+
+class RequestBody(dict[str, Any]):
+    """Decoded request fields plus the exact bytes the client sent."""
+
+    def __init__(self, payload: Mapping[str, Any], raw: bytes) -> None:
+        super().__init__(payload)
+        self.raw = raw
+
+    def prefix(self, max_chars: int) -> str:
+        return render_prefix(self, max_chars)
+
+    def prompt_tokens(self) -> int:
+        return estimate_prompt_tokens(self)
+
+    def cache_key(self, path: str, version: str) -> str:
+        return cache_key(path, self, version)
+
+    def with_field(self, key: str, value: str | int) -> "RequestBody":
+        """Copy with one top-level string or int field replaced, splicing ``raw`` if possible."""
+        payload = {**self, key: value}
+        span = self._value_span(key)
+        if span is None:
+            return RequestBody(payload, codec.dumps(payload))
+        start, end = span
+        return RequestBody(payload, self.raw[:start] + codec.dumps(value) + self.raw[end:])
+
+    def _value_span(self, key: str) -> tuple[int, int] | None:
+        """Byte span of ``key``'s string or number value, if ``key`` occurs exactly once."""
+        current = self.get(key)
+        if not isinstance(current, str | int | float) or isinstance(current, bool):
+            return None
+        pattern = re.compile(_KEY_TEMPLATE % re.escape(key.encode("utf-8")))
+        keys = [m for m in pattern.finditer(self.raw) if not _escaped(self.raw, m.start())]
+        if len(keys) != 1 or _depth(self.raw, keys[0].start()) != 1:
+            # Written with escapes, or also used as a key in a nested object.
+            return None
+        start = keys[0].end()
+        if isinstance(current, str):
+            end = _string_end(self.raw, start)
+        else:
+            number = _NUMBER.match(self.raw, start)
+            end = number.end() if number is not None else None
+        if end is None or codec.loads(self.raw[start:end]) != current:
+            return None
+        return start, end
+
+
+def read_body(raw: bytes) -> RequestBody:
+    """Decode ``raw``; raises ``ValueError`` unless it is a JSON object."""
+    payload = codec.loads(raw)
+    if not isinstance(payload, dict):
+        raise ValueError("Request body must be a JSON object")
+    return RequestBody(payload, raw)
@@ -0,0 +1,100 @@
+"""Per-replica circuit breaker over a sliding window of upstream outcomes.
+
+A replica that starts failing (transport errors, 5xx) or answering slowly is
+taken out of rotation for ``open_s`` seconds. After that it is *half-open*: one
+trial request is let through per cooldown period, and the first recorded
+outcome decides whether the breaker closes again or re-opens. Trials that never
+report back (client gone mid-request) simply let the next one through once the
+cooldown has passed again, so there is no trial bookkeeping to leak.
+
+Outcomes carry the breaker's ``trips`` count from when their request was
+dispatched. One sent before the latest trip says nothing about the replica
+since, so it is ignored: a non-streamed generation that outlasts ``open_s``
+would otherwise close a half-open breaker before the trial ever answered.
+"""
+
+import time
+from collections import deque
+from typing import Any
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        window: int = 20,
+        min_calls: int = 5,
+        failure_ratio: float = 0.5,
+        slow_call_s: float = 0.0,
+        open_s: float = 10.0,
+    ) -> None:
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.slow_call_s = slow_call_s
+        self.open_s = open_s
+        self.state = CLOSED
+        self.trips = 0
+        self._outcomes: deque[bool] = deque(maxlen=window)  # True = bad
+        self._bad = 0
+        self._opened_at = 0.0
+        self._trial_at = 0.0
+
+    def allows(self) -> bool:
+        """Whether a request may be routed here now (does not change state)."""
+        if self.state == CLOSED:
+            return True
+        now = time.monotonic()
+        if self.state == OPEN:
+            return now - self._opened_at >= self.open_s
+        return now - self._trial_at >= self.open_s
+
+    def on_dispatch(self) -> None:
+        if self.state == CLOSED or not self.allows():
+            # Closed, or routed here anyway because every replica is out.
+            return
+        self.state = HALF_OPEN
+        self._trial_at = time.monotonic()
+
+    def record(
+        self, ok: bool, latency_s: float | None = None, generation: int | None = None
+    ) -> None:
+        """Count one outcome; ``generation`` is ``trips`` when its request was sent."""
+        if generation is not None and generation < self.trips:
+            return
+        bad = not ok or bool(
+            self.slow_call_s and latency_s is not None and latency_s > self.slow_call_s
+        )
+        if self.state == OPEN:
+            # Requests dispatched before the trip are still reporting back.
+            return
+        if self.state == HALF_OPEN:
+            if bad:
+                self._trip()
+            else:
+                self.state = CLOSED
+                self._outcomes.clear()
+                self._bad = 0
+            return
+        if len(self._outcomes) == self._outcomes.maxlen:
+            self._bad -= self._outcomes[0]
+        self._outcomes.append(bad)
+        self._bad += bad
+        if len(self._outcomes) >= self.min_calls and self.error_ratio >= self.failure_ratio:
+            self._trip()
+
+    @property
+    def error_ratio(self) -> float:
+        return self._bad / len(self._outcomes) if self._outcomes else 0.0
+
+    def _trip(self) -> None:
+        self.state = OPEN
+        self.trips += 1
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self._bad = 0
+
+    def snapshot(self) -> dict[str, Any]:
+        return {"state": self.state, "error_ratio": self.error_ratio, "trips": self.trips}
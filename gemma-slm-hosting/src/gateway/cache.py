@@ -0,0 +1,134 @@
+"""Byte-bounded LRU/TTL cache for deterministic (temperature 0) completions."""
+
+import hashlib
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Any
+
+from . import codec
+
+# Fields that change how the answer is delivered, not what it is.
+_DELIVERY_FIELDS = frozenset({"stream", "stream_options", "user"})
+
+# Rough per-entry bookkeeping cost (dict slots, dataclass, key string).
+_ENTRY_OVERHEAD_BYTES = 256
+
+
+def is_cacheable(payload: Mapping[str, Any]) -> bool:
+    """Only greedy, single-choice requests without logprobs have one right answer."""
+    try:
+        if float(payload["temperature"]) != 0.0:
+            return False
+    except (KeyError, TypeError, ValueError):
+        return False
+    if payload.get("n") not in (None, 1) or payload.get("best_of") not in (None, 1):
+        return False
+    return not (payload.get("logprobs") or payload.get("top_logprobs"))
+
+
+def cache_key(path: str, payload: dict[str, Any], version: str = "") -> str:
+    """Canonical hash of everything that affects the generated text.
+
+    ``version`` names the weights behind the requested model, so an adapter swap
+    can never serve answers from the previous one. Unknown fields are hashed
+    too: a spurious miss is cheap, a wrong hit is not.
+    """
+    canonical = {k: v for k, v in payload.items() if k not in _DELIVERY_FIELDS}
+    blob = codec.dumps([path, version, canonical], sort_keys=True)
+    return hashlib.blake2b(blob, digest_size=16).hexdigest()
+
+
+@dataclass
+class CacheEntry:
+    model: str
+    body: bytes
+    expires_at: float
+    size: int
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+    rejected_too_large: int = 0
+
+
+class ResponseCache:
+    def __init__(self, max_bytes: int, max_entry_bytes: int, ttl_s: float) -> None:
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.ttl_s = ttl_s
+        self.stats = CacheStats()
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: str) -> CacheEntry | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return entry
+
+    def put(self, key: str, model: str, body: bytes) -> bool:
+        size = len(body) + len(key) + _ENTRY_OVERHEAD_BYTES
+        if size > self.max_entry_bytes or size > self.max_bytes:
+            self.stats.rejected_too_large += 1
+            return False
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = CacheEntry(model, body, time.monotonic() + self.ttl_s, size)
+        self._bytes += size
+        self.stats.stores += 1
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats.evictions += 1
+        return True
+
+    def invalidate_model(self, model: str) -> int:
+        stale = [key for key, entry in self._entries.items() if entry.model == model]
+        for key in stale:
+            self._remove(key)
+        self.stats.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self) -> int:
+        dropped = len(self._entries)
+        self._entries.clear()
+        self._bytes = 0
+        self.stats.invalidations += dropped
+        return dropped
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def snapshot(self) -> dict[str, Any]:
+        lookups = self.stats.hits + self.stats.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hit_rate": self.stats.hits / lookups if lookups else 0.0,
+            **vars(self.stats),
+        }
@@ -0,0 +1,193 @@
+"""Single-flight coalescing of identical in-flight deterministic requests.
+
+The first request for a key starts a *flight*: a background task that owns the
+upstream call and buffers its body. Every client for that key, the first one
+included, is just a subscriber replaying the buffer, so the generation keeps
+going when the client that started it disconnects. The upstream request is
+cancelled only once the last subscriber is gone.
+
+The flight is registered before its sender waits for admission, so identical
+requests that arrive while the first one is queued join it instead of queueing
+for a generation of their own.
+"""
+
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+
+import httpx
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from .proxy import (
+    CLIENT_CLOSED_REQUEST,
+    BodyCallback,
+    DoneCallback,
+    passback_headers,
+    race_disconnect,
+)
+
+FLIGHT_HEADER = "x-gateway-flight"
+
+# Performs the flight's upstream exchange: returns a response whose body is
+# either still open for streaming or already read in full. It sets the flight's
+# ``backend`` and, for anything it holds until the body is relayed, ``on_done``.
+Sender = Callable[["Flight"], Awaitable[httpx.Response]]
+
+
+@dataclass
+class CoalesceStats:
+    flights: int = 0
+    followers: int = 0
+    overflow: int = 0
+    abandoned: int = 0
+
+
+class Flight:
+    def __init__(self) -> None:
+        self.chunks: list[bytes] = []
+        self.status_code = 0
+        self.headers: dict[str, str] = {}
+        self.error: BaseException | None = None
+        self.done = False
+        self.subscribers = 0
+        self.backend = ""
+        self.on_done: DoneCallback | None = None
+        self.started = asyncio.Event()
+        self.finished = asyncio.Event()
+        self._changed = asyncio.Event()
+        self.task: asyncio.Task[None] | None = None
+
+    def _notify(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def attach(self) -> None:
+        self.subscribers += 1
+
+    def detach(self) -> None:
+        self.subscribers -= 1
+        if self.subscribers == 0 and not self.done and self.task is not None:
+            self.task.cancel()
+
+    async def iter_body(self) -> AsyncIterator[bytes]:
+        idx = 0
+        while True:
+            while idx < len(self.chunks):
+                yield self.chunks[idx]
+                idx += 1
+            if self.done:
+                return
+            await self._changed.wait()
+
+    async def run(self, send: Sender, on_complete: BodyCallback | None) -> None:
+        upstream = await send(self)
+        try:
+            self.status_code = upstream.status_code
+            self.headers = passback_headers(upstream)
+            self.started.set()
+            if upstream.is_stream_consumed:
+                # Sender already read the whole body (non-streamed requests).
+                self.chunks.append(upstream.content)
+                self._notify()
+            else:
+                async for chunk in upstream.aiter_raw():
+                    self.chunks.append(chunk)
+                    self._notify()
+        finally:
+            await upstream.aclose()
+        if on_complete is not None and self.status_code == 200:
+            on_complete(b"".join(self.chunks))
+
+
+class FlightStreamingResponse(StreamingResponse):
+    def __init__(self, flight: Flight, **kwargs: Any) -> None:
+        super().__init__(flight.iter_body(), **kwargs)
+        self.flight = flight
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.flight.detach()
+
+
+class Coalescer:
+    def __init__(self, max_waiters: int) -> None:
+        self.max_waiters = max_waiters
+        self.stats = CoalesceStats()
+        self._flights: dict[str, Flight] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def get(self, key: str) -> Flight | None:
+        return self._flights.get(key)
+
+    def admit(self, flight: Flight) -> bool:
+        """Whether one more client may ride on ``flight`` (capped per key)."""
+        if flight.subscribers >= self.max_waiters:
+            self.stats.overflow += 1
+            return False
+        self.stats.followers += 1
+        return True
+
+    def start(self, key: str, send: Sender, on_complete: BodyCallback | None) -> Flight:
+        flight = Flight()
+        self._flights[key] = flight
+        self.stats.flights += 1
+        flight.task = asyncio.create_task(self._drive(key, flight, send, on_complete))
+        return flight
+
+    async def _drive(
+        self,
+        key: str,
+        flight: Flight,
+        send: Sender,
+        on_complete: BodyCallback | None,
+    ) -> None:
+        try:
+            await flight.run(send, on_complete)
+        except asyncio.CancelledError:
+            self.stats.abandoned += 1
+        except Exception as exc:
+            flight.error = exc
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            flight.done = True
+            flight.started.set()
+            flight.finished.set()
+            flight._notify()
+            if flight.on_done is not None:
+                flight.on_done()
+
+    def snapshot(self) -> dict[str, Any]:
+        return {"in_flight": len(self._flights), **vars(self.stats)}
+
+
+async def serve(request: Request, flight: Flight, stream: bool, role: str) -> Response:
+    """Subscribe the current client to ``flight`` and build its response."""
+    flight.attach()
+    handed_off = False
+    try:
+        if await race_disconnect(request, flight.started.wait()) is None:
+            return Response(status_code=CLIENT_CLOSED_REQUEST)
+        if flight.error is not None and not flight.status_code:
+            raise flight.error
+        headers = {**flight.headers, FLIGHT_HEADER: role}
+        if stream:
+            handed_off = True
+            return FlightStreamingResponse(flight, status_code=flight.status_code, headers=headers)
+        if await race_disconnect(request, flight.finished.wait()) is None:
+            return Response(status_code=CLIENT_CLOSED_REQUEST)
+        if flight.error is not None:
+            raise flight.error
+        return Response(
+            content=b"".join(flight.chunks), status_code=flight.status_code, headers=headers
+        )
+    finally:
+        if not handed_off:
+            flight.detach()
@@ -0,0 +1,67 @@
+"""Active health probes for the replica pools.
+
+Mirrors what ``scripts/healthcheck.sh`` checks by hand: every ``interval_s``
+each distinct backend URL gets a ``GET`` on ``path``; a replica is marked down
+after ``unhealthy_after`` consecutive failed probes and back up on the first
+success. Routing skips replicas that are down (see ``ReplicaPool``).
+"""
+
+import asyncio
+import logging
+from collections.abc import Iterable
+
+import httpx
+
+from .routing import Replica, ReplicaPool
+
+logger = logging.getLogger(__name__)
+
+
+class HealthProber:
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        pools: Iterable[ReplicaPool],
+        interval_s: float,
+        timeout_s: float,
+        unhealthy_after: int = 2,
+        path: str = "/v1/models",
+    ) -> None:
+        self.client = client
+        self.interval_s = interval_s
+        self.timeout_s = timeout_s
+        self.unhealthy_after = unhealthy_after
+        self.path = path
+        # One probe per URL even when base and FT share a server.
+        self._replicas: dict[str, list[Replica]] = {}
+        for pool in pools:
+            for replica in pool.replicas:
+                self._replicas.setdefault(replica.url, []).append(replica)
+        self._failures = dict.fromkeys(self._replicas, 0)
+
+    async def _probe(self, url: str) -> bool:
+        try:
+            response = await self.client.get(f"{url}{self.path}", timeout=self.timeout_s)
+        except httpx.HTTPError:
+            return False
+        return response.status_code == 200
+
+    async def check(self) -> None:
+        urls = list(self._replicas)
+        results = await asyncio.gather(*(self._probe(url) for url in urls))
+        for url, ok in zip(urls, results, strict=True):
+            self._failures[url] = 0 if ok else self._failures[url] + 1
+            healthy = self._failures[url] < self.unhealthy_after
+            replicas = self._replicas[url]
+            if any(replica.healthy != healthy for replica in replicas):
+                logger.warning("Replica %s is now %s", url, "up" if healthy else "down")
+            for replica in replicas:
+                replica.healthy = healthy
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_s)
+            try:
+                await self.check()
+            except Exception:
+                logger.exception("Health probe round failed")
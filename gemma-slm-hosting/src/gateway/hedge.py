@@ -0,0 +1,154 @@
+"""Hedged requests: a second copy on another replica when the first one straggles.
+
+A non-streamed deterministic request (same answer from any replica) that has
+not finished after the pool's running p95 latency is sent again to a different
+replica; whichever copy answers first wins and the other is cancelled, which
+closes its connection so vLLM aborts the sequence. Only about 5% of requests
+ever wait that long, so hedging at p95 cuts the tail for roughly 5% extra load.
+
+Extra load is capped by a token bucket: every eligible request earns
+``budget_ratio`` of a hedge and every hedge spends one, so hedges can never
+exceed that fraction of traffic. The caller also refuses to hedge while the
+pool's admission queue is non-empty, so hedging stops as soon as the backends
+are saturated instead of amplifying the overload.
+"""
+
+import asyncio
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+R = TypeVar("R")
+
+# Latency samples kept per pool, and how often the quantile is recomputed.
+_WINDOW = 512
+_REFRESH_EVERY = 32
+
+
+@dataclass
+class HedgeStats:
+    eligible: int = 0
+    issued: int = 0
+    won: int = 0
+    denied: int = 0
+
+
+class LatencyTracker:
+    """Running quantile over the last ``window`` samples, refreshed in batches."""
+
+    def __init__(self, quantile: float, min_samples: int, window: int = _WINDOW) -> None:
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.value: float | None = None
+        self._samples: deque[float] = deque(maxlen=window)
+        self._pending = 0
+
+    def observe(self, latency_s: float) -> None:
+        self._samples.append(latency_s)
+        self._pending += 1
+        count = len(self._samples)
+        if count >= self.min_samples and (self.value is None or self._pending >= _REFRESH_EVERY):
+            self._pending = 0
+            ordered = sorted(self._samples)
+            self.value = ordered[min(count - 1, int(self.quantile * count))]
+
+
+class Hedger:
+    def __init__(
+        self,
+        budget_ratio: float,
+        quantile: float = 0.95,
+        min_delay_s: float = 0.05,
+        min_samples: int = 20,
+        burst: float = 10.0,
+    ) -> None:
+        self.budget_ratio = budget_ratio
+        self.quantile = quantile
+        self.min_delay_s = min_delay_s
+        self.min_samples = min_samples
+        self.burst = burst
+        self.stats = HedgeStats()
+        self._credits = 0.0
+        self._trackers: dict[str, LatencyTracker] = {}
+
+    def _tracker(self, pool: str) -> LatencyTracker:
+        tracker = self._trackers.get(pool)
+        if tracker is None:
+            tracker = self._trackers[pool] = LatencyTracker(self.quantile, self.min_samples)
+        return tracker
+
+    def delay_s(self, pool: str) -> float | None:
+        """How long to wait before hedging; ``None`` until enough latencies are known."""
+        value = self._tracker(pool).value
+        return None if value is None else max(value, self.min_delay_s)
+
+    def _spend(self) -> bool:
+        if self._credits < 1.0:
+            return False
+        self._credits -= 1.0
+        return True
+
+    async def run(
+        self,
+        pool: str,
+        attempt: Callable[[], Awaitable[R]],
+        succeeded: Callable[[R], bool],
+        can_hedge: Callable[[], bool],
+    ) -> R:
+        """Run ``attempt``, and a second one if the first is slow; first success wins.
+
+        ``can_hedge`` is asked at hedging time (e.g. whether another replica is
+        free and the pool is not queueing). If both copies fail, the outcome of
+        the one that finished last is returned or raised.
+        """
+        self.stats.eligible += 1
+        self._credits = min(self.burst, self._credits + self.budget_ratio)
+        tracker = self._tracker(pool)
+        delay = self.delay_s(pool)
+        started = time.monotonic()
+        primary = asyncio.ensure_future(attempt())
+        tasks = [primary]
+        try:
+            if delay is not None:
+                await asyncio.wait(tasks, timeout=delay)
+                if not primary.done():
+                    if can_hedge() and self._spend():
+                        tasks.append(asyncio.ensure_future(attempt()))
+                        self.stats.issued += 1
+                    else:
+                        self.stats.denied += 1
+            last: asyncio.Future[Any] = primary
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = None
+                for task in tasks:
+                    if task not in done:
+                        continue
+                    last = task
+                    if winner is None and task.exception() is None and succeeded(task.result()):
+                        winner = task
+                if winner is not None:
+                    if winner is not primary:
+                        self.stats.won += 1
+                    # When the hedge wins this is a lower bound on the primary's
+                    # latency, which keeps cancelled stragglers in the distribution.
+                    tracker.observe(time.monotonic() - started)
+                    return winner.result()
+            return last.result()
+        finally:
+            losers = [task for task in tasks if not task.done()]
+            for task in losers:
+                task.cancel()
+            # Let the cancelled copy unwind, releasing its replica, before returning.
+            await asyncio.gather(*losers, return_exceptions=True)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "budget_ratio": self.budget_ratio,
+            "credits": self._credits,
+            "delay_s": {pool: self.delay_s(pool) for pool in self._trackers},
+            **vars(self.stats),
+        }
@@ -1,10 +1,810 @@
-"""Gateway entrypoint placeholder."""
+"""Gateway entrypoint: OpenAI-compatible front door for the base and FT vLLM servers."""
 
-from fastapi import FastAPI
+import asyncio
+import contextlib
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from functools import partial
+from typing import Any
 
-app = FastAPI()
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+
+from . import codec, sse
+from .admission import AdmissionController, Overloaded, requested_tokens
+from .body import RequestBody, read_body
+from .breaker import CircuitBreaker
+from .cache import ResponseCache, is_cacheable
+from .coalesce import Coalescer, Flight, serve
+from .health import HealthProber
+from .hedge import Hedger
+from .metrics import (
+    PROBE_KEY,
+    GatewayMetrics,
+    MetricsExchange,
+    MetricsMiddleware,
+    RequestProbe,
+)
+from .pointer import PointerWatcher
+from .proxy import (
+    CLIENT_CLOSED_REQUEST,
+    BodyCallback,
+    DoneCallback,
+    StartCallback,
+    build_upstream,
+    create_client,
+    proxy,
+    race_disconnect,
+    relay,
+    send_reporting,
+)
+from .registry import ModelRegistry, ModelRoute, SwapCoordinator, build_registry
+from .routing import Replica, ReplicaPool
+from .settings import Settings, load_settings
+from .tokens import (
+    MAX_TOKENS_POLICIES,
+    ContextLengthExceeded,
+    PromptCounter,
+    fit_to_context,
+    load_into,
+)
+from .tracing import TRACE_KEY, RequestTrace, Tracing, TracingMiddleware, create_tracing
+
+CACHE_HEADER = "x-gateway-cache"
+MAX_TOKENS_HEADER = "x-gateway-max-tokens"
+PRIORITY_HEADER = "x-priority"
+METRICS_PUBLISH_INTERVAL_S = 1.0
+
+# Upstream answers that mean "this replica could not take it", safe to retry elsewhere.
+_RETRY_STATUSES = frozenset({502, 503, 504})
+_RETRY_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError)
+
+
+def _error(status_code: int, message: str, err_type: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code,
+        content={"error": {"message": message, "type": err_type, "code": status_code}},
+    )
+
+
+def _build_pool(settings: Settings, urls: tuple[str, ...]) -> ReplicaPool:
+    return ReplicaPool(
+        list(urls),
+        policy=settings.routing_policy,
+        load_factor=settings.load_factor,
+        vnodes=settings.hash_vnodes,
+        breaker=partial(
+            CircuitBreaker,
+            window=settings.breaker_window,
+            min_calls=settings.breaker_min_calls,
+            failure_ratio=settings.breaker_failure_ratio,
+            slow_call_s=settings.breaker_slow_call_s,
+            open_s=settings.breaker_open_s,
+        ),
+    )
+
+
+def _build_admission(settings: Settings, replicas: int) -> AdmissionController:
+    # The backends' capacity is shared by all gateway workers; each gets its slice.
+    workers = settings.workers
+    return AdmissionController(
+        token_budget=max(1, settings.admission_token_budget * replicas // workers),
+        max_seqs=max(1, settings.admission_max_seqs * replicas // workers),
+        max_queue=max(1, settings.admission_max_queue // workers),
+        max_queue_wait_s=settings.admission_max_queue_wait_s,
+        slo_s=settings.admission_slo_s,
+    )
+
+
+def _build_metrics(app: FastAPI) -> GatewayMetrics:
+    """Histograms for the request path plus scrape-time views of component counters."""
+    metrics = GatewayMetrics()
+    state = app.state
+    if state.cache is not None:
+        cache: ResponseCache = state.cache
+        metrics.register_state(
+            "gateway_cache_events_total",
+            "Response cache lookups and maintenance events.",
+            "counter",
+            ("event",),
+            lambda: {(name,): value for name, value in vars(cache.stats).items()},
+        )
+        metrics.register_state(
+            "gateway_cache_bytes",
+            "Bytes held by the response cache.",
+            "gauge",
+            (),
+            lambda: {(): cache.size_bytes},
+        )
+    if state.coalescer is not None:
+        coalescer: Coalescer = state.coalescer
+        metrics.register_state(
+            "gateway_coalesce_events_total",
+            "Single-flight coalescing events.",
+            "counter",
+            ("event",),
+            lambda: {(name,): value for name, value in vars(coalescer.stats).items()},
+        )
+    if state.admission is not None:
+        admission: dict[str, AdmissionController] = state.admission
+        metrics.register_state(
+            "gateway_admission_events_total",
+            "Admission decisions per model pool.",
+            "counter",
+            ("model", "event"),
+            lambda: {
+                (model, name): value
+                for model, ctl in admission.items()
+                for name, value in vars(ctl.stats).items()
+            },
+        )
+        metrics.register_state(
+            "gateway_admission_queue_depth",
+            "Requests waiting in the admission queue.",
+            "gauge",
+            ("model",),
+            lambda: {(model,): ctl.snapshot()["queue_depth"] for model, ctl in admission.items()},
+        )
+        metrics.register_state(
+            "gateway_outstanding_tokens",
+            "Estimated tokens committed to in-flight requests.",
+            "gauge",
+            ("model",),
+            lambda: {(model,): ctl.outstanding_tokens for model, ctl in admission.items()},
+        )
+    pools: dict[str, ReplicaPool] = state.pools
+    metrics.register_state(
+        "gateway_replica_in_flight",
+        "Requests currently routed to each replica.",
+        "gauge",
+        ("model", "backend"),
+        lambda: {
+            (model, replica.url): replica.in_flight
+            for model, pool in pools.items()
+            for replica in pool.replicas
+        },
+    )
+    metrics.register_state(
+        "gateway_prefix_routes_total",
+        "Routing decisions by prefix-cache warmth (warm = same replica as last time).",
+        "counter",
+        ("model", "backend", "result"),
+        lambda: {
+            (model, replica.url, result): getattr(replica, result)
+            for model, pool in pools.items()
+            for replica in pool.replicas
+            for result in ("warm", "cold", "spilled")
+        },
+    )
+    metrics.register_state(
+        "gateway_replica_up",
+        "1 if the replica passes health probes and its circuit breaker lets traffic through.",
+        "gauge",
+        ("model", "backend"),
+        lambda: {
+            (model, replica.url): int(replica.available)
+            for model, pool in pools.items()
+            for replica in pool.replicas
+        },
+        # Every worker probes on its own; up means up for all of them.
+        merge="min",
+    )
+    metrics.register_state(
+        "gateway_breaker_trips_total",
+        "Times each replica's circuit breaker opened.",
+        "counter",
+        ("model", "backend"),
+        lambda: {
+            (model, replica.url): replica.breaker.trips
+            for model, pool in pools.items()
+            for replica in pool.replicas
+        },
+    )
+    if state.tokens is not None:
+        counter: PromptCounter = state.tokens
+        metrics.register_state(
+            "gateway_prompt_token_events_total",
+            "Prompt token counting (tokenizer cache hits, misses; clamped, rejected requests).",
+            "counter",
+            ("event",),
+            lambda: {(name,): value for name, value in vars(counter.stats).items()},
+        )
+    metrics.register_state(
+        "gateway_replica_outstanding_tokens",
+        "Prompt plus max_tokens of the requests currently routed to each replica.",
+        "gauge",
+        ("model", "backend"),
+        lambda: {
+            (model, replica.url): replica.tokens
+            for model, pool in pools.items()
+            for replica in pool.replicas
+        },
+    )
+    if state.hedger is not None:
+        hedger: Hedger = state.hedger
+        metrics.register_state(
+            "gateway_hedge_events_total",
+            "Hedging of slow non-streamed requests (eligible, issued, won, denied).",
+            "counter",
+            ("event",),
+            lambda: {(name,): value for name, value in vars(hedger.stats).items()},
+        )
+    if state.tracing is not None:
+        tracing: Tracing = state.tracing
+        metrics.register_state(
+            "gateway_traces_total",
+            "Sampling decisions for request traces (kept_head, kept_error, kept_slow, dropped).",
+            "counter",
+            ("decision",),
+            lambda: {
+                (name,): value for name, value in vars(tracing.stats).items() if name != "started"
+            },
+        )
+    metrics.register_state(
+        "gateway_retries_total",
+        "Non-streamed requests retried on another replica.",
+        "counter",
+        ("model",),
+        lambda: {(model,): pool.retries for model, pool in pools.items()},
+    )
+    return metrics
+
+
+def _invalidate_on_pointer_change(
+    cache: ResponseCache, old: dict[str, str], new: dict[str, str]
+) -> None:
+    # Cache keys are scoped by model version, so this only frees memory early.
+    if old.get("BASE_MODEL_ID") != new.get("BASE_MODEL_ID"):
+        cache.clear()
+    elif old.get("ADAPTER_PATH") != new.get("ADAPTER_PATH"):
+        cache.invalidate_model("ft")
+
+
+def _reload_registry(app: FastAPI, old: dict[str, str], new: dict[str, str]) -> None:
+    settings: Settings = app.state.settings
+    registry: ModelRegistry = app.state.registry
+    if settings.lora_hot_reload and old.get("BASE_MODEL_ID") == new.get("BASE_MODEL_ID"):
+        urls = [replica.url for replica in app.state.pools["ft"].replicas]
+        task = asyncio.create_task(
+            registry.hot_swap_adapter(
+                app.state.client,
+                urls,
+                new,
+                settings.base_model_id,
+                settings.ft_model_name,
+                drain_timeout_s=settings.read_timeout_s,
+            )
+        )
+        app.state.reloads.add(task)
+        task.add_done_callback(app.state.reloads.discard)
+        return
+    # Without hot reload the FT servers are restarted with the new adapter under
+    # the same served name; only the aliases and cache scope change.
+    registry.swap(build_registry(new, settings.base_model_id, settings.ft_model_name))
+
+
+def _store_response(cache: ResponseCache, key: str, model: str, stream: bool, raw: bytes) -> None:
+    if stream:
+        try:
+            body = sse.assemble(raw)
+        except ValueError:
+            return
+        # Without a usage chunk (no ``stream_options.include_usage``) a later
+        # non-streamed hit would answer with ``"usage": null``.
+        if body is None or body.get("usage") is None:
+            return
+        raw = codec.dumps(body)
+    cache.put(key, model, raw)
+
+
+def _cached_response(body: bytes, payload: RequestBody, stream: bool) -> Response:
+    headers = {CACHE_HEADER: "hit"}
+    if not stream:
+        return Response(content=body, media_type="application/json", headers=headers)
+    include_usage = bool((payload.get("stream_options") or {}).get("include_usage"))
+    events = sse.render(codec.loads(body), include_usage=include_usage)
+    return Response(content=b"".join(events), media_type="text/event-stream", headers=headers)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    settings = load_settings()
+    app.state.settings = settings
+    app.state.client = create_client(settings)
+    app.state.pools = {
+        "base": _build_pool(settings, settings.base_api_urls),
+        "ft": _build_pool(settings, settings.ft_api_urls),
+    }
+    app.state.admission = None
+    if settings.admission_enabled:
+        app.state.admission = {
+            name: _build_admission(settings, len(pool.replicas))
+            for name, pool in app.state.pools.items()
+        }
+    if settings.max_tokens_policy not in MAX_TOKENS_POLICIES:
+        raise ValueError(
+            f"Unknown GATEWAY_MAX_TOKENS_POLICY {settings.max_tokens_policy!r}; "
+            f"expected one of {MAX_TOKENS_POLICIES}"
+        )
+    app.state.tokens = None
+    if settings.max_tokens_policy != "off":
+        app.state.tokens = PromptCounter(settings.token_cache_entries)
+    app.state.tracing = create_tracing(settings) if settings.tracing_enabled else None
+    app.state.hedger = None
+    if settings.hedge_enabled:
+        app.state.hedger = Hedger(
+            budget_ratio=settings.hedge_budget,
+            quantile=settings.hedge_quantile,
+            min_delay_s=settings.hedge_min_delay_s,
+        )
+    app.state.cache = None
+    app.state.coalescer = None
+    if settings.coalesce_enabled:
+        app.state.coalescer = Coalescer(settings.coalesce_max_waiters)
+    watcher = PointerWatcher(settings.pointer_path, settings.pointer_poll_s)
+    registry = app.state.registry = ModelRegistry(
+        build_registry(watcher.current, settings.base_model_id, settings.ft_model_name),
+        SwapCoordinator(settings.metrics_dir) if settings.lora_hot_reload else None,
+    )
+    app.state.reloads = set()
+    watcher.subscribe(partial(_reload_registry, app))
+    if settings.cache_enabled:
+        app.state.cache = ResponseCache(
+            max_bytes=settings.cache_max_bytes,
+            max_entry_bytes=settings.cache_max_entry_bytes,
+            ttl_s=settings.cache_ttl_s,
+        )
+        watcher.subscribe(partial(_invalidate_on_pointer_change, app.state.cache))
+    app.state.metrics = None
+    app.state.metrics_exchange = None
+    tasks = [asyncio.create_task(watcher.run())]
+    if settings.lora_hot_reload:
+        registry.coordinator.publish([registry.current.routes[settings.ft_model_name].upstream])
+        ft_urls = [replica.url for replica in app.state.pools["ft"].replicas]
+        tasks.append(
+            asyncio.create_task(
+                registry.resume(
+                    app.state.client, ft_urls, settings.base_model_id, settings.ft_model_name
+                )
+            )
+        )
+    if app.state.tokens is not None:
+        # Loading may mean a Hub download; requests are estimated until it is done.
+        tasks.append(asyncio.create_task(load_into(app.state.tokens, settings.tokenizer)))
+    if settings.metrics_enabled:
+        metrics = app.state.metrics = _build_metrics(app)
+        if settings.metrics_dir is not None:
+            exchange = MetricsExchange(
+                settings.metrics_dir, METRICS_PUBLISH_INTERVAL_S, metrics.merge_modes()
+            )
+            app.state.metrics_exchange = exchange
+            tasks.append(asyncio.create_task(exchange.run(metrics.render)))
+    if settings.health_interval_s > 0:
+        prober = HealthProber(
+            app.state.client,
+            app.state.pools.values(),
+            interval_s=settings.health_interval_s,
+            timeout_s=settings.health_timeout_s,
+            unhealthy_after=settings.health_unhealthy_after,
+            path=settings.health_path,
+        )
+        tasks.append(asyncio.create_task(prober.run()))
+    try:
+        yield
+    finally:
+        tasks.extend(app.state.reloads)
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        if app.state.metrics_exchange is not None:
+            app.state.metrics_exchange.close()
+        registry.coordinator.close()
+        if app.state.tracing is not None:
+            # Flushes spans still queued for export.
+            app.state.tracing.shutdown()
+        await app.state.client.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
+# Tracing sits inside the metrics middleware and reuses its request probe.
+app.add_middleware(TracingMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 
 @app.get("/health")
 def health_check() -> dict[str, str]:
     return {"status": "ok"}
+
+
+@dataclass
+class Call:
+    """What the gateway knows about one proxied request."""
+
+    request: Request
+    path: str
+    payload: RequestBody
+    stream: bool
+    route: ModelRoute
+    prefix: str | None = None
+    tokens: int = 0
+    priority: int = 1
+    on_complete: BodyCallback | None = None
+    probe: RequestProbe | None = None
+    trace: RequestTrace | None = None
+
+    @property
+    def body(self) -> bytes:
+        return self.payload.raw
+
+    @property
+    def pool_name(self) -> str:
+        return self.route.pool
+
+    @property
+    def pool(self) -> ReplicaPool:
+        return self.request.app.state.pools[self.pool_name]
+
+    def bind(self, registry: ModelRegistry) -> None:
+        """Re-resolve against the live registry and fix the body's model name.
+
+        Called right before going upstream, so a request that waited through an
+        adapter swap is sent to the adapter that is live now.
+        """
+        self.route = registry.current.resolve(self.route.name) or self.route
+        if self.payload.get("model") != self.route.upstream:
+            self.payload = self.payload.with_field("model", self.route.upstream)
+
+
+def _priority(request: Request) -> int:
+    try:
+        return min(9, max(0, int(request.headers.get(PRIORITY_HEADER, "1"))))
+    except ValueError:
+        return 1
+
+
+def _noop() -> None:
+    return None
+
+
+async def _admit(call: Call) -> DoneCallback:
+    """Admit ``call`` against its pool's token budget.
+
+    Returns the callback that gives the budget back. Raises ``Overloaded`` when
+    the request is shed.
+    """
+    admission: dict[str, AdmissionController] | None = call.request.app.state.admission
+    if admission is None:
+        return _noop
+    controller = admission[call.pool_name]
+    if call.trace is not None:
+        call.trace.queued = time.time_ns()
+    ticket = await controller.acquire(call.tokens, call.priority)
+    if call.trace is not None:
+        call.trace.admitted = time.time_ns()
+    if call.probe is not None:
+        call.probe.metrics.queue_wait.observe((call.pool_name,), ticket.queue_wait_s)
+    return partial(controller.release, ticket)
+
+
+def _route(
+    call: Call, exclude: list[Replica] | None = None
+) -> tuple[Replica, StartCallback, DoneCallback]:
+    """Pick a replica; returns it with its outcome-reporting and release callbacks."""
+    routing = time.time_ns() if call.trace is not None else 0
+    registry: ModelRegistry = call.request.app.state.registry
+    call.bind(registry)
+    pool = call.pool
+    replica = pool.acquire(call.prefix, exclude or (), call.tokens)
+    # Outcomes of requests sent before a later trip must not close the breaker.
+    generation = replica.breaker.trips
+    upstream = call.route.upstream
+    registry.begin(upstream)
+    if call.probe is not None:
+        call.probe.backend = replica.url
+    attempt = call.trace.attempt(replica.url, routing) if call.trace is not None else None
+    sent_at = time.monotonic()
+
+    def on_start(status: int) -> None:
+        # Headers of a non-streamed response only arrive once generation is
+        # done, so only streams say anything about responsiveness.
+        latency = time.monotonic() - sent_at if call.stream else None
+        pool.record(replica, status, latency, generation)
+        if attempt is not None:
+            attempt.headers = time.time_ns()
+            attempt.status = status
+
+    def release() -> None:
+        pool.release(replica, call.tokens)
+        registry.end(upstream)
+        if attempt is not None:
+            attempt.end = time.time_ns()
+
+    return replica, on_start, release
+
+
+async def _reserve(call: Call) -> tuple[Replica, StartCallback, DoneCallback]:
+    """Admission plus routing; the returned done callback gives both back."""
+    release_admission = await _admit(call)
+    replica, on_start, release_replica = _route(call)
+
+    def done() -> None:
+        release_replica()
+        release_admission()
+
+    return replica, on_start, done
+
+
+async def _attempt(call: Call, tried: list[Replica]) -> tuple[Replica, httpx.Response]:
+    """One non-streamed upstream exchange on a replica not in ``tried``, read in full."""
+    replica, on_start, release = _route(call, tried)
+    tried.append(replica)
+    client: httpx.AsyncClient = call.request.app.state.client
+    upstream_request = build_upstream(client, call.request, f"{replica.url}{call.path}", call.body)
+    try:
+        return replica, await send_reporting(client, upstream_request, on_start, stream=False)
+    finally:
+        release()
+
+
+def _may_hedge(call: Call, tried: list[Replica]) -> bool:
+    """Whether a hedge would add useful load: another replica and no queueing."""
+    if len(tried) >= len(call.pool.replicas):
+        return False
+    admission: dict[str, AdmissionController] | None = call.request.app.state.admission
+    return admission is None or not admission[call.pool_name].snapshot()["queue_depth"]
+
+
+def _answered(outcome: tuple[Replica, httpx.Response]) -> bool:
+    return outcome[1].status_code not in _RETRY_STATUSES
+
+
+async def _fetch(call: Call) -> tuple[Replica, httpx.Response]:
+    """Non-streamed exchange with retries on other replicas, hedged when eligible.
+
+    A retry only happens when the replica refused the request (connection
+    failure or 502/503/504). Admission is the caller's business.
+    """
+    settings: Settings = call.request.app.state.settings
+    hedger: Hedger | None = call.request.app.state.hedger
+    pool = call.pool
+    attempts = min(1 + settings.retries, len(pool.replicas))
+    tried: list[Replica] = []
+    hedge = hedger is not None and len(pool.replicas) > 1 and is_cacheable(call.payload)
+    while True:
+        try:
+            if hedge and not tried:
+                outcome = await hedger.run(
+                    call.pool_name,
+                    partial(_attempt, call, tried),
+                    _answered,
+                    partial(_may_hedge, call, tried),
+                )
+            else:
+                outcome = await _attempt(call, tried)
+        except _RETRY_ERRORS:
+            if len(tried) >= attempts:
+                raise
+        else:
+            if len(tried) >= attempts or _answered(outcome):
+                if call.probe is not None:
+                    call.probe.backend = outcome[0].url
+                return outcome
+        pool.retries += 1
+
+
+async def _proxied(call: Call) -> Response:
+    """Send ``call`` upstream: streams go out once, the rest through ``_fetch``."""
+    request = call.request
+    client: httpx.AsyncClient = request.app.state.client
+    if call.stream:
+        replica, on_start, done = await _reserve(call)
+        return await proxy(
+            client,
+            request,
+            f"{replica.url}{call.path}",
+            call.body,
+            stream=True,
+            on_complete=call.on_complete,
+            on_done=done,
+            on_start=on_start,
+        )
+
+    release_admission = await _admit(call)
+    try:
+        outcome = await race_disconnect(request, _fetch(call))
+    finally:
+        release_admission()
+    if outcome is None:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    return relay(outcome[1], call.on_complete)
+
+
+async def _forward(request: Request, path: str) -> Response:
+    settings: Settings = request.app.state.settings
+    try:
+        payload = read_body(await request.body())
+    except ValueError:
+        return _error(400, "Request body must be a JSON object", "invalid_request_error")
+
+    model = payload.get("model")
+    registry: ModelRegistry = request.app.state.registry
+    route = registry.current.resolve(model)
+    if route is None:
+        return _error(404, f"The model '{model}' does not exist", "invalid_request_error")
+    counter: PromptCounter | None = request.app.state.tokens
+    counts = counter.count(payload) if counter is not None else [payload.prompt_tokens()]
+    clamped = None
+    if counter is not None and counter.exact:
+        try:
+            payload, clamped = fit_to_context(
+                payload, counts, settings.max_model_len, settings.max_tokens_policy, counter.stats
+            )
+        except ContextLengthExceeded as exc:
+            return _error(400, str(exc), "invalid_request_error")
+    call = Call(
+        request=request,
+        path=path,
+        payload=payload,
+        stream=bool(payload.get("stream")),
+        route=route,
+        priority=_priority(request),
+        probe=request.scope.get(PROBE_KEY),
+        trace=request.scope.get(TRACE_KEY),
+    )
+    if call.probe is not None:
+        call.probe.begin(call.pool_name)
+    if call.trace is not None:
+        call.trace.model = call.pool_name
+    cache: ResponseCache | None = request.app.state.cache
+    coalescer: Coalescer | None = request.app.state.coalescer
+    key = None
+    if (cache is not None or coalescer is not None) and is_cacheable(payload):
+        key = payload.cache_key(path, route.version)
+    if cache is not None and key is not None and (not call.stream or settings.cache_replay_stream):
+        entry = cache.get(key)
+        if entry is not None:
+            if call.probe is not None:
+                call.probe.backend = "cache"
+            if call.trace is not None:
+                call.trace.backend = "cache"
+            response = _cached_response(entry.body, payload, call.stream)
+            if clamped is not None:
+                response.headers[MAX_TOKENS_HEADER] = str(clamped)
+            return response
+        call.on_complete = partial(_store_response, cache, key, route.pool, call.stream)
+
+    if settings.routing_policy == "prefix":
+        call.prefix = payload.prefix(settings.prefix_chars)
+    call.tokens = sum(requested_tokens(payload, n, settings.max_model_len) for n in counts)
+    try:
+        response = None
+        if coalescer is not None and key is not None:
+            response = await _coalesced(call, coalescer, _flight_key(key, payload))
+        if response is None:
+            response = await _proxied(call)
+    except Overloaded as exc:
+        if call.probe is not None:
+            call.probe.backend = "shed"
+        if call.trace is not None:
+            call.trace.backend = "shed"
+        controller = request.app.state.admission[call.pool_name]
+        response = _error(429, f"Gateway overloaded: {exc.reason}", "overloaded")
+        response.headers["retry-after"] = str(controller.retry_after(exc))
+        return response
+    except httpx.TimeoutException as exc:
+        if call.probe is not None:
+            call.probe.error_kind = "timeout"
+        if call.trace is not None:
+            call.trace.error = "timeout"
+        return _error(504, f"Upstream timed out: {exc!r}", "upstream_timeout")
+    except httpx.HTTPError as exc:
+        if call.probe is not None:
+            call.probe.error_kind = type(exc).__name__
+        if call.trace is not None:
+            call.trace.error = type(exc).__name__
+        return _error(502, f"Upstream unavailable: {exc!r}", "upstream_error")
+    if call.on_complete is not None:
+        response.headers[CACHE_HEADER] = "miss"
+    if clamped is not None:
+        response.headers[MAX_TOKENS_HEADER] = str(clamped)
+    return response
+
+
+def _flight_key(key: str, payload: RequestBody) -> str:
+    # Identical content delivered differently (JSON vs SSE, with or without a
+    # usage chunk) must not share a flight.
+    include_usage = bool((payload.get("stream_options") or {}).get("include_usage"))
+    return f"{key}:{int(bool(payload.get('stream')))}:{int(include_usage)}"
+
+
+async def _coalesced(call: Call, coalescer: Coalescer, flight_key: str) -> Response | None:
+    """Join or start the flight for ``flight_key``; ``None`` if its waiter cap is hit."""
+    flight = coalescer.get(flight_key)
+    if flight is not None:
+        if not coalescer.admit(flight):
+            return None
+        response = await serve(call.request, flight, call.stream, "follower")
+        if call.probe is not None:
+            call.probe.backend = flight.backend
+        return response
+
+    # Registered before the leader is admitted: requests arriving while it
+    # queues ride on it and take no admission budget of their own.
+    send = _send_streamed if call.stream else _send_fetched
+    leader = coalescer.start(flight_key, partial(send, call), call.on_complete)
+    return await serve(call.request, leader, call.stream, "leader")
+
+
+async def _send_fetched(call: Call, flight: Flight) -> httpx.Response:
+    """A flight's non-streamed exchange: admission, then ``_fetch``."""
+    release_admission = await _admit(call)
+    try:
+        replica, response = await _fetch(call)
+    finally:
+        release_admission()
+    flight.backend = replica.url
+    return response
+
+
+async def _send_streamed(call: Call, flight: Flight) -> httpx.Response:
+    """A flight's stream; admission and the replica are held until it is relayed."""
+    replica, on_start, flight.on_done = await _reserve(call)
+    flight.backend = replica.url
+    client: httpx.AsyncClient = call.request.app.state.client
+    upstream_request = build_upstream(client, call.request, f"{replica.url}{call.path}", call.body)
+    return await send_reporting(client, upstream_request, on_start)
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request) -> Response:
+    return await _forward(request, "/v1/chat/completions")
+
+
+@app.post("/v1/completions")
+async def completions(request: Request) -> Response:
+    return await _forward(request, "/v1/completions")
+
+
+@app.get("/v1/models")
+def list_models(request: Request) -> dict[str, Any]:
+    registry: ModelRegistry = request.app.state.registry
+    return {"object": "list", "data": registry.current.models()}
+
+
+@app.get("/metrics")
+def prometheus_metrics(request: Request) -> Response:
+    metrics: GatewayMetrics | None = request.app.state.metrics
+    if metrics is None:
+        return _error(404, "Metrics are disabled", "not_found")
+    text = metrics.render()
+    exchange: MetricsExchange | None = request.app.state.metrics_exchange
+    if exchange is not None:
+        text = exchange.collect(text)
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
+
+@app.get("/gateway/stats")
+def gateway_stats(request: Request) -> dict[str, Any]:
+    cache: ResponseCache | None = request.app.state.cache
+    coalescer: Coalescer | None = request.app.state.coalescer
+    admission: dict[str, AdmissionController] | None = request.app.state.admission
+    pools: dict[str, ReplicaPool] = request.app.state.pools
+    registry: ModelRegistry = request.app.state.registry
+    hedger: Hedger | None = request.app.state.hedger
+    counter: PromptCounter | None = request.app.state.tokens
+    return {
+        "registry": registry.snapshot(),
+        "prompt_tokens": counter.snapshot() if counter is not None else None,
+        "hedge": hedger.snapshot() if hedger is not None else None,
+        "admission": (
+            {name: ctl.snapshot() for name, ctl in admission.items()} if admission else None
+        ),
+        "cache": cache.snapshot() if cache is not None else None,
+        "coalesce": coalescer.snapshot() if coalescer is not None else None,
+        "routing": {name: pool.report() for name, pool in pools.items()},
+    }
@@ -0,0 +1,455 @@
+"""Prometheus metrics for the gateway, built for the hot path.
+
+Every proxied request and every streamed chunk touches these, so they are plain
+Python lists updated from the event loop (no locks, no per-sample allocation);
+the text exposition format is only rendered when ``/metrics`` is scraped. The
+per-request probe lives in an ASGI middleware so cache hits, coalesced flights
+and plain proxying are all measured at the point where bytes reach the client.
+"""
+
+import asyncio
+import bisect
+import logging
+import os
+import re
+import time
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import Any
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+PROBE_KEY = "gateway.probe"
+INSTRUMENTED_PATHS = frozenset({"/v1/chat/completions", "/v1/completions"})
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+TTFT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+ITL_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.02, 0.04, 0.08, 0.16, 0.32, 0.64, 1.28)
+TOKENS_PER_S_BUCKETS = (1, 5, 10, 20, 40, 60, 80, 100, 150, 200, 300, 500, 1000)
+QUEUE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_USAGE_RE = re.compile(rb'"completion_tokens"\s*:\s*(\d+)')
+_DONE = b"data: [DONE]"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values, strict=True)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(
+        self, name: str, doc: str, labelnames: tuple[str, ...], buckets: tuple[float, ...]
+    ) -> None:
+        self.name = name
+        self.doc = doc
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # labels -> [per-bucket counts (last is +Inf), sum]
+        self._series: dict[tuple[str, ...], list[Any]] = {}
+
+    def _get(self, labels: tuple[str, ...]) -> list[Any]:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        return series
+
+    def observe(self, labels: tuple[str, ...], value: float) -> None:
+        series = self._get(labels)
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def observe_many(self, labels: tuple[str, ...], values: Iterable[float]) -> None:
+        series = self._get(labels)
+        counts, buckets = series[0], self.buckets
+        total = 0.0
+        for value in values:
+            counts[bisect.bisect_left(buckets, value)] += 1
+            total += value
+        series[1] += total
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.doc}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, (counts, total) in self._series.items():
+            running = 0
+            for bound, count in zip(self.buckets, counts, strict=False):
+                running += count
+                le = _labels(self.labelnames, labels, f'le="{bound}"')
+                yield f"{self.name}_bucket{le} {running}"
+            running += counts[-1]
+            le = _labels(self.labelnames, labels, 'le="+Inf"')
+            yield f"{self.name}_bucket{le} {running}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_fmt(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {running}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, doc: str, labelnames: tuple[str, ...]) -> None:
+        self.name = name
+        self.doc = doc
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, labels: tuple[str, ...], amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.doc}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for labels, value in self._values.items():
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_fmt(value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: tuple[str, ...], amount: float = 1) -> None:
+        self.inc(labels, -amount)
+
+
+# Reads {label values: value} from a gateway component at scrape time, for
+# counters the cache/admission/routing code already keeps for itself.
+StateReader = Callable[[], dict[tuple[str, ...], float]]
+
+
+class StateMetric:
+    def __init__(
+        self,
+        name: str,
+        doc: str,
+        kind: str,
+        labelnames: tuple[str, ...],
+        read: StateReader,
+        merge: str = "sum",
+    ) -> None:
+        self.name = name
+        self.doc = doc
+        self.kind = kind
+        self.labelnames = labelnames
+        self.read = read
+        # How values from several worker processes combine (see ``MetricsExchange``).
+        self.merge = merge
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.doc}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for labels, value in self.read().items():
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_fmt(value)}"
+
+
+class GatewayMetrics:
+    def __init__(self) -> None:
+        mb = ("model", "backend")
+        self.request_duration = Histogram(
+            "gateway_request_duration_seconds",
+            "End-to-end request latency as seen by the gateway.",
+            mb,
+            LATENCY_BUCKETS,
+        )
+        self.ttft = Histogram(
+            "gateway_time_to_first_token_seconds",
+            "Time from request arrival to the first streamed body chunk.",
+            mb,
+            TTFT_BUCKETS,
+        )
+        self.itl = Histogram(
+            "gateway_inter_token_latency_seconds",
+            "Gap between consecutive streamed chunks.",
+            mb,
+            ITL_BUCKETS,
+        )
+        self.tokens_per_s = Histogram(
+            "gateway_output_tokens_per_second",
+            "Per-request output tokens per second (decode phase for streams).",
+            mb,
+            TOKENS_PER_S_BUCKETS,
+        )
+        self.queue_wait = Histogram(
+            "gateway_queue_wait_seconds",
+            "Time spent in the admission queue before dispatch.",
+            ("model",),
+            QUEUE_BUCKETS,
+        )
+        self.requests = Counter(
+            "gateway_requests_total", "Completed requests.", ("model", "backend", "status")
+        )
+        self.output_tokens = Counter("gateway_output_tokens_total", "Output tokens delivered.", mb)
+        self.upstream_errors = Counter(
+            "gateway_upstream_errors_total",
+            "Failed upstream exchanges.",
+            ("model", "backend", "kind"),
+        )
+        self.in_flight = Gauge(
+            "gateway_in_flight_requests", "Requests currently inside the gateway.", ("model",)
+        )
+        self.extra: list[StateMetric] = []
+
+    def register_state(
+        self,
+        name: str,
+        doc: str,
+        kind: str,
+        labelnames: tuple[str, ...],
+        read: StateReader,
+        merge: str = "sum",
+    ) -> None:
+        self.extra.append(StateMetric(name, doc, kind, labelnames, read, merge))
+
+    def merge_modes(self) -> dict[str, str]:
+        """Families whose values must not be summed across workers."""
+        return {family.name: family.merge for family in self.extra if family.merge != "sum"}
+
+    def render(self) -> str:
+        families: list[Any] = [
+            self.request_duration,
+            self.ttft,
+            self.itl,
+            self.tokens_per_s,
+            self.queue_wait,
+            self.requests,
+            self.output_tokens,
+            self.upstream_errors,
+            self.in_flight,
+            *self.extra,
+        ]
+        lines: list[str] = []
+        for family in families:
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+
+_MERGE = {"sum": sum, "min": min, "max": max}
+
+
+def _parse_exposition(text: str) -> dict[str, tuple[list[str], dict[str, float]]]:
+    """``{family: (HELP/TYPE lines, {series: value})}`` from text we rendered ourselves."""
+    families: dict[str, tuple[list[str], dict[str, float]]] = {}
+    samples: dict[str, float] = {}
+    for line in text.splitlines():
+        if not line:
+            continue
+        if line.startswith("# HELP "):
+            name = line.split(" ", 3)[2]
+            headers: list[str] = []
+            samples = {}
+            families[name] = (headers, samples)
+            headers.append(line)
+        elif line.startswith("#"):
+            headers.append(line)
+        else:
+            series, _, value = line.rpartition(" ")
+            samples[series] = float(value)
+    return families
+
+
+def _merge_expositions(texts: Iterable[str], modes: dict[str, str]) -> str:
+    merged: dict[str, tuple[list[str], dict[str, list[float]]]] = {}
+    for text in texts:
+        for name, (headers, samples) in _parse_exposition(text).items():
+            _, values = merged.setdefault(name, (headers, {}))
+            for series, value in samples.items():
+                values.setdefault(series, []).append(value)
+    lines: list[str] = []
+    for name, (headers, values) in merged.items():
+        combine = _MERGE[modes.get(name, "sum")]
+        lines.extend(headers)
+        for series, parts in values.items():
+            value = combine(parts)
+            lines.append(f"{series} {_fmt(int(value) if value.is_integer() else value)}")
+    return "\n".join(lines) + "\n"
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MetricsExchange:
+    """Makes ``/metrics`` cover every worker process, not just the one scraped.
+
+    Workers share one listening socket, so a scrape reaches an arbitrary one.
+    Each worker writes its rendered metrics to ``<directory>/<pid>.prom`` every
+    ``interval_s`` seconds; the scraped worker adds its live values to the
+    files of the other live workers. Peers are therefore up to ``interval_s``
+    stale, and the counters of a worker that died drop out (Prometheus treats
+    that as a counter reset).
+    """
+
+    def __init__(self, directory: Path, interval_s: float, modes: dict[str, str]) -> None:
+        self.directory = directory
+        self.interval_s = interval_s
+        self.modes = modes
+        self.path = directory / f"{os.getpid()}.prom"
+
+    def publish(self, text: str) -> None:
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(text, encoding="utf-8")
+        tmp.replace(self.path)
+
+    def collect(self, text: str) -> str:
+        texts = [text]
+        for path in self.directory.glob("*.prom"):
+            if path == self.path or not path.stem.isdigit():
+                continue
+            if not pid_alive(int(path.stem)):
+                path.unlink(missing_ok=True)
+                continue
+            try:
+                texts.append(path.read_text(encoding="utf-8"))
+            except FileNotFoundError:
+                continue
+        return _merge_expositions(texts, self.modes)
+
+    async def run(self, render: Callable[[], str]) -> None:
+        while True:
+            try:
+                self.publish(render())
+            except Exception:
+                logger.exception("Publishing metrics to %s failed", self.path)
+            await asyncio.sleep(self.interval_s)
+
+    def close(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+class RequestProbe:
+    """Per-request measurements; the handler fills in labels as it learns them."""
+
+    __slots__ = (
+        "metrics",
+        "model",
+        "backend",
+        "error_kind",
+        "start",
+        "first",
+        "last",
+        "gaps",
+        "tokens",
+        "tail",
+        "status",
+        "stream",
+        "begun",
+    )
+
+    def __init__(self, metrics: GatewayMetrics) -> None:
+        self.metrics = metrics
+        self.model = "unknown"
+        self.backend = "none"
+        self.error_kind: str | None = None
+        self.start = time.perf_counter()
+        self.first = 0.0
+        self.last = 0.0
+        self.gaps: list[float] = []
+        self.tokens = 0
+        # Last two body chunks: usage and [DONE] only ever appear at the end.
+        self.tail = (b"", b"")
+        self.status = 0
+        self.stream = False
+        self.begun = False
+
+    def begin(self, model: str) -> None:
+        self.model = model
+        self.begun = True
+        self.metrics.in_flight.inc((model,))
+
+    def on_start(self, message: Message) -> None:
+        self.status = message["status"]
+        for name, value in message.get("headers", ()):
+            if name == b"content-type":
+                self.stream = value.startswith(b"text/event-stream")
+                break
+
+    def on_body(self, chunk: bytes) -> None:
+        if not chunk:
+            return
+        now = time.perf_counter()
+        if not self.first:
+            self.first = now
+        else:
+            self.gaps.append(now - self.last)
+        self.last = now
+        if self.stream:
+            self.tokens += chunk.count(b"data:")
+        self.tail = (self.tail[1], chunk)
+
+    def _output_tokens(self) -> int:
+        tail = b"".join(self.tail)
+        match = _USAGE_RE.search(tail)
+        if match:
+            return int(match.group(1))
+        return self.tokens - tail.count(_DONE)
+
+    def finish(self) -> None:
+        metrics = self.metrics
+        end = time.perf_counter()
+        labels = (self.model, self.backend)
+        metrics.request_duration.observe(labels, end - self.start)
+        metrics.requests.inc((self.model, self.backend, str(self.status)))
+        if self.error_kind is not None or self.status >= 500:
+            kind = self.error_kind or f"http_{self.status}"
+            metrics.upstream_errors.inc((self.model, self.backend, kind))
+        if self.begun:
+            metrics.in_flight.dec((self.model,))
+        if self.status != 200:
+            return
+        tokens = self._output_tokens()
+        if self.stream and self.first:
+            metrics.ttft.observe(labels, self.first - self.start)
+            if self.gaps:
+                metrics.itl.observe_many(labels, self.gaps)
+        if tokens > 0:
+            metrics.output_tokens.inc(labels, tokens)
+            decode_s = end - self.first if self.stream and tokens > 1 else end - self.start
+            if decode_s > 0:
+                metrics.tokens_per_s.observe(labels, tokens / decode_s)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: wraps ``send`` for the proxied endpoints only."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] not in INSTRUMENTED_PATHS:
+            await self.app(scope, receive, send)
+            return
+        metrics: GatewayMetrics | None = getattr(scope["app"].state, "metrics", None)
+        if metrics is None:
+            await self.app(scope, receive, send)
+            return
+
+        probe = RequestProbe(metrics)
+        scope[PROBE_KEY] = probe
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.body":
+                probe.on_body(message.get("body", b""))
+            elif message["type"] == "http.response.start":
+                probe.on_start(message)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            probe.finish()
@@ -0,0 +1,70 @@
+"""Watch PHASE2_MODEL_POINTER.txt and report when the base model or adapter changes."""
+
+import asyncio
+import logging
+from collections.abc import Callable
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+PointerCallback = Callable[[dict[str, str], dict[str, str]], None]
+
+
+def read_pointer(path: Path) -> dict[str, str]:
+    """Parse the KEY=VALUE pointer file written by the training repo."""
+    data: dict[str, str] = {}
+    if not path.exists():
+        return data
+    with path.open("r", encoding="utf-8") as handle:
+        for raw in handle:
+            line = raw.strip()
+            if not line or "=" not in line:
+                continue
+            key, value = line.split("=", 1)
+            data[key.strip()] = value.strip()
+    return data
+
+
+class PointerWatcher:
+    """Poll the pointer file and invoke callbacks with ``(old, new)`` on change.
+
+    Polling (rather than inotify) keeps this working on Drive/FUSE mounts in Colab.
+    """
+
+    def __init__(self, path: Path, interval_s: float) -> None:
+        self.path = path
+        self.interval_s = interval_s
+        self.current = read_pointer(path)
+        self._callbacks: list[PointerCallback] = []
+        self._mtime = self._stat()
+
+    def subscribe(self, callback: PointerCallback) -> None:
+        self._callbacks.append(callback)
+
+    def _stat(self) -> float | None:
+        try:
+            return self.path.stat().st_mtime
+        except OSError:
+            return None
+
+    def check(self) -> bool:
+        mtime = self._stat()
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        new = read_pointer(self.path)
+        if new == self.current:
+            return False
+        old, self.current = self.current, new
+        logger.info("Model pointer changed: %s -> %s", old, new)
+        for callback in self._callbacks:
+            callback(old, new)
+        return True
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_s)
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Failed to reload model pointer %s", self.path)
@@ -0,0 +1,226 @@
+"""Pooled upstream client and pass-through proxying to vLLM backends."""
+
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable
+from typing import Any, TypeVar
+
+import httpx
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from .settings import Settings
+from .tracing import TRACE_KEY, RequestTrace
+
+T = TypeVar("T")
+
+# Headers that describe the client<->gateway hop and must not be copied upstream.
+_HOP_BY_HOP = frozenset(
+    {
+        "connection",
+        "content-length",
+        "host",
+        "keep-alive",
+        "proxy-authenticate",
+        "proxy-authorization",
+        "te",
+        "trailer",
+        "transfer-encoding",
+        "upgrade",
+    }
+)
+_PASSBACK_HEADERS = ("content-type", "cache-control")
+
+# Called with the full upstream body once a 200 response has been relayed completely.
+BodyCallback = Callable[[bytes], None]
+
+# Called exactly once when the proxied exchange is over, however it ended.
+DoneCallback = Callable[[], None]
+
+# Called with the upstream status once response headers arrive, or with 0 when
+# the exchange failed before that. Not called if the client left first.
+StartCallback = Callable[[int], None]
+
+# nginx convention for "client closed request"; never reaches the client.
+CLIENT_CLOSED_REQUEST = 499
+
+
+def create_client(settings: Settings) -> httpx.AsyncClient:
+    """Build the long-lived client shared by all requests of one worker."""
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(settings.read_timeout_s, connect=settings.connect_timeout_s),
+        limits=httpx.Limits(
+            max_connections=settings.max_connections,
+            max_keepalive_connections=settings.max_keepalive_connections,
+            keepalive_expiry=settings.keepalive_expiry_s,
+        ),
+    )
+
+
+def upstream_headers(request: Request) -> dict[str, str]:
+    return {key: value for key, value in request.headers.items() if key.lower() not in _HOP_BY_HOP}
+
+
+def build_upstream(
+    client: httpx.AsyncClient, request: Request, url: str, body: bytes
+) -> httpx.Request:
+    """The upstream copy of ``request``, joined to its trace when it is traced.
+
+    Call right after routing: the ``traceparent`` names the latest attempt.
+    """
+    headers = upstream_headers(request)
+    trace: RequestTrace | None = request.scope.get(TRACE_KEY)
+    if trace is None:
+        return client.build_request(request.method, url, content=body, headers=headers)
+    headers["traceparent"] = trace.traceparent()
+    extensions = {"trace": trace.attempts[-1].on_http_event} if trace.attempts else None
+    return client.build_request(
+        request.method, url, content=body, headers=headers, extensions=extensions
+    )
+
+
+def passback_headers(response: httpx.Response) -> dict[str, str]:
+    return {name: response.headers[name] for name in _PASSBACK_HEADERS if name in response.headers}
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    # Only valid once the body has been consumed: from then on the ASGI server
+    # answers receive() with nothing but http.disconnect.
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def race_disconnect(request: Request, awaitable: Awaitable[T]) -> T | None:
+    """Await ``awaitable`` but cancel it if the client goes away first.
+
+    Returns ``None`` on disconnect. Cancelling an in-flight httpx request closes
+    its connection, which is how vLLM learns to abort the sequence.
+    """
+    work = asyncio.ensure_future(awaitable)
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        await asyncio.wait({work, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+    if work.done():
+        return work.result()
+    work.cancel()
+    try:
+        await work
+    except (asyncio.CancelledError, Exception):
+        pass
+    return None
+
+
+class UpstreamStreamingResponse(StreamingResponse):
+    """Relay an upstream body chunk-by-chunk, closing it however the relay ends."""
+
+    def __init__(
+        self,
+        upstream: httpx.Response,
+        on_complete: BodyCallback | None = None,
+        on_done: DoneCallback | None = None,
+        **kwargs: Any,
+    ) -> None:
+        content = upstream.aiter_raw()
+        if on_complete is not None and upstream.status_code == 200:
+            content = _tee(content, on_complete)
+        super().__init__(content, **kwargs)
+        self.upstream = upstream
+        self.on_done = on_done
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.upstream.aclose()
+            if self.on_done is not None:
+                self.on_done()
+
+
+async def _tee(chunks: AsyncIterator[bytes], on_complete: BodyCallback) -> AsyncIterator[bytes]:
+    seen: list[bytes] = []
+    async for chunk in chunks:
+        seen.append(chunk)
+        yield chunk
+    on_complete(b"".join(seen))
+
+
+async def send_reporting(
+    client: httpx.AsyncClient,
+    request: httpx.Request,
+    on_start: StartCallback | None,
+    stream: bool = True,
+) -> httpx.Response:
+    """``client.send`` that reports how the exchange started to ``on_start``."""
+    try:
+        response = await client.send(request, stream=True)
+    except httpx.HTTPError:
+        if on_start is not None:
+            on_start(0)
+        raise
+    if on_start is not None:
+        on_start(response.status_code)
+    if not stream:
+        try:
+            await response.aread()
+        finally:
+            await response.aclose()
+    return response
+
+
+def relay(response: httpx.Response, on_complete: BodyCallback | None = None) -> Response:
+    """Client response for an upstream response that has been read in full."""
+    if on_complete is not None and response.status_code == 200:
+        on_complete(response.content)
+    return Response(
+        content=response.content,
+        status_code=response.status_code,
+        headers=passback_headers(response),
+    )
+
+
+async def proxy(
+    client: httpx.AsyncClient,
+    request: Request,
+    url: str,
+    body: bytes,
+    stream: bool,
+    on_complete: BodyCallback | None = None,
+    on_done: DoneCallback | None = None,
+    on_start: StartCallback | None = None,
+) -> Response:
+    upstream_request = build_upstream(client, request, url, body)
+    if not stream:
+        try:
+            response = await race_disconnect(
+                request, send_reporting(client, upstream_request, on_start, stream=False)
+            )
+        finally:
+            if on_done is not None:
+                on_done()
+        if response is None:
+            return Response(status_code=CLIENT_CLOSED_REQUEST)
+        return relay(response, on_complete)
+
+    try:
+        upstream = await race_disconnect(
+            request, send_reporting(client, upstream_request, on_start)
+        )
+    except BaseException:
+        if on_done is not None:
+            on_done()
+        raise
+    if upstream is None:
+        if on_done is not None:
+            on_done()
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    return UpstreamStreamingResponse(
+        upstream,
+        on_complete,
+        on_done,
+        status_code=upstream.status_code,
+        headers=passback_headers(upstream),
+    )
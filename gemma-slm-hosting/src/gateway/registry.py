@@ -0,0 +1,342 @@
+"""Served-model registry: which client-facing model names go to which backend pool.
+
+Built from ``PHASE2_MODEL_POINTER.txt``. Clients can ask for ``base``, the base
+model id, ``ft`` (the live adapter) or ``ft:<adapter>`` (pinned to a specific
+adapter version, valid while it is the live one). A pointer change builds a new
+immutable ``Registry`` and swaps the reference; requests bind to a route when
+they are dispatched upstream, so nothing in flight is affected.
+
+With ``GATEWAY_LORA_HOT_RELOAD`` the new adapter is loaded into the running FT
+vLLM servers through the runtime LoRA endpoints (the server needs
+``VLLM_ALLOW_RUNTIME_LORA_UPDATING=True``) before the swap, and the previous one
+is unloaded once no request is using it any more, so an adapter deploy needs no
+vLLM restart. With several gateway workers only one of them loads and unloads
+adapters (see ``SwapCoordinator``); the others just move their routes.
+"""
+
+import asyncio
+import fcntl
+import logging
+import os
+import time
+from collections import Counter
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass, field
+from pathlib import Path, PurePath
+from typing import IO, Any
+
+import httpx
+
+from .metrics import pid_alive
+
+logger = logging.getLogger(__name__)
+
+_LOAD_PATH = "/v1/load_lora_adapter"
+_UNLOAD_PATH = "/v1/unload_lora_adapter"
+_POLL_S = 0.25
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    name: str
+    pool: str
+    # Model name the backend serves, substituted into the request body.
+    upstream: str
+    # Base model id or adapter id; scopes cache keys to what actually generates.
+    version: str
+
+
+@dataclass(frozen=True)
+class Registry:
+    routes: Mapping[str, ModelRoute]
+    pointer: Mapping[str, str] = field(default_factory=dict)
+    created_at: float = field(default_factory=time.time)
+
+    def resolve(self, name: Any) -> ModelRoute | None:
+        return self.routes.get(name) if isinstance(name, str) else None
+
+    def models(self) -> list[dict[str, Any]]:
+        return [
+            {
+                "id": route.name,
+                "object": "model",
+                "created": int(self.created_at),
+                "owned_by": "gateway",
+                "root": route.upstream,
+                "version": route.version,
+            }
+            for route in self.routes.values()
+        ]
+
+
+def adapter_id(ft_name: str, adapter_path: str) -> str:
+    """Versioned name for an adapter checkpoint, e.g. ``ft:gemma-3-1b-it-lora-20260114``."""
+    stem = PurePath(adapter_path.rstrip("/")).name
+    return f"{ft_name}:{stem}" if stem else ft_name
+
+
+def build_registry(
+    pointer: Mapping[str, str],
+    base_model_id: str,
+    ft_name: str,
+    ft_upstream: str | None = None,
+) -> Registry:
+    base_id = pointer.get("BASE_MODEL_ID") or base_model_id
+    adapter_path = pointer.get("ADAPTER_PATH", "")
+    ft_version = adapter_id(ft_name, adapter_path)
+    base = ModelRoute("base", "base", base_id, base_id)
+    ft = ModelRoute(ft_name, "ft", ft_upstream or ft_name, ft_version)
+    routes = {
+        "base": base,
+        base_id: ModelRoute(base_id, "base", base_id, base_id),
+        ft_name: ft,
+    }
+    if ft_version != ft_name:
+        routes[ft_version] = ModelRoute(ft_version, "ft", ft.upstream, ft_version)
+    return Registry(routes=routes, pointer=dict(pointer))
+
+
+def _already_loaded(response: httpx.Response) -> bool:
+    # vLLM answers 400 "... has already been loaded"; the adapter is there either way.
+    return response.status_code == 400 and "already" in response.text
+
+
+async def _post_all(
+    client: httpx.AsyncClient, urls: Iterable[str], path: str, body: dict[str, str]
+) -> tuple[list[str], list[str]]:
+    """POST to every URL; returns the ones that answered 200 and the ones that failed.
+
+    A load of an adapter that is already loaded is neither: nothing changed.
+    """
+    urls = list(urls)
+    results = await asyncio.gather(
+        *(client.post(f"{url}{path}", json=body) for url in urls), return_exceptions=True
+    )
+    done, failed = [], []
+    for url, result in zip(urls, results, strict=True):
+        if isinstance(result, BaseException):
+            logger.error("%s %s failed: %s", path, url, result)
+            failed.append(url)
+        elif result.status_code == 200:
+            done.append(url)
+        elif not (path == _LOAD_PATH and _already_loaded(result)):
+            logger.error("%s %s failed: %s", path, url, result.text[:200])
+            failed.append(url)
+    return done, failed
+
+
+async def _served_everywhere(client: httpx.AsyncClient, urls: list[str], model: str) -> bool:
+    """Whether every server lists ``model`` in its ``/v1/models``."""
+    results = await asyncio.gather(
+        *(client.get(f"{url}/v1/models") for url in urls), return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, BaseException) or result.status_code != 200:
+            return False
+        if model not in {entry.get("id") for entry in result.json().get("data", [])}:
+            return False
+    return True
+
+
+class SwapCoordinator:
+    """Elects the one gateway worker that loads and unloads FT adapters.
+
+    Every worker sees the same pointer change, but the FT servers are shared:
+    a second worker's rollback after "already loaded", or its unload of the old
+    adapter, would pull the adapter out from under the others. The worker that
+    holds an exclusive lock on ``<directory>/adapter-swap.lock`` does the vLLM
+    calls; the others wait for the new adapter to show up in the servers'
+    ``/v1/models`` and only swap their routes. Each worker lists the adapters
+    it still sends requests to in ``<directory>/<pid>.adapters``, and the
+    leader unloads the old one only when no live worker lists it any more.
+
+    Without a directory (a single worker) this worker does everything.
+    """
+
+    def __init__(self, directory: Path | None, pid: int | None = None) -> None:
+        self.directory = directory
+        self.pid = pid if pid is not None else os.getpid()
+        self._lock: IO[bytes] | None = None
+        self.path = directory / f"{self.pid}.adapters" if directory is not None else None
+
+    def is_leader(self) -> bool:
+        """Take the lock if nobody holds it; once taken it is held until ``close``."""
+        if self.directory is None or self._lock is not None:
+            return True
+        handle = (self.directory / "adapter-swap.lock").open("ab")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            handle.close()
+            return False
+        self._lock = handle
+        return True
+
+    def publish(self, upstreams: Iterable[str]) -> None:
+        if self.path is None:
+            return
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text("\n".join(sorted(set(upstreams))) + "\n", encoding="utf-8")
+        tmp.replace(self.path)
+
+    def in_use_elsewhere(self, upstream: str) -> bool:
+        if self.directory is None:
+            return False
+        for path in self.directory.glob("*.adapters"):
+            if path == self.path or not path.stem.isdigit():
+                continue
+            if not pid_alive(int(path.stem)):
+                path.unlink(missing_ok=True)
+                continue
+            try:
+                if upstream in path.read_text(encoding="utf-8").split():
+                    return True
+            except FileNotFoundError:
+                continue
+        return False
+
+    def close(self) -> None:
+        if self.path is not None:
+            self.path.unlink(missing_ok=True)
+        if self._lock is not None:
+            self._lock.close()
+            self._lock = None
+
+
+class ModelRegistry:
+    """Holds the current ``Registry`` and counts upstream exchanges per served model."""
+
+    def __init__(self, current: Registry, coordinator: SwapCoordinator | None = None) -> None:
+        self.current = current
+        self.swaps = 0
+        self.coordinator = coordinator or SwapCoordinator(None)
+        self._in_flight: Counter[str] = Counter()
+        self._reload_lock = asyncio.Lock()
+
+    def swap(self, new: Registry) -> Registry:
+        old, self.current = self.current, new
+        self.swaps += 1
+        logger.info("Model registry swapped: %s", sorted(new.routes))
+        return old
+
+    def begin(self, upstream: str) -> None:
+        self._in_flight[upstream] += 1
+
+    def end(self, upstream: str) -> None:
+        self._in_flight[upstream] -= 1
+        if self._in_flight[upstream] <= 0:
+            del self._in_flight[upstream]
+
+    async def drained(self, upstream: str, timeout_s: float) -> bool:
+        deadline = time.monotonic() + timeout_s
+        while self._in_flight.get(upstream):
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(_POLL_S)
+        return True
+
+    async def _released_by_peers(self, upstream: str, timeout_s: float) -> bool:
+        deadline = time.monotonic() + timeout_s
+        while self.coordinator.in_use_elsewhere(upstream):
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(_POLL_S)
+        return True
+
+    async def _loaded_by_leader(
+        self, client: httpx.AsyncClient, urls: list[str], upstream: str, timeout_s: float
+    ) -> bool:
+        deadline = time.monotonic() + timeout_s
+        while not await _served_everywhere(client, urls, upstream):
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(_POLL_S)
+        return True
+
+    async def resume(
+        self,
+        client: httpx.AsyncClient,
+        urls: Iterable[str],
+        base_model_id: str,
+        ft_name: str,
+    ) -> bool:
+        """Route to the pointer's adapter if the FT servers already serve it.
+
+        A worker (re)started after a hot swap would otherwise send ``ft`` to the
+        served name the servers were started with, which may be unloaded.
+        """
+        async with self._reload_lock:
+            pointer = self.current.pointer
+            upstream = adapter_id(ft_name, pointer.get("ADAPTER_PATH", ""))
+            if upstream == self.current.routes[ft_name].upstream:
+                return False
+            if not await _served_everywhere(client, list(urls), upstream):
+                return False
+            self.swap(build_registry(pointer, base_model_id, ft_name, ft_upstream=upstream))
+            self.coordinator.publish([upstream])
+            return True
+
+    async def hot_swap_adapter(
+        self,
+        client: httpx.AsyncClient,
+        urls: Iterable[str],
+        pointer: Mapping[str, str],
+        base_model_id: str,
+        ft_name: str,
+        drain_timeout_s: float,
+    ) -> bool:
+        """Load the pointer's adapter into the FT servers, swap, then retire the old one."""
+        async with self._reload_lock:
+            return await self._hot_swap_adapter(
+                client, list(urls), pointer, base_model_id, ft_name, drain_timeout_s
+            )
+
+    async def _hot_swap_adapter(
+        self,
+        client: httpx.AsyncClient,
+        urls: list[str],
+        pointer: Mapping[str, str],
+        base_model_id: str,
+        ft_name: str,
+        drain_timeout_s: float,
+    ) -> bool:
+        adapter_path = pointer.get("ADAPTER_PATH", "")
+        new_upstream = adapter_id(ft_name, adapter_path)
+        old_upstream = self.current.routes[ft_name].upstream
+        if new_upstream == old_upstream:
+            return False
+        leader = self.coordinator.is_leader()
+        if leader:
+            load = {"lora_name": new_upstream, "lora_path": adapter_path}
+            loaded, failed = await _post_all(client, urls, _LOAD_PATH, load)
+            if failed:
+                # Roll back what this call loaded; keep serving the old adapter.
+                await _post_all(client, loaded, _UNLOAD_PATH, {"lora_name": new_upstream})
+                return False
+        elif not await self._loaded_by_leader(client, urls, new_upstream, drain_timeout_s):
+            logger.warning(
+                "%s did not appear on the FT servers; keeping %s", new_upstream, old_upstream
+            )
+            return False
+        self.swap(build_registry(pointer, base_model_id, ft_name, ft_upstream=new_upstream))
+        self.coordinator.publish([new_upstream, old_upstream])
+        if not await self.drained(old_upstream, drain_timeout_s):
+            logger.warning("Retiring %s with requests still in flight", old_upstream)
+        self.coordinator.publish([new_upstream])
+        if not leader:
+            return True
+        if not await self._released_by_peers(old_upstream, drain_timeout_s):
+            logger.warning("Unloading %s while other workers may still use it", old_upstream)
+        await _post_all(client, urls, _UNLOAD_PATH, {"lora_name": old_upstream})
+        return True
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "routes": {
+                name: {"pool": route.pool, "upstream": route.upstream, "version": route.version}
+                for name, route in self.current.routes.items()
+            },
+            "pointer": dict(self.current.pointer),
+            "swaps": self.swaps,
+            "in_flight": dict(self._in_flight),
+        }
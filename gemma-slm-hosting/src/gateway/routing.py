@@ -0,0 +1,265 @@
+"""Replica selection: prefix-affinity via bounded-load consistent hashing.
+
+vLLM's automatic prefix caching only pays off if requests sharing a prefix
+(system prompt, few-shot block) keep landing on the same replica. Hashing the
+leading characters of the rendered conversation onto a ring gives that
+affinity; capping each replica at ``ceil(c * (in_flight + 1) / n)`` keeps one
+hot prefix from pinning all traffic to a single server.
+
+Without affinity, ``least_outstanding`` and ``p2c`` (power of two choices)
+balance on in-flight counts, and ``least_tokens`` on the tokens those requests
+hold (prompt plus ``max_tokens``), which tracks KV-cache pressure when request
+sizes vary widely. Every policy only considers replicas that pass
+their health probe and whose circuit breaker is closed; if none do, all of
+them are eligible again rather than failing every request.
+"""
+
+import bisect
+import hashlib
+import itertools
+import math
+import random
+from collections import OrderedDict
+from collections.abc import Callable, Collection
+from dataclasses import dataclass, field
+from typing import Any
+
+from .breaker import CircuitBreaker
+
+POLICIES = ("prefix", "round_robin", "least_outstanding", "least_tokens", "p2c")
+
+# How many recent prefixes we remember to classify routes as warm or cold.
+_PREFIX_MEMORY = 65536
+
+
+def _hash64(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big")
+
+
+def render_prefix(payload: dict[str, Any], max_chars: int) -> str:
+    """Leading ``max_chars`` of the conversation as the model would see it."""
+    messages = payload.get("messages")
+    if isinstance(messages, list):
+        parts: list[str] = []
+        size = 0
+        for message in messages:
+            if not isinstance(message, dict):
+                continue
+            content = message.get("content")
+            if not isinstance(content, str):
+                # Multi-part content: only the text parts contribute to the prefix.
+                content = "".join(
+                    part.get("text", "")
+                    for part in content or []
+                    if isinstance(part, dict) and part.get("type") == "text"
+                )
+            piece = f"<{message.get('role', '')}>{content}\n"
+            parts.append(piece)
+            size += len(piece)
+            if size >= max_chars:
+                break
+        return "".join(parts)[:max_chars]
+    prompt = payload.get("prompt")
+    if isinstance(prompt, list):
+        prompt = prompt[0] if prompt and isinstance(prompt[0], str) else ""
+    return str(prompt or "")[:max_chars]
+
+
+@dataclass
+class Replica:
+    url: str
+    in_flight: int = 0
+    tokens: int = 0
+    routed: int = 0
+    warm: int = 0
+    cold: int = 0
+    spilled: int = 0
+    failures: int = 0
+    healthy: bool = True
+    breaker: CircuitBreaker = field(default_factory=CircuitBreaker)
+
+    @property
+    def available(self) -> bool:
+        return self.healthy and self.breaker.allows()
+
+    def report(self) -> dict[str, Any]:
+        keyed = self.warm + self.cold
+        return {
+            "url": self.url,
+            "in_flight": self.in_flight,
+            "outstanding_tokens": self.tokens,
+            "routed": self.routed,
+            "prefix_warm": self.warm,
+            "prefix_cold": self.cold,
+            "prefix_hit_rate": self.warm / keyed if keyed else 0.0,
+            "spilled_in": self.spilled,
+            "failures": self.failures,
+            "healthy": self.healthy,
+            "breaker": self.breaker.snapshot(),
+        }
+
+
+class ReplicaPool:
+    def __init__(
+        self,
+        urls: list[str],
+        policy: str = "prefix",
+        load_factor: float = 1.25,
+        vnodes: int = 64,
+        breaker: Callable[[], CircuitBreaker] = CircuitBreaker,
+    ) -> None:
+        if not urls:
+            raise ValueError("ReplicaPool needs at least one replica URL")
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown routing policy {policy!r}; expected one of {POLICIES}")
+        self.policy = policy
+        self.load_factor = load_factor
+        self.replicas = [Replica(url, breaker=breaker()) for url in urls]
+        points = sorted(
+            (_hash64(f"{replica.url}#{v}".encode()), idx)
+            for idx, replica in enumerate(self.replicas)
+            for v in range(vnodes)
+        )
+        self._ring = [point for point, _ in points]
+        self._owners = [idx for _, idx in points]
+        self._rr = itertools.count()
+        self._random = random.Random()
+        self._last_replica: OrderedDict[int, int] = OrderedDict()
+        self.retries = 0
+        self.panics = 0
+
+    def _candidates(self, exclude: Collection[Replica]) -> list[int]:
+        """Indices eligible for the next request, best effort when all are out."""
+        allowed = [idx for idx, r in enumerate(self.replicas) if r not in exclude]
+        available = [idx for idx in allowed if self.replicas[idx].available]
+        if available:
+            return available
+        self.panics += 1
+        return allowed or list(range(len(self.replicas)))
+
+    def _capacity(self, candidates: list[int]) -> int:
+        total = sum(self.replicas[idx].in_flight for idx in candidates)
+        return max(1, math.ceil(self.load_factor * (total + 1) / len(candidates)))
+
+    def _by_ring(self, key: int, candidates: list[int]) -> tuple[int, bool]:
+        """Owner of ``key``, walking clockwise past replicas at capacity or out.
+
+        The flag says whether the request spilled: its owner could have taken
+        it but was at capacity. Landing elsewhere because the owner is out
+        (excluded for a retry, unhealthy or tripped) is failover, not a spill.
+        """
+        cap = self._capacity(candidates)
+        eligible = set(candidates)
+        start = bisect.bisect(self._ring, key) % len(self._ring)
+        primary = self._owners[start]
+        primary_eligible = primary in eligible
+        seen: set[int] = set()
+        fallback = None
+        for step in range(len(self._ring)):
+            idx = self._owners[(start + step) % len(self._ring)]
+            if idx in seen or idx not in eligible:
+                continue
+            if self.replicas[idx].in_flight < cap:
+                return idx, primary_eligible and idx != primary
+            if fallback is None:
+                fallback = idx
+            seen.add(idx)
+            if len(seen) == len(eligible):
+                break
+        if fallback is None:
+            return primary, False
+        return fallback, primary_eligible and fallback != primary
+
+    def _least_outstanding(self, candidates: list[int]) -> int:
+        # Rotate the scan start so ties do not all go to the first replica.
+        offset = next(self._rr)
+        rotated = candidates[offset % len(candidates) :] + candidates[: offset % len(candidates)]
+        return min(rotated, key=lambda idx: self.replicas[idx].in_flight)
+
+    def _least_tokens(self, candidates: list[int]) -> int:
+        offset = next(self._rr)
+        rotated = candidates[offset % len(candidates) :] + candidates[: offset % len(candidates)]
+        return min(
+            rotated, key=lambda idx: (self.replicas[idx].tokens, self.replicas[idx].in_flight)
+        )
+
+    def _two_choices(self, candidates: list[int]) -> int:
+        if len(candidates) < 2:
+            return candidates[0]
+        a, b = self._random.sample(candidates, 2)
+        return a if self.replicas[a].in_flight <= self.replicas[b].in_flight else b
+
+    def acquire(
+        self, prefix: str | None = None, exclude: Collection[Replica] = (), tokens: int = 0
+    ) -> Replica:
+        """Pick a replica and count the request against it until ``release``.
+
+        ``exclude`` holds replicas already tried for this request; ``tokens`` is
+        what the request will hold on the replica (prompt plus ``max_tokens``).
+        """
+        key = _hash64(prefix.encode("utf-8")) if prefix else None
+        candidates = self._candidates(exclude)
+        spilled = False
+        if len(candidates) == 1:
+            idx = candidates[0]
+        elif self.policy == "prefix" and key is not None:
+            idx, spilled = self._by_ring(key, candidates)
+        elif self.policy == "least_outstanding":
+            idx = self._least_outstanding(candidates)
+        elif self.policy == "least_tokens":
+            idx = self._least_tokens(candidates)
+        elif self.policy == "p2c":
+            idx = self._two_choices(candidates)
+        else:
+            idx = candidates[next(self._rr) % len(candidates)]
+
+        replica = self.replicas[idx]
+        replica.in_flight += 1
+        replica.tokens += tokens
+        replica.routed += 1
+        replica.breaker.on_dispatch()
+        if spilled:
+            replica.spilled += 1
+        if key is not None:
+            self._record_prefix(key, idx)
+        return replica
+
+    def release(self, replica: Replica, tokens: int = 0) -> None:
+        replica.in_flight -= 1
+        replica.tokens -= tokens
+
+    def record(
+        self,
+        replica: Replica,
+        status: int,
+        latency_s: float | None = None,
+        generation: int | None = None,
+    ) -> None:
+        """Feed the outcome of one upstream exchange to the replica's breaker.
+
+        ``status`` is the upstream HTTP status, or 0 if no response arrived;
+        ``generation`` is the breaker's ``trips`` when the request was routed.
+        """
+        ok = 0 < status < 500
+        if not ok:
+            replica.failures += 1
+        replica.breaker.record(ok, latency_s, generation)
+
+    def _record_prefix(self, key: int, idx: int) -> None:
+        last = self._last_replica.pop(key, None)
+        if last == idx:
+            self.replicas[idx].warm += 1
+        else:
+            self.replicas[idx].cold += 1
+        self._last_replica[key] = idx
+        if len(self._last_replica) > _PREFIX_MEMORY:
+            self._last_replica.popitem(last=False)
+
+    def report(self) -> dict[str, Any]:
+        return {
+            "policy": self.policy,
+            "load_factor": self.load_factor,
+            "retries": self.retries,
+            "panics": self.panics,
+            "replicas": [replica.report() for replica in self.replicas],
+        }
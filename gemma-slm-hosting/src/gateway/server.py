@@ -0,0 +1,120 @@
+"""Production launcher: ``python -m gateway.server`` (what ``scripts/run_gateway.sh`` runs).
+
+Runs the gateway as N uvicorn worker processes behind one listening socket.
+The parent is uvicorn's pre-fork supervisor: it binds the port once, spawns the
+workers, restarts any that die and does a rolling restart on ``SIGHUP``. It
+never imports the app, so it starts in well under a second and stays small;
+each worker imports ``gateway.main`` itself and its lifespan builds its own
+httpx connection pool, cache, admission controller and health prober.
+
+On ``SIGTERM``/``SIGINT`` every worker stops accepting connections, lets
+requests in flight (streams included) finish for up to ``--graceful-timeout``
+seconds, then runs the lifespan shutdown, which closes the upstream pool.
+
+uvloop and httptools are used when installed, asyncio and h11 otherwise.
+"""
+
+import argparse
+import importlib.util
+import logging
+import os
+import shutil
+import tempfile
+
+import uvicorn
+
+APP = "gateway.main:app"
+
+logger = logging.getLogger(__name__)
+
+
+def _cpu_count() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _installed(module: str) -> bool:
+    # find_spec locates the module without importing it.
+    return importlib.util.find_spec(module) is not None
+
+
+def _env_number(name: str, default: float) -> float:
+    raw = os.getenv(name, "")
+    return float(raw) if raw.strip() else default
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the gateway with N worker processes.")
+    parser.add_argument("--host", default=os.getenv("GATEWAY_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(_env_number("GATEWAY_PORT", 8080)))
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(_env_number("GATEWAY_WORKERS", 0)),
+        help="Worker processes; 0 means one per CPU available to this process",
+    )
+    parser.add_argument(
+        "--graceful-timeout",
+        type=float,
+        default=_env_number("GATEWAY_GRACEFUL_TIMEOUT", 30.0),
+        help="Seconds in-flight requests get to finish after SIGTERM",
+    )
+    parser.add_argument(
+        "--keep-alive",
+        type=float,
+        default=_env_number("GATEWAY_KEEP_ALIVE", 75.0),
+        help="Idle client keep-alive; keep it above the load balancer's idle timeout",
+    )
+    parser.add_argument("--backlog", type=int, default=int(_env_number("GATEWAY_BACKLOG", 2048)))
+    parser.add_argument(
+        "--loop", default="uvloop" if _installed("uvloop") else "asyncio", help="uvicorn loop"
+    )
+    parser.add_argument(
+        "--http", default="httptools" if _installed("httptools") else "h11", help="uvicorn http"
+    )
+    parser.add_argument("--log-level", default=os.getenv("GATEWAY_LOG_LEVEL", "info"))
+    parser.add_argument("--access-log", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    workers = args.workers if args.workers > 0 else _cpu_count()
+    # Read by every worker's settings: admission budgets are split between them,
+    # and a shared directory lets /metrics aggregate all of them and elects the
+    # one worker that loads and unloads LoRA adapters.
+    os.environ["GATEWAY_WORKERS"] = str(workers)
+    own_metrics_dir = None
+    if workers > 1 and not os.getenv("GATEWAY_METRICS_DIR"):
+        own_metrics_dir = tempfile.mkdtemp(prefix="gateway-metrics-")
+        os.environ["GATEWAY_METRICS_DIR"] = own_metrics_dir
+
+    logging.basicConfig(level=args.log_level.upper())
+    logger.info(
+        "Starting %d worker(s) on %s:%d (loop=%s, http=%s)",
+        workers,
+        args.host,
+        args.port,
+        args.loop,
+        args.http,
+    )
+    try:
+        uvicorn.run(
+            APP,
+            host=args.host,
+            port=args.port,
+            workers=workers,
+            loop=args.loop,
+            http=args.http,
+            backlog=args.backlog,
+            timeout_keep_alive=int(args.keep_alive),
+            timeout_graceful_shutdown=int(args.graceful_timeout),
+            access_log=args.access_log,
+            log_level=args.log_level,
+            server_header=False,
+        )
+    finally:
+        if own_metrics_dir is not None:
+            shutil.rmtree(own_metrics_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,172 @@
-"""Gateway settings placeholder."""
+"""Gateway settings loaded from the environment (.env)."""
+
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+# The training repo sits next to this one; its pointer names the live adapter.
+_DEFAULT_POINTER = (
+    Path(__file__).resolve().parents[3] / "gemma-slm-training" / "PHASE2_MODEL_POINTER.txt"
+)
+
+
+def _normalize_url(url: str) -> str:
+    url = url.strip()
+    if url.endswith("/v1"):
+        url = url[: -len("/v1")]
+    return url.rstrip("/")
+
+
+def _env_urls(name: str, default: str) -> tuple[str, ...]:
+    """Comma-separated replica URLs; a single URL is a one-replica pool."""
+    raw = os.getenv(name, "") or default
+    urls = (_normalize_url(part) for part in raw.split(","))
+    return tuple(dict.fromkeys(url for url in urls if url))
+
+
+def _env_float(name: str, default: float) -> float:
+    raw = os.getenv(name, "")
+    return float(raw) if raw.strip() else default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    raw = os.getenv(name, "")
+    if not raw.strip():
+        return default
+    return raw.strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _env_int(name: str, default: int) -> int:
+    raw = os.getenv(name, "")
+    return int(raw) if raw.strip() else default
+
+
+@dataclass(frozen=True)
+class Settings:
+    base_api_urls: tuple[str, ...]
+    ft_api_urls: tuple[str, ...]
+    base_model_id: str
+    ft_model_name: str
+    connect_timeout_s: float
+    read_timeout_s: float
+    max_connections: int
+    max_keepalive_connections: int
+    keepalive_expiry_s: float
+    cache_enabled: bool
+    cache_max_bytes: int
+    cache_max_entry_bytes: int
+    cache_ttl_s: float
+    cache_replay_stream: bool
+    pointer_path: Path
+    pointer_poll_s: float
+    coalesce_enabled: bool
+    coalesce_max_waiters: int
+    max_model_len: int
+    admission_enabled: bool
+    admission_token_budget: int
+    admission_max_seqs: int
+    admission_max_queue: int
+    admission_max_queue_wait_s: float
+    admission_slo_s: float
+    metrics_enabled: bool
+    routing_policy: str
+    prefix_chars: int
+    load_factor: float
+    hash_vnodes: int
+    retries: int
+    health_interval_s: float
+    health_timeout_s: float
+    health_unhealthy_after: int
+    health_path: str
+    breaker_window: int
+    breaker_min_calls: int
+    breaker_failure_ratio: float
+    breaker_slow_call_s: float
+    breaker_open_s: float
+    lora_hot_reload: bool
+    max_tokens_policy: str
+    tokenizer: str
+    token_cache_entries: int
+    hedge_enabled: bool
+    hedge_budget: float
+    hedge_quantile: float
+    hedge_min_delay_s: float
+    tracing_enabled: bool
+    trace_sample_ratio: float
+    trace_slow_s: float
+    trace_slow_first_byte_s: float
+    workers: int
+    metrics_dir: Path | None
+
+
+def load_settings() -> Settings:
+    max_model_len = _env_int("MAX_MODEL_LEN", 2048)
+    max_num_seqs = _env_int("MAX_NUM_SEQS", 128)
+    base_model_id = os.getenv("BASE_MODEL_ID", "google/gemma-3-1b-it")
+    return Settings(
+        base_api_urls=_env_urls("BASE_API_URL", "http://127.0.0.1:8000"),
+        ft_api_urls=_env_urls("FT_API_URL", "http://127.0.0.1:8001"),
+        base_model_id=base_model_id,
+        ft_model_name=os.getenv("FT_SERVED_MODEL_NAME", "ft"),
+        connect_timeout_s=_env_float("GATEWAY_CONNECT_TIMEOUT", 5.0),
+        read_timeout_s=_env_float("GATEWAY_READ_TIMEOUT", 300.0),
+        max_connections=_env_int("GATEWAY_MAX_CONNECTIONS", 512),
+        max_keepalive_connections=_env_int("GATEWAY_MAX_KEEPALIVE", 128),
+        keepalive_expiry_s=_env_float("GATEWAY_KEEPALIVE_EXPIRY", 60.0),
+        cache_enabled=_env_bool("GATEWAY_CACHE_ENABLED", True),
+        cache_max_bytes=_env_int("GATEWAY_CACHE_MAX_BYTES", 64 * 1024 * 1024),
+        cache_max_entry_bytes=_env_int("GATEWAY_CACHE_MAX_ENTRY_BYTES", 1024 * 1024),
+        cache_ttl_s=_env_float("GATEWAY_CACHE_TTL", 600.0),
+        cache_replay_stream=_env_bool("GATEWAY_CACHE_REPLAY_STREAM", True),
+        pointer_path=Path(os.getenv("MODEL_POINTER_PATH", "") or _DEFAULT_POINTER),
+        pointer_poll_s=_env_float("MODEL_POINTER_POLL", 5.0),
+        coalesce_enabled=_env_bool("GATEWAY_COALESCE_ENABLED", True),
+        coalesce_max_waiters=_env_int("GATEWAY_COALESCE_MAX_WAITERS", 64),
+        max_model_len=max_model_len,
+        admission_enabled=_env_bool("GATEWAY_ADMISSION_ENABLED", True),
+        # Per replica; pools scale these by their replica count.
+        admission_token_budget=_env_int(
+            "GATEWAY_ADMISSION_TOKEN_BUDGET", max_num_seqs * max_model_len
+        ),
+        admission_max_seqs=_env_int("GATEWAY_ADMISSION_MAX_SEQS", max_num_seqs),
+        admission_max_queue=_env_int("GATEWAY_ADMISSION_MAX_QUEUE", 256),
+        admission_max_queue_wait_s=_env_float("GATEWAY_ADMISSION_MAX_QUEUE_WAIT", 10.0),
+        admission_slo_s=_env_float("GATEWAY_ADMISSION_SLO", 5.0),
+        metrics_enabled=_env_bool("GATEWAY_METRICS_ENABLED", True),
+        routing_policy=os.getenv("GATEWAY_ROUTING", "prefix"),
+        prefix_chars=_env_int("GATEWAY_PREFIX_CHARS", 256),
+        load_factor=_env_float("GATEWAY_LOAD_FACTOR", 1.25),
+        hash_vnodes=_env_int("GATEWAY_HASH_VNODES", 64),
+        retries=_env_int("GATEWAY_RETRIES", 1),
+        health_interval_s=_env_float("GATEWAY_HEALTH_INTERVAL", 5.0),
+        health_timeout_s=_env_float("GATEWAY_HEALTH_TIMEOUT", 2.0),
+        health_unhealthy_after=_env_int("GATEWAY_HEALTH_UNHEALTHY_AFTER", 2),
+        health_path=os.getenv("GATEWAY_HEALTH_PATH", "/v1/models"),
+        breaker_window=_env_int("GATEWAY_BREAKER_WINDOW", 20),
+        breaker_min_calls=_env_int("GATEWAY_BREAKER_MIN_CALLS", 5),
+        breaker_failure_ratio=_env_float("GATEWAY_BREAKER_FAILURE_RATIO", 0.5),
+        # Time to response headers on streamed requests; 0 disables slow-call tripping.
+        breaker_slow_call_s=_env_float("GATEWAY_BREAKER_SLOW_CALL", 10.0),
+        breaker_open_s=_env_float("GATEWAY_BREAKER_OPEN", 10.0),
+        lora_hot_reload=_env_bool("GATEWAY_LORA_HOT_RELOAD", False),
+        # What to do when prompt + max_tokens exceeds MAX_MODEL_LEN: clamp, reject or off.
+        max_tokens_policy=os.getenv("GATEWAY_MAX_TOKENS_POLICY", "clamp"),
+        # tokenizer.json path, model directory or Hub id; the base model by default.
+        tokenizer=os.getenv("GATEWAY_TOKENIZER", "") or base_model_id,
+        token_cache_entries=_env_int("GATEWAY_TOKEN_CACHE_ENTRIES", 8192),
+        hedge_enabled=_env_bool("GATEWAY_HEDGE_ENABLED", False),
+        # Hedges as a fraction of eligible requests, i.e. the most extra load allowed.
+        hedge_budget=_env_float("GATEWAY_HEDGE_BUDGET", 0.05),
+        hedge_quantile=_env_float("GATEWAY_HEDGE_QUANTILE", 0.95),
+        hedge_min_delay_s=_env_float("GATEWAY_HEDGE_MIN_DELAY", 0.05),
+        tracing_enabled=_env_bool("GATEWAY_TRACING_ENABLED", False),
+        trace_sample_ratio=_env_float("GATEWAY_TRACE_SAMPLE_RATIO", 0.01),
+        # Requests slower than these are always traced, whatever the sample ratio.
+        trace_slow_s=_env_float("GATEWAY_TRACE_SLOW", 30.0),
+        trace_slow_first_byte_s=_env_float("GATEWAY_TRACE_SLOW_FIRST_BYTE", 2.0),
+        # Set by ``python -m gateway.server`` for every worker it starts.
+        workers=max(1, _env_int("GATEWAY_WORKERS", 1)),
+        metrics_dir=Path(os.environ["GATEWAY_METRICS_DIR"])
+        if os.getenv("GATEWAY_METRICS_DIR")
+        else None,
+    )
@@ -0,0 +1,105 @@
+"""Conversions between OpenAI SSE streams and whole (non-streamed) responses."""
+
+from typing import Any
+
+from . import codec
+
+DONE = b"data: [DONE]\n\n"
+
+
+def iter_events(raw: bytes) -> list[dict[str, Any]]:
+    """Decode the JSON payloads of every ``data:`` line, skipping ``[DONE]``."""
+    events: list[dict[str, Any]] = []
+    for line in raw.splitlines():
+        if not line.startswith(b"data:"):
+            continue
+        data = line[len(b"data:") :].strip()
+        if not data or data == b"[DONE]":
+            continue
+        events.append(codec.loads(data))
+    return events
+
+
+def assemble(raw: bytes) -> dict[str, Any] | None:
+    """Rebuild the non-streamed response body from a complete SSE stream.
+
+    Returns ``None`` if the stream carries anything beyond plain text deltas
+    (tool calls, logprobs, errors), since those cannot be replayed faithfully.
+    """
+    events = iter_events(raw)
+    if not events:
+        return None
+    first = events[0]
+    chat = first.get("object", "").startswith("chat.")
+    texts: dict[int, list[str]] = {}
+    finish: dict[int, str | None] = {}
+    usage = None
+    for event in events:
+        if "error" in event:
+            return None
+        usage = event.get("usage") or usage
+        for choice in event.get("choices", []):
+            if choice.get("logprobs"):
+                return None
+            idx = choice.get("index", 0)
+            if chat:
+                delta = choice.get("delta") or {}
+                if set(delta) - {"role", "content"}:
+                    return None
+                piece = delta.get("content")
+            else:
+                piece = choice.get("text")
+            texts.setdefault(idx, [])
+            if piece:
+                texts[idx].append(piece)
+            if choice.get("finish_reason") is not None:
+                finish[idx] = choice["finish_reason"]
+
+    choices = []
+    for idx in sorted(texts):
+        text = "".join(texts[idx])
+        choice: dict[str, Any] = {"index": idx, "finish_reason": finish.get(idx)}
+        if chat:
+            choice["message"] = {"role": "assistant", "content": text}
+        else:
+            choice["text"] = text
+        choices.append(choice)
+    return {
+        "id": first.get("id"),
+        "object": "chat.completion" if chat else "text_completion",
+        "created": first.get("created"),
+        "model": first.get("model"),
+        "choices": choices,
+        "usage": usage,
+    }
+
+
+def render(body: dict[str, Any], include_usage: bool) -> list[bytes]:
+    """Replay a whole response as an SSE stream: one content chunk per choice."""
+    chat = body.get("object") == "chat.completion"
+    base = {
+        "id": body.get("id"),
+        "object": "chat.completion.chunk" if chat else "text_completion",
+        "created": body.get("created"),
+        "model": body.get("model"),
+    }
+    events: list[bytes] = []
+    for choice in body.get("choices", []):
+        idx = choice.get("index", 0)
+        if chat:
+            message = choice.get("message") or {}
+            content_chunk = {"index": idx, "delta": message, "finish_reason": None}
+            final_chunk = {"index": idx, "delta": {}, "finish_reason": choice.get("finish_reason")}
+        else:
+            content_chunk = {"index": idx, "text": choice.get("text", ""), "finish_reason": None}
+            final_chunk = {"index": idx, "text": "", "finish_reason": choice.get("finish_reason")}
+        for part in (content_chunk, final_chunk):
+            events.append(_event({**base, "choices": [part]}))
+    if include_usage and body.get("usage"):
+        events.append(_event({**base, "choices": [], "usage": body["usage"]}))
+    events.append(DONE)
+    return events
+
+
+def _event(payload: dict[str, Any]) -> bytes:
+    return b"data: " + codec.dumps(payload) + b"\n\n"
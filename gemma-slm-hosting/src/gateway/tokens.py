@@ -0,0 +1,177 @@
+"""Prompt token counts from the served model's tokenizer, and the length precheck.
+
+Admission and routing need to know how many tokens a request will hold in
+vLLM, and a request whose prompt plus ``max_tokens`` exceeds ``MAX_MODEL_LEN``
+is rejected by vLLM anyway, after a trip to the backend. With the model's
+``tokenizer.json`` loaded (the ``tokenizers`` package, no torch), the gateway
+counts prompts itself and clamps or rejects ``max_tokens`` before dispatch.
+
+Chat templates wrap each message in special tokens (``<start_of_turn>`` ...
+``<end_of_turn>`` for Gemma), and BPE never merges across special tokens, so a
+conversation's count is the sum of its messages' counts plus a fixed overhead
+per turn. Counts are therefore cached per message text: the system prompt and
+the earlier turns of a conversation are tokenized once, and each new request
+only pays for the text it adds.
+
+Until the tokenizer is loaded (or if it cannot be), counts fall back to the
+characters/4 estimate and the precheck is skipped: the estimate is too rough
+to reject requests on.
+"""
+
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from collections.abc import Mapping
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from .admission import estimate_prompt_tokens
+from .body import RequestBody
+
+try:
+    from tokenizers import Tokenizer
+except Exception:  # pragma: no cover - optional dependency
+    Tokenizer = None
+
+logger = logging.getLogger(__name__)
+
+MAX_TOKENS_POLICIES = ("clamp", "reject", "off")
+
+# Gemma's template: "<start_of_turn>{role}\n" ... "<end_of_turn>\n" around every
+# message, "<bos>" plus "<start_of_turn>model\n" once. Erring high only ever
+# clamps a token or two more than strictly needed.
+_TOKENS_PER_TURN = 5
+_TOKENS_PER_PROMPT = 4
+
+
+class ContextLengthExceeded(Exception):
+    def __init__(self, prompt_tokens: int, completion_tokens: int, max_model_len: int) -> None:
+        super().__init__(
+            f"This model's maximum context length is {max_model_len} tokens. However, you "
+            f"requested {prompt_tokens + completion_tokens} tokens ({prompt_tokens} in the "
+            f"prompt, {completion_tokens} in the completion). Please reduce the length of the "
+            "prompt or completion."
+        )
+
+
+@dataclass
+class TokenStats:
+    hits: int = 0
+    misses: int = 0
+    clamped: int = 0
+    rejected: int = 0
+
+
+def load_tokenizer(name: str) -> "Tokenizer":
+    """``tokenizer.json`` from a file, a model directory, or the Hugging Face Hub."""
+    if Tokenizer is None:
+        raise RuntimeError("the tokenizers package is not installed")
+    path = Path(name)
+    if path.is_dir():
+        path = path / "tokenizer.json"
+    if path.is_file():
+        return Tokenizer.from_file(str(path))
+    return Tokenizer.from_pretrained(name, token=os.getenv("HF_TOKEN") or None)
+
+
+async def load_into(counter: "PromptCounter", name: str) -> None:
+    """Load the tokenizer off the event loop; counts stay estimates if it fails."""
+    try:
+        counter.tokenizer = await asyncio.to_thread(load_tokenizer, name)
+    except Exception as exc:
+        logger.warning("Could not load tokenizer %r (%s); prompt lengths are estimated", name, exc)
+        return
+    logger.info("Loaded tokenizer %r; prompt lengths are counted exactly", name)
+
+
+class PromptCounter:
+    def __init__(self, cache_entries: int = 8192) -> None:
+        self.tokenizer: Tokenizer | None = None
+        self.cache_entries = cache_entries
+        self.stats = TokenStats()
+        self._cache: OrderedDict[str, int] = OrderedDict()
+
+    @property
+    def exact(self) -> bool:
+        return self.tokenizer is not None
+
+    def _text_tokens(self, text: str) -> int:
+        cached = self._cache.get(text)
+        if cached is not None:
+            self._cache.move_to_end(text)
+            self.stats.hits += 1
+            return cached
+        self.stats.misses += 1
+        assert self.tokenizer is not None
+        count = len(self.tokenizer.encode(text, add_special_tokens=False))
+        self._cache[text] = count
+        if len(self._cache) > self.cache_entries:
+            self._cache.popitem(last=False)
+        return count
+
+    def count(self, payload: dict[str, Any]) -> list[int]:
+        """Prompt tokens of every sequence the request starts (one per batched prompt)."""
+        if self.tokenizer is None:
+            return [estimate_prompt_tokens(payload)]
+        messages = payload.get("messages")
+        if isinstance(messages, list):
+            total = _TOKENS_PER_PROMPT
+            for message in messages:
+                if not isinstance(message, dict):
+                    continue
+                total += _TOKENS_PER_TURN
+                content = message.get("content")
+                if isinstance(content, list):
+                    content = "".join(
+                        part.get("text", "") for part in content if isinstance(part, dict)
+                    )
+                if isinstance(content, str) and content:
+                    total += self._text_tokens(content)
+            return [total]
+        prompt = payload.get("prompt")
+        if isinstance(prompt, str):
+            return [1 + self._text_tokens(prompt)]
+        if isinstance(prompt, list) and prompt:
+            if all(isinstance(p, int) for p in prompt):
+                return [len(prompt)]
+            return [
+                len(p) if isinstance(p, list) else 1 + self._text_tokens(str(p)) for p in prompt
+            ]
+        return [1]
+
+    def snapshot(self) -> dict[str, Any]:
+        return {"exact": self.exact, "cached_texts": len(self._cache), **vars(self.stats)}
+
+
+def completion_field(payload: Mapping[str, Any]) -> str | None:
+    """The field that holds the completion budget, if the client set one."""
+    for name in ("max_completion_tokens", "max_tokens"):
+        if isinstance(payload.get(name), int):
+            return name
+    return None
+
+
+def fit_to_context(
+    payload: RequestBody, counts: list[int], max_model_len: int, policy: str, stats: TokenStats
+) -> tuple[RequestBody, int | None]:
+    """Check the request against ``max_model_len``; returns it and the clamped budget, if any.
+
+    Raises ``ContextLengthExceeded`` if the prompt alone does not fit, or if the
+    completion budget does not fit and ``policy`` is ``"reject"``.
+    """
+    prompt_tokens = max(counts)
+    field = completion_field(payload)
+    requested = payload[field] if field is not None else 0
+    if prompt_tokens >= max_model_len:
+        stats.rejected += 1
+        raise ContextLengthExceeded(prompt_tokens, requested, max_model_len)
+    room = max_model_len - prompt_tokens
+    if field is None or requested <= room:
+        return payload, None
+    if policy == "reject":
+        stats.rejected += 1
+        raise ContextLengthExceeded(prompt_tokens, requested, max_model_len)
+    stats.clamped += 1
+    return payload.with_field(field, room), room
@@ -0,0 +1,375 @@
+"""OpenTelemetry traces for proxied requests, built after the fact.
+
+Nothing OpenTelemetry runs while a request is in flight: the request path only
+stamps ``time.time_ns()`` at phase boundaries on a ``RequestTrace`` (queueing,
+routing, each upstream attempt with its TCP connect and response headers, first
+byte to the client, end of the stream). When the response is finished the
+sampler decides, and only kept traces become spans, which are handed to a
+``BatchSpanProcessor`` whose background thread exports them over OTLP.
+
+Head sampling is parent-based: a request with an incoming ``traceparent``
+follows its sampled flag, and only requests without one keep ``sample_ratio``
+of the time. Tail rules keep every failed request and every slow one (total
+time or time to first byte over the thresholds), whatever the head decision
+said.
+
+Upstream requests carry a ``traceparent`` naming the gateway's span for that
+attempt, so spans from vLLM (``--otlp-traces-endpoint``) land in the same trace.
+The exporter reads the standard ``OTEL_EXPORTER_OTLP_*`` and ``OTEL_SERVICE_NAME``
+variables.
+"""
+
+import logging
+import os
+import random
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .metrics import PROBE_KEY, RequestProbe
+from .settings import Settings
+
+try:
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    from opentelemetry.sdk.util.instrumentation import InstrumentationScope
+    from opentelemetry.trace import SpanContext, SpanKind, Status, StatusCode, TraceFlags
+except Exception:  # pragma: no cover - optional dependency
+    ReadableSpan = None
+
+logger = logging.getLogger(__name__)
+
+TRACE_KEY = "gateway.trace"
+TRACED_PATHS = frozenset({"/v1/chat/completions", "/v1/completions"})
+
+
+def parse_traceparent(value: str | None) -> tuple[int, int, bool] | None:
+    """``(trace_id, parent_span_id, sampled)`` from a W3C ``traceparent`` header."""
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        trace_id, span_id, flags = int(parts[1], 16), int(parts[2], 16), int(parts[3][:2], 16)
+    except ValueError:
+        return None
+    if not trace_id or not span_id:
+        return None
+    return trace_id, span_id, bool(flags & 1)
+
+
+class UpstreamAttempt:
+    """One upstream exchange; ``on_http_event`` is an httpcore trace hook."""
+
+    __slots__ = ("span_id", "backend", "routing", "start", "connect", "headers", "end", "status")
+
+    def __init__(self, backend: str, routing: int) -> None:
+        self.span_id = random.getrandbits(64)
+        self.backend = backend
+        self.routing = routing
+        self.start = time.time_ns()
+        self.connect: tuple[int, int] | None = None
+        self.headers = 0
+        self.end = 0
+        self.status = 0
+
+    async def on_http_event(self, name: str, info: dict[str, Any]) -> None:
+        # connect_tcp only fires when the pool has to open a new connection.
+        if name == "connection.connect_tcp.started":
+            self.connect = (time.time_ns(), 0)
+        elif name == "connection.connect_tcp.complete" and self.connect is not None:
+            self.connect = (self.connect[0], time.time_ns())
+
+
+class RequestTrace:
+    __slots__ = (
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "sampled",
+        "start",
+        "queued",
+        "admitted",
+        "first",
+        "end",
+        "attempts",
+        "model",
+        "backend",
+        "status",
+        "error",
+    )
+
+    def __init__(self, trace_id: int, parent_id: int | None, sampled: bool) -> None:
+        self.trace_id = trace_id
+        self.span_id = random.getrandbits(64)
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.start = time.time_ns()
+        self.queued = 0
+        self.admitted = 0
+        self.first = 0
+        self.end = 0
+        self.attempts: list[UpstreamAttempt] = []
+        self.model = "unknown"
+        self.backend = "none"
+        self.status = 0
+        self.error: str | None = None
+
+    def attempt(self, backend: str, routing: int) -> UpstreamAttempt:
+        """Start an upstream attempt; ``routing`` is when replica selection began."""
+        attempt = UpstreamAttempt(backend, routing)
+        self.attempts.append(attempt)
+        self.backend = backend
+        return attempt
+
+    def traceparent(self) -> str:
+        """Header for the upstream request being built (the latest attempt)."""
+        parent = self.attempts[-1].span_id if self.attempts else self.span_id
+        return f"00-{self.trace_id:032x}-{parent:016x}-{'01' if self.sampled else '00'}"
+
+
+@dataclass
+class TraceStats:
+    started: int = 0
+    kept_head: int = 0
+    kept_error: int = 0
+    kept_slow: int = 0
+    dropped: int = 0
+
+
+class Tracing:
+    def __init__(
+        self,
+        processor: "SpanProcessor",
+        sample_ratio: float,
+        slow_s: float,
+        slow_first_byte_s: float,
+    ) -> None:
+        self.processor = processor
+        self.sample_ratio = sample_ratio
+        self.slow_ns = int(slow_s * 1e9)
+        self.slow_first_byte_ns = int(slow_first_byte_s * 1e9)
+        self.stats = TraceStats()
+        service = os.getenv("OTEL_SERVICE_NAME") or "slm-gateway"
+        self._resource = Resource.create({"service.name": service})
+        self._scope = InstrumentationScope("gateway")
+
+    def start(self, traceparent: str | None) -> RequestTrace:
+        self.stats.started += 1
+        parsed = parse_traceparent(traceparent)
+        if parsed is None:
+            sampled = random.random() < self.sample_ratio
+            return RequestTrace(random.getrandbits(128), None, sampled)
+        # The caller already decided for the whole trace.
+        trace_id, parent_id, parent_sampled = parsed
+        return RequestTrace(trace_id, parent_id, parent_sampled)
+
+    def _decide(self, trace: RequestTrace) -> str | None:
+        if trace.sampled:
+            return "kept_head"
+        if trace.error is not None or trace.status >= 500:
+            return "kept_error"
+        if trace.end - trace.start > self.slow_ns or (
+            trace.first and trace.first - trace.start > self.slow_first_byte_ns
+        ):
+            return "kept_slow"
+        return None
+
+    def finish(self, trace: RequestTrace) -> None:
+        trace.end = time.time_ns()
+        decision = self._decide(trace)
+        if decision is None:
+            self.stats.dropped += 1
+            return
+        setattr(self.stats, decision, getattr(self.stats, decision) + 1)
+        for span in self._spans(trace, decision):
+            self.processor.on_end(span)
+
+    def _span(
+        self,
+        trace: RequestTrace,
+        name: str,
+        span_id: int,
+        parent_id: int | None,
+        start: int,
+        end: int,
+        attributes: dict[str, Any] | None = None,
+        kind: "SpanKind | None" = None,
+        error: bool = False,
+    ) -> "ReadableSpan":
+        flags = TraceFlags(TraceFlags.SAMPLED)
+        parent = None
+        if parent_id is not None:
+            parent = SpanContext(trace.trace_id, parent_id, is_remote=False, trace_flags=flags)
+        return ReadableSpan(
+            name=name,
+            context=SpanContext(trace.trace_id, span_id, is_remote=False, trace_flags=flags),
+            parent=parent,
+            resource=self._resource,
+            attributes=attributes,
+            kind=kind or SpanKind.INTERNAL,
+            status=Status(StatusCode.ERROR) if error else Status(StatusCode.UNSET),
+            start_time=start,
+            end_time=max(start, end),
+            instrumentation_scope=self._scope,
+        )
+
+    def _spans(self, trace: RequestTrace, decision: str) -> list["ReadableSpan"]:
+        root = trace.span_id
+        failed = trace.error is not None or trace.status >= 500
+        attributes: dict[str, Any] = {
+            "gateway.model": trace.model,
+            "gateway.backend": trace.backend,
+            "gateway.sampling": decision,
+            "http.response.status_code": trace.status,
+        }
+        if trace.error is not None:
+            attributes["error.type"] = trace.error
+        spans = [
+            self._span(
+                trace,
+                "gateway.request",
+                root,
+                trace.parent_id,
+                trace.start,
+                trace.end,
+                attributes,
+                SpanKind.SERVER,
+                failed,
+            )
+        ]
+        new_id = random.getrandbits
+        if trace.admitted:
+            spans.append(
+                self._span(trace, "gateway.queue", new_id(64), root, trace.queued, trace.admitted)
+            )
+        for attempt in trace.attempts:
+            end = attempt.end or trace.end
+            spans.append(
+                self._span(
+                    trace,
+                    "gateway.route",
+                    new_id(64),
+                    root,
+                    attempt.routing,
+                    attempt.start,
+                    {"gateway.backend": attempt.backend},
+                )
+            )
+            spans.append(
+                self._span(
+                    trace,
+                    "upstream",
+                    attempt.span_id,
+                    root,
+                    attempt.start,
+                    end,
+                    {
+                        "server.address": attempt.backend,
+                        "http.response.status_code": attempt.status,
+                    },
+                    SpanKind.CLIENT,
+                    not 0 < attempt.status < 500,
+                )
+            )
+            if attempt.connect is not None:
+                connect_start, connect_end = attempt.connect
+                spans.append(
+                    self._span(
+                        trace,
+                        "upstream.connect",
+                        new_id(64),
+                        attempt.span_id,
+                        connect_start,
+                        connect_end or end,
+                    )
+                )
+            if attempt.headers:
+                spans.append(
+                    self._span(
+                        trace,
+                        "upstream.response_headers",
+                        new_id(64),
+                        attempt.span_id,
+                        attempt.start,
+                        attempt.headers,
+                    )
+                )
+        if trace.first:
+            spans.append(
+                self._span(trace, "gateway.first_byte", new_id(64), root, trace.start, trace.first)
+            )
+            spans.append(
+                self._span(trace, "gateway.stream", new_id(64), root, trace.first, trace.end)
+            )
+        return spans
+
+    def shutdown(self) -> None:
+        self.processor.shutdown()
+
+
+def create_tracing(settings: Settings) -> Tracing | None:
+    if ReadableSpan is None:
+        logger.warning(
+            "GATEWAY_TRACING_ENABLED is set but opentelemetry-sdk and "
+            "opentelemetry-exporter-otlp-proto-http are not installed; tracing is off"
+        )
+        return None
+    return Tracing(
+        BatchSpanProcessor(OTLPSpanExporter()),
+        sample_ratio=settings.trace_sample_ratio,
+        slow_s=settings.trace_slow_s,
+        slow_first_byte_s=settings.trace_slow_first_byte_s,
+    )
+
+
+class TracingMiddleware:
+    """Pure ASGI middleware: opens a ``RequestTrace`` per proxied request."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] not in TRACED_PATHS:
+            await self.app(scope, receive, send)
+            return
+        tracing: Tracing | None = getattr(scope["app"].state, "tracing", None)
+        if tracing is None:
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+        trace = tracing.start(traceparent)
+        scope[TRACE_KEY] = trace
+        # With metrics on, their probe already sees every message: read status and
+        # first byte from it afterwards instead of wrapping send a second time.
+        probe: RequestProbe | None = scope.get(PROBE_KEY)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.body":
+                if not trace.first and message.get("body"):
+                    trace.first = time.time_ns()
+            elif message["type"] == "http.response.start":
+                trace.status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send if probe is not None else send_wrapper)
+        except BaseException as exc:
+            trace.error = trace.error or type(exc).__name__
+            raise
+        finally:
+            if probe is not None:
+                trace.status = probe.status
+                if probe.first:
+                    trace.first = trace.start + int((probe.first - probe.start) * 1e9)
+            tracing.finish(trace)
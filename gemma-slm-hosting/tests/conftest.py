@@ -0,0 +1,226 @@
+"""Shared fixtures: the gateway app in front of an in-process stand-in for vLLM."""
+
+import asyncio
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import ExitStack, asynccontextmanager
+from types import ModuleType, SimpleNamespace
+from typing import Any
+
+import httpx
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+from starlette.types import ASGIApp
+
+from gateway.main import app, lifespan
+
+
+class FakeVLLM:
+    """Answers every completion with ``text``; records the bodies, hosts and headers it was sent.
+
+    ``gate`` holds answers back until it is set, so tests can pile up
+    concurrent requests (only those of the hosts in ``gated``, if that is set),
+    and ``cancelled`` counts the requests abandoned while held. ``status`` makes
+    every answer that error instead, or only the answers of the hosts in
+    ``failing``. ``headers`` are added to every answer.
+    """
+
+    def __init__(self, text: str = "Hello there") -> None:
+        self.text = text
+        self.status = 200
+        self.failing: set[str] = set()
+        self.requests: list[dict[str, Any]] = []
+        self.hosts: list[str] = []
+        self.received_headers: list[dict[str, str]] = []
+        self.headers: dict[str, str] = {}
+        self.gate: asyncio.Event | None = None
+        self.gated: set[str] | None = None
+        self.cancelled = 0
+        self.app = Starlette(
+            routes=[
+                # Completions get the chat answer too; tests only look at what was sent.
+                Route(path, self._chat, methods=["POST"])
+                for path in ("/v1/chat/completions", "/v1/completions")
+            ]
+        )
+
+    async def _chat(self, request: Request) -> Response:
+        response = await self._answer(request)
+        response.headers.update(self.headers)
+        return response
+
+    async def _answer(self, request: Request) -> Response:
+        body = orjson.loads(await request.body())
+        self.requests.append(body)
+        self.hosts.append(request.url.hostname)
+        self.received_headers.append(dict(request.headers))
+        if self.gate is not None and (self.gated is None or request.url.hostname in self.gated):
+            try:
+                await self.gate.wait()
+            except asyncio.CancelledError:
+                self.cancelled += 1
+                raise
+        if self.status != 200 or request.url.hostname in self.failing:
+            status = self.status if self.status != 200 else 503
+            return JSONResponse({"error": {"message": "boom"}}, status_code=status)
+        usage = {"prompt_tokens": 7, "completion_tokens": 2, "total_tokens": 9}
+        base = {"id": "cmpl-1", "created": 1, "model": body.get("model")}
+        if not body.get("stream"):
+            message = {"role": "assistant", "content": self.text}
+            return JSONResponse(
+                {
+                    **base,
+                    "object": "chat.completion",
+                    "choices": [{"index": 0, "message": message, "finish_reason": "stop"}],
+                    "usage": usage,
+                }
+            )
+        chunks = [
+            {"index": 0, "delta": {"role": "assistant", "content": self.text}},
+            {"index": 0, "delta": {}, "finish_reason": "stop"},
+        ]
+        events = [{**base, "object": "chat.completion.chunk", "choices": [c]} for c in chunks]
+        if (body.get("stream_options") or {}).get("include_usage"):
+            events.append(
+                {**base, "object": "chat.completion.chunk", "choices": [], "usage": usage}
+            )
+        raw = b"".join(b"data: " + orjson.dumps(event) + b"\n\n" for event in events)
+        return Response(raw + b"data: [DONE]\n\n", media_type="text/event-stream")
+
+
+@pytest.fixture
+def upstream() -> FakeVLLM:
+    return FakeVLLM()
+
+
+class Clock:
+    """A ``time.monotonic`` that only moves when a test sets ``now``."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def fake_clock(monkeypatch: pytest.MonkeyPatch) -> Callable[[ModuleType], Clock]:
+    """Give ``module`` a ``Clock`` in place of the ``time`` it imported."""
+
+    def install(module: ModuleType) -> Clock:
+        clock = Clock()
+        monkeypatch.setattr(module, "time", SimpleNamespace(monotonic=clock.monotonic))
+        return clock
+
+    return install
+
+
+@pytest.fixture
+def configure(monkeypatch: pytest.MonkeyPatch, tmp_path: Any) -> Callable[..., None]:
+    """Set the gateway's environment; keyword arguments override the defaults."""
+
+    def apply(**env: str) -> None:
+        settings = {
+            "BASE_API_URL": "http://base",
+            "FT_API_URL": "http://ft",
+            "MODEL_POINTER_PATH": str(tmp_path / "PHASE2_MODEL_POINTER.txt"),
+            "GATEWAY_HEALTH_INTERVAL": "0",
+            "GATEWAY_MAX_TOKENS_POLICY": "off",
+            **env,
+        }
+        for name, value in settings.items():
+            monkeypatch.setenv(name, value)
+
+    return apply
+
+
+@pytest.fixture
+def make_gateway(
+    configure: Callable[..., None], upstream: FakeVLLM
+) -> Iterator[Callable[..., TestClient]]:
+    """Start the gateway in front of ``upstream``, configured as ``configure`` takes."""
+    stack = ExitStack()
+
+    def start(**env: str) -> TestClient:
+        configure(**env)
+        client = stack.enter_context(TestClient(app))
+        app.state.client = httpx.AsyncClient(transport=httpx.ASGITransport(upstream.app))
+        return client
+
+    with stack:
+        yield start
+
+
+@asynccontextmanager
+async def serve_gateway(upstream: FakeVLLM) -> AsyncIterator[httpx.AsyncClient]:
+    """The gateway with its lifespan running, for tests that send concurrent requests."""
+    async with lifespan(app):
+        await app.state.client.aclose()
+        app.state.client = httpx.AsyncClient(transport=httpx.ASGITransport(upstream.app))
+        transport = httpx.ASGITransport(app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as client:
+            yield client
+
+
+async def post_then_leave(
+    asgi: ASGIApp, path: str, payload: dict[str, Any], leave: asyncio.Event
+) -> list[dict[str, Any]]:
+    """POST to ``asgi`` as a server would for a client that hangs up on ``leave``.
+
+    ``httpx.ASGITransport`` only reports a disconnect once the response is
+    complete, so this drives the app directly. Returns the messages it sent.
+    """
+    body = orjson.dumps(payload)
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"content-type", b"application/json"), (b"host", b"testserver")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    sent: list[dict[str, Any]] = []
+    requested = False
+
+    async def receive() -> dict[str, Any]:
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await leave.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: dict[str, Any]) -> None:
+        sent.append(message)
+
+    await asgi(scope, receive, send)
+    return sent
+
+
+async def until(predicate: Callable[[], bool], timeout_s: float = 5.0) -> None:
+    """Wait for ``predicate`` to hold, polling the event loop."""
+
+    async def poll() -> None:
+        while not predicate():
+            await asyncio.sleep(0.005)
+
+    await asyncio.wait_for(poll(), timeout_s)
+
+
+def chat(content: str = "Hi", **fields: Any) -> dict[str, Any]:
+    return {
+        "model": "base",
+        "messages": [{"role": "user", "content": content}],
+        "temperature": 0,
+        **fields,
+    }
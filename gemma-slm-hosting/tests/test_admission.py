@@ -0,0 +1,163 @@
+import asyncio
+
+import pytest
+from conftest import FakeVLLM, chat, serve_gateway, until
+
+from gateway.admission import (
+    AdmissionController,
+    Overloaded,
+    estimate_prompt_tokens,
+    requested_tokens,
+)
+from gateway.main import app
+
+
+def _controller(**overrides: float) -> AdmissionController:
+    params = {
+        "token_budget": 1000,
+        "max_seqs": 1,
+        "max_queue": 8,
+        "max_queue_wait_s": 5.0,
+        "slo_s": 60.0,
+        **overrides,
+    }
+    return AdmissionController(**params)
+
+
+def test_queued_requests_are_admitted_by_priority_then_arrival() -> None:
+    async def scenario() -> list[str]:
+        ctl = _controller()
+        holder = await ctl.acquire(10)
+        order: list[str] = []
+
+        async def wait(name: str, priority: int) -> None:
+            ticket = await ctl.acquire(10, priority)
+            order.append(name)
+            ctl.release(ticket)
+
+        tasks = []
+        for name, priority in [("low-1", 5), ("high", 0), ("low-2", 5), ("normal", 1)]:
+            tasks.append(asyncio.create_task(wait(name, priority)))
+            await asyncio.sleep(0)
+        assert ctl.snapshot()["queue_depth"] == 4
+        ctl.release(holder)
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(scenario()) == ["high", "normal", "low-1", "low-2"]
+
+
+def test_token_budget_holds_back_requests_that_do_not_fit() -> None:
+    async def scenario() -> None:
+        ctl = _controller(max_seqs=10)
+        first = await ctl.acquire(600)
+        waiter = asyncio.create_task(ctl.acquire(600))
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        ctl.release(first)
+        second = await waiter
+        assert ctl.outstanding_tokens == 600
+        ctl.release(second)
+        # Larger than the whole budget, but alone it still runs.
+        ctl.release(await ctl.acquire(5000))
+        assert ctl.outstanding_tokens == 0 and ctl.outstanding_seqs == 0
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_sheds_immediately() -> None:
+    async def scenario() -> None:
+        ctl = _controller(max_queue=1)
+        await ctl.acquire(10)
+        queued = asyncio.create_task(ctl.acquire(10))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded, match="queue full"):
+            await ctl.acquire(10)
+        assert ctl.stats.shed_queue_full == 1
+        queued.cancel()
+
+    asyncio.run(scenario())
+
+
+def test_projected_wait_over_slo_sheds_with_that_wait() -> None:
+    async def scenario() -> None:
+        ctl = _controller(slo_s=1.0)
+        ctl.avg_hold_s = 2.0
+        await ctl.acquire(10)
+        with pytest.raises(Overloaded, match="exceeds SLO") as exc_info:
+            await ctl.acquire(10)
+        assert exc_info.value.retry_after_s == pytest.approx(2.0)
+        assert ctl.retry_after(exc_info.value) == 2
+        assert ctl.stats.shed_slo == 1
+
+    asyncio.run(scenario())
+
+
+def test_queue_wait_timeout_sheds_and_withdraws() -> None:
+    async def scenario() -> None:
+        ctl = _controller(max_queue_wait_s=0.05)
+        await ctl.acquire(10)
+        with pytest.raises(Overloaded, match="timed out"):
+            await ctl.acquire(10)
+        assert ctl.stats.shed_timeout == 1
+        assert ctl.snapshot()["queue_depth"] == 0
+        assert ctl.snapshot()["queued_tokens"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_leaves_the_queue() -> None:
+    async def scenario() -> None:
+        ctl = _controller()
+        holder = await ctl.acquire(10)
+        waiter = asyncio.create_task(ctl.acquire(10))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert ctl.stats.abandoned == 1
+        assert ctl.snapshot()["queue_depth"] == 0
+        ctl.release(holder)
+        assert ctl.outstanding_seqs == 0
+
+    asyncio.run(scenario())
+
+
+def test_retry_after_is_at_least_a_second() -> None:
+    ctl = _controller()
+    assert ctl.retry_after(Overloaded("queue full", 0.0)) == 1
+    assert ctl.retry_after(Overloaded("slow", 2.2)) == 3
+
+
+def test_requested_tokens_reserves_the_completion_budget() -> None:
+    assert requested_tokens({"max_tokens": 64}, 100, 2048) == 164
+    assert requested_tokens({"max_completion_tokens": 32, "max_tokens": 64}, 100, 2048) == 132
+    # Without max_tokens vLLM may generate up to the context length.
+    assert requested_tokens({}, 100, 2048) == 2048
+    assert estimate_prompt_tokens({"prompt": "x" * 40}) == 10
+
+
+def test_shed_request_gets_429_with_retry_after(configure, upstream: FakeVLLM) -> None:
+    configure(
+        GATEWAY_CACHE_ENABLED="0",
+        GATEWAY_COALESCE_ENABLED="0",
+        GATEWAY_ADMISSION_MAX_SEQS="1",
+        GATEWAY_ADMISSION_MAX_QUEUE="1",
+    )
+
+    async def scenario() -> list:
+        upstream.gate = asyncio.Event()
+        async with serve_gateway(upstream) as client:
+            running = asyncio.create_task(client.post("/v1/chat/completions", json=chat("a")))
+            await until(lambda: len(upstream.requests) == 1)
+            queued = asyncio.create_task(client.post("/v1/chat/completions", json=chat("b")))
+            await until(lambda: app.state.admission["base"].snapshot()["queue_depth"] == 1)
+            shed = await client.post("/v1/chat/completions", json=chat("c"))
+            upstream.gate.set()
+            return [await running, await queued, shed]
+
+    running, queued, shed = asyncio.run(scenario())
+    assert (running.status_code, queued.status_code) == (200, 200)
+    assert shed.status_code == 429
+    assert shed.json()["error"]["type"] == "overloaded"
+    assert shed.headers["retry-after"] == "1"
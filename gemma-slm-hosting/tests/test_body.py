@@ -0,0 +1,93 @@
+import orjson
+import pytest
+
+from gateway.body import RequestBody, read_body
+
+
+def _swap(raw: bytes, key: str = "model", value: str | int = "google/gemma-3-1b-it") -> bytes:
+    body = read_body(raw).with_field(key, value)
+    assert orjson.loads(body.raw) == dict(body)
+    assert body[key] == value
+    return body.raw
+
+
+def test_model_is_spliced_into_the_original_bytes() -> None:
+    raw = b'{ "messages": [{"role": "user", "content": "Hi"}],\n  "model" :  "base", "x": 1 }'
+    assert _swap(raw) == raw.replace(b'"base"', b'"google/gemma-3-1b-it"')
+
+
+def test_with_field_round_trips_and_leaves_the_original_alone() -> None:
+    original = read_body(b'{"model":"base","max_tokens":64,"temperature":0}')
+    changed = original.with_field("max_tokens", 16)
+    assert changed.raw == b'{"model":"base","max_tokens":16,"temperature":0}'
+    assert original.raw == b'{"model":"base","max_tokens":64,"temperature":0}'
+    assert original["max_tokens"] == 64
+    assert read_body(changed.raw) == changed
+
+
+def test_model_mentioned_in_message_text_is_not_a_key() -> None:
+    content = 'Reply with JSON like {"model": "base"}'
+    payload = {"messages": [{"role": "user", "content": content}], "model": "base"}
+    raw = orjson.dumps(payload)
+    assert b'\\"model\\": \\"base\\"' in raw
+    spliced = _swap(raw)
+    # Spliced, not re-encoded: the message text is byte for byte what was sent.
+    assert spliced == raw.replace(b'"model":"base"', b'"model":"google/gemma-3-1b-it"')
+    assert orjson.loads(spliced)["messages"][0]["content"] == content
+
+
+def test_message_text_ending_in_a_backslash_before_the_key() -> None:
+    raw = orjson.dumps({"messages": [{"role": "user", "content": "C:\\"}], "model": "base"})
+    assert b'\\\\"}],"model"' in raw
+    assert orjson.loads(_swap(raw))["model"] == "google/gemma-3-1b-it"
+
+
+def test_nested_key_of_the_same_name_is_never_spliced() -> None:
+    schema = {"type": "object", "properties": {"model": {"type": "string"}}}
+    raw = orjson.dumps(
+        {
+            "model": "base",
+            "response_format": {"json_schema": {"model": "base", "schema": schema}},
+        }
+    )
+    payload = orjson.loads(_swap(raw))
+    assert payload["response_format"]["json_schema"]["model"] == "base"
+
+
+@pytest.mark.parametrize(
+    ("raw", "nested"),
+    [
+        (b'{"mod\\u0065l": "base", "metadata": {"model": "base"}}', "model"),
+        # The bytes from the escaped quote on look like a ``"model":`` key.
+        (b'{"mod\\u0065l": "base", "metadata": {"say \\"model": "base"}}', 'say "model'),
+    ],
+)
+def test_escaped_top_level_key_is_not_spliced_elsewhere(raw: bytes, nested: str) -> None:
+    payload = orjson.loads(_swap(raw))
+    assert payload["metadata"][nested] == "base"
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        b'{"model": "ba\\u0073e"}',
+        b'{"model": "base", "model": "base"}',
+        b'{"max_tokens": 1.0e1, "model": "base"}',
+    ],
+)
+def test_unusual_encodings_still_give_the_right_body(raw: bytes) -> None:
+    _swap(raw)
+    _swap(raw, "max_tokens", 5)
+
+
+def test_missing_field_is_added() -> None:
+    assert orjson.loads(_swap(b'{"prompt": "Hi"}', "max_tokens", 8)) == {
+        "prompt": "Hi",
+        "max_tokens": 8,
+    }
+
+
+def test_read_body_rejects_non_objects() -> None:
+    with pytest.raises(ValueError):
+        read_body(b"[1, 2]")
+    assert isinstance(read_body(b"{}"), RequestBody)
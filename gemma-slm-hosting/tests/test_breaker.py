@@ -0,0 +1,138 @@
+import pytest
+from conftest import chat
+
+from gateway import breaker as breaker_module
+from gateway.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from gateway.routing import ReplicaPool
+
+
+def _tripped() -> CircuitBreaker:
+    breaker = CircuitBreaker(window=10, min_calls=4, failure_ratio=0.5, open_s=10.0)
+    for ok in (True, False, True, False):
+        breaker.record(ok)
+    assert breaker.state == OPEN
+    return breaker
+
+
+def test_stays_closed_below_min_calls_and_ratio(fake_clock) -> None:
+    fake_clock(breaker_module)
+    breaker = CircuitBreaker(window=10, min_calls=4, failure_ratio=0.5)
+    for _ in range(3):
+        breaker.record(False)
+    assert breaker.state == CLOSED
+    breaker = CircuitBreaker(window=10, min_calls=4, failure_ratio=0.5)
+    for ok in (True, True, True, False, True):
+        breaker.record(ok)
+    assert breaker.state == CLOSED
+    assert breaker.error_ratio == pytest.approx(0.2)
+
+
+def test_trips_at_the_failure_ratio(fake_clock) -> None:
+    fake_clock(breaker_module)
+    breaker = _tripped()
+    assert breaker.trips == 1
+    assert not breaker.allows()
+    # Late reports from requests sent before the trip change nothing.
+    breaker.record(True)
+    assert breaker.state == OPEN
+
+
+def test_half_open_trial_success_closes(fake_clock) -> None:
+    clock = fake_clock(breaker_module)
+    breaker = _tripped()
+    clock.now += 10.0
+    assert breaker.allows()
+    breaker.on_dispatch()
+    assert breaker.state == HALF_OPEN
+    # One trial per cooldown.
+    assert not breaker.allows()
+    breaker.record(True)
+    assert breaker.state == CLOSED
+    assert breaker.error_ratio == 0.0
+
+
+def test_outcome_sent_before_the_trip_does_not_close_half_open(fake_clock) -> None:
+    clock = fake_clock(breaker_module)
+    breaker = CircuitBreaker(window=10, min_calls=4, failure_ratio=0.5, open_s=10.0)
+    # A long non-streamed generation, sent while the breaker was still closed.
+    slow_generation = breaker.trips
+    for ok in (True, False, True, False):
+        breaker.record(ok, generation=breaker.trips)
+    assert breaker.state == OPEN
+    clock.now += 10.0
+    breaker.on_dispatch()
+    trial = breaker.trips
+
+    breaker.record(True, generation=slow_generation)
+    assert breaker.state == HALF_OPEN
+    breaker.record(False, generation=slow_generation)
+    assert breaker.state == HALF_OPEN
+    breaker.record(True, generation=trial)
+    assert breaker.state == CLOSED
+
+
+def test_half_open_trial_failure_reopens(fake_clock) -> None:
+    clock = fake_clock(breaker_module)
+    breaker = _tripped()
+    clock.now += 10.0
+    breaker.on_dispatch()
+    breaker.record(False)
+    assert breaker.state == OPEN
+    assert breaker.trips == 2
+    clock.now += 9.9
+    assert not breaker.allows()
+
+
+def test_lost_trial_lets_another_through_after_the_cooldown(fake_clock) -> None:
+    clock = fake_clock(breaker_module)
+    breaker = _tripped()
+    clock.now += 10.0
+    breaker.on_dispatch()
+    clock.now += 10.0
+    assert breaker.allows()
+
+
+def test_slow_calls_count_as_failures(fake_clock) -> None:
+    fake_clock(breaker_module)
+    breaker = CircuitBreaker(window=4, min_calls=2, failure_ratio=0.5, slow_call_s=1.0)
+    breaker.record(True, latency_s=2.0)
+    breaker.record(True, latency_s=0.1)
+    assert breaker.state == OPEN
+
+
+def test_pool_routes_around_an_open_breaker(fake_clock) -> None:
+    fake_clock(breaker_module)
+    pool = ReplicaPool(
+        ["http://a", "http://b"],
+        policy="prefix",
+        breaker=lambda: CircuitBreaker(window=4, min_calls=2, failure_ratio=0.5),
+    )
+    owner = pool.acquire("prefix")
+    pool.release(owner)
+    for _ in range(2):
+        pool.record(owner, 503)
+    assert owner.breaker.state == OPEN
+    assert not owner.available
+    assert pool.acquire("prefix") is not owner
+
+
+def test_pool_panics_into_every_replica_when_all_are_out(fake_clock) -> None:
+    fake_clock(breaker_module)
+    pool = ReplicaPool(["http://a", "http://b"], policy="round_robin")
+    for replica in pool.replicas:
+        replica.healthy = False
+    assert pool.acquire() in pool.replicas
+    assert pool.panics == 1
+
+
+def test_refused_request_is_retried_on_another_replica(make_gateway, upstream) -> None:
+    client = make_gateway(
+        BASE_API_URL="http://a,http://b",
+        GATEWAY_ROUTING="round_robin",
+        GATEWAY_CACHE_ENABLED="0",
+    )
+    upstream.failing = {"a"}
+    responses = [client.post("/v1/chat/completions", json=chat(f"q{i}")) for i in range(4)]
+    assert [r.status_code for r in responses] == [200] * 4
+    assert upstream.hosts.count("b") == 4
+    assert client.get("/gateway/stats").json()["routing"]["base"]["retries"] >= 1
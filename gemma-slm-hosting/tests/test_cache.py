@@ -0,0 +1,132 @@
+import orjson
+import pytest
+from conftest import chat
+
+from gateway import cache as cache_module
+from gateway.cache import ResponseCache, cache_key, is_cacheable
+
+
+def _entry_size(key: str, body: bytes) -> int:
+    return len(body) + len(key) + cache_module._ENTRY_OVERHEAD_BYTES
+
+
+def test_evicts_least_recently_used_when_over_budget(fake_clock) -> None:
+    fake_clock(cache_module)
+    body = b"x" * 100
+    cache = ResponseCache(max_bytes=3 * _entry_size("k1", body), max_entry_bytes=10_000, ttl_s=60)
+    for key in ("k1", "k2", "k3"):
+        assert cache.put(key, "base", body)
+    # A hit makes k1 the most recent, so k2 is the one to go.
+    assert cache.get("k1") is not None
+    assert cache.put("k4", "base", body)
+
+    assert cache.get("k2") is None
+    assert {key for key in ("k1", "k3", "k4") if cache.get(key) is not None} == {"k1", "k3", "k4"}
+    assert cache.stats.evictions == 1
+    assert cache.size_bytes == 3 * _entry_size("k1", body)
+
+
+def test_rejects_entries_over_the_entry_limit(fake_clock) -> None:
+    fake_clock(cache_module)
+    cache = ResponseCache(max_bytes=100_000, max_entry_bytes=1_000, ttl_s=60)
+    assert not cache.put("big", "base", b"x" * 1_000)
+    assert len(cache) == 0
+    assert cache.stats.rejected_too_large == 1
+
+
+def test_replacing_a_key_keeps_the_byte_count_right(fake_clock) -> None:
+    fake_clock(cache_module)
+    cache = ResponseCache(max_bytes=100_000, max_entry_bytes=10_000, ttl_s=60)
+    cache.put("k", "base", b"x" * 10)
+    cache.put("k", "base", b"y" * 50)
+    assert len(cache) == 1
+    assert cache.size_bytes == _entry_size("k", b"y" * 50)
+    assert cache.get("k").body == b"y" * 50
+
+
+def test_entries_expire_after_ttl(fake_clock) -> None:
+    clock = fake_clock(cache_module)
+    cache = ResponseCache(max_bytes=100_000, max_entry_bytes=10_000, ttl_s=10)
+    cache.put("k", "base", b"body")
+    clock.now += 9.9
+    assert cache.get("k") is not None
+    clock.now += 0.1
+    assert cache.get("k") is None
+    assert cache.stats.expirations == 1
+    assert cache.size_bytes == 0
+
+
+def test_invalidate_model_only_drops_that_model(fake_clock) -> None:
+    fake_clock(cache_module)
+    cache = ResponseCache(max_bytes=100_000, max_entry_bytes=10_000, ttl_s=60)
+    cache.put("a", "base", b"1")
+    cache.put("b", "ft", b"2")
+    assert cache.invalidate_model("ft") == 1
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+
+
+@pytest.mark.parametrize(
+    ("fields", "expected"),
+    [
+        ({"temperature": 0}, True),
+        ({"temperature": 0.0, "n": 1}, True),
+        ({}, False),
+        ({"temperature": 0.7}, False),
+        ({"temperature": 0, "n": 2}, False),
+        ({"temperature": 0, "logprobs": True}, False),
+    ],
+)
+def test_is_cacheable(fields: dict, expected: bool) -> None:
+    assert is_cacheable(fields) is expected
+
+
+def test_cache_key_ignores_delivery_fields_but_not_version() -> None:
+    payload = chat()
+    streamed = {**payload, "stream": True, "stream_options": {"include_usage": True}}
+    path = "/v1/chat/completions"
+    assert cache_key(path, payload, "v1") == cache_key(path, streamed, "v1")
+    assert cache_key(path, payload, "v1") != cache_key(path, payload, "v2")
+    assert cache_key(path, payload, "v1") != cache_key(path, chat("Other"), "v1")
+
+
+def test_stream_with_usage_serves_a_later_non_streamed_hit(make_gateway, upstream) -> None:
+    client = make_gateway(GATEWAY_COALESCE_ENABLED="0")
+    streamed = client.post(
+        "/v1/chat/completions",
+        json=chat(stream=True, stream_options={"include_usage": True}),
+    )
+    assert streamed.headers["x-gateway-cache"] == "miss"
+
+    response = client.post("/v1/chat/completions", json=chat())
+    assert response.status_code == 200
+    assert response.headers["x-gateway-cache"] == "hit"
+    body = orjson.loads(response.content)
+    assert body["choices"][0]["message"]["content"] == "Hello there"
+    assert body["usage"] == {"prompt_tokens": 7, "completion_tokens": 2, "total_tokens": 9}
+    assert len(upstream.requests) == 1
+
+
+def test_stream_without_usage_is_not_cached(make_gateway, upstream) -> None:
+    client = make_gateway(GATEWAY_COALESCE_ENABLED="0")
+    client.post("/v1/chat/completions", json=chat(stream=True))
+
+    response = client.post("/v1/chat/completions", json=chat())
+    assert response.headers["x-gateway-cache"] == "miss"
+    assert orjson.loads(response.content)["usage"] is not None
+    assert len(upstream.requests) == 2
+
+
+def test_non_streamed_answer_replays_as_a_stream(make_gateway, upstream) -> None:
+    client = make_gateway(GATEWAY_COALESCE_ENABLED="0")
+    client.post("/v1/chat/completions", json=chat())
+
+    response = client.post(
+        "/v1/chat/completions",
+        json=chat(stream=True, stream_options={"include_usage": True}),
+    )
+    assert response.headers["x-gateway-cache"] == "hit"
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert b'"usage"' in response.content
+    assert response.content.endswith(b"data: [DONE]\n\n")
+    assert len(upstream.requests) == 1
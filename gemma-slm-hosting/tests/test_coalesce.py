@@ -0,0 +1,172 @@
+import asyncio
+from collections import Counter
+
+import httpx
+import pytest
+from conftest import FakeVLLM, chat, serve_gateway, until
+
+from gateway.coalesce import Coalescer, Flight
+from gateway.main import app
+
+
+def _stats(name: str) -> dict:
+    if name == "coalesce":
+        return app.state.coalescer.snapshot()
+    return app.state.admission["base"].snapshot()
+
+
+def test_followers_share_one_generation(configure, upstream: FakeVLLM) -> None:
+    configure(GATEWAY_CACHE_ENABLED="0")
+
+    async def scenario() -> list[httpx.Response]:
+        upstream.gate = asyncio.Event()
+        async with serve_gateway(upstream) as client:
+            requests = [
+                asyncio.create_task(client.post("/v1/chat/completions", json=chat()))
+                for _ in range(4)
+            ]
+            await until(lambda: _stats("coalesce")["followers"] == 3)
+            upstream.gate.set()
+            return await asyncio.gather(*requests)
+
+    responses = asyncio.run(scenario())
+    assert [r.status_code for r in responses] == [200] * 4
+    assert len({r.content for r in responses}) == 1
+    assert Counter(r.headers["x-gateway-flight"] for r in responses) == {
+        "leader": 1,
+        "follower": 3,
+    }
+    assert len(upstream.requests) == 1
+
+
+def test_followers_join_a_leader_waiting_for_admission(configure, upstream: FakeVLLM) -> None:
+    configure(GATEWAY_CACHE_ENABLED="0", GATEWAY_ADMISSION_MAX_SEQS="1")
+
+    async def scenario() -> tuple[list[httpx.Response], dict]:
+        upstream.gate = asyncio.Event()
+        async with serve_gateway(upstream) as client:
+            # Not deterministic, so not coalesced: it holds the only slot.
+            blocker = asyncio.create_task(
+                client.post("/v1/chat/completions", json=chat("Busy", temperature=0.7))
+            )
+            await until(lambda: len(upstream.requests) == 1)
+            requests = [
+                asyncio.create_task(client.post("/v1/chat/completions", json=chat()))
+                for _ in range(3)
+            ]
+            await until(lambda: _stats("coalesce")["followers"] == 2)
+            queued = _stats("admission")
+            upstream.gate.set()
+            await blocker
+            return await asyncio.gather(*requests), queued
+
+    responses, queued = asyncio.run(scenario())
+    # Only the leader waits in the admission queue; followers wait on its flight.
+    assert queued["queue_depth"] == 1
+    assert queued["queued"] == 1
+    assert [r.status_code for r in responses] == [200] * 3
+    assert len(upstream.requests) == 2
+
+
+def test_followers_of_a_shed_leader_get_its_429(configure, upstream: FakeVLLM) -> None:
+    configure(
+        GATEWAY_CACHE_ENABLED="0",
+        GATEWAY_ADMISSION_MAX_SEQS="1",
+        GATEWAY_ADMISSION_MAX_QUEUE_WAIT="0.2",
+    )
+
+    async def scenario() -> list[httpx.Response]:
+        upstream.gate = asyncio.Event()
+        async with serve_gateway(upstream) as client:
+            blocker = asyncio.create_task(
+                client.post("/v1/chat/completions", json=chat("Busy", temperature=0.7))
+            )
+            await until(lambda: len(upstream.requests) == 1)
+            responses = await asyncio.gather(
+                *(client.post("/v1/chat/completions", json=chat()) for _ in range(3))
+            )
+            upstream.gate.set()
+            await blocker
+            return responses
+
+    responses = asyncio.run(scenario())
+    assert [r.status_code for r in responses] == [429] * 3
+    assert all(int(r.headers["retry-after"]) >= 1 for r in responses)
+    assert len(upstream.requests) == 1
+
+
+def test_failed_leader_fails_every_subscriber_and_frees_the_key() -> None:
+    released = []
+
+    async def send(flight: Flight) -> httpx.Response:
+        flight.on_done = lambda: released.append(True)
+        await asyncio.sleep(0.01)
+        raise httpx.ConnectError("refused")
+
+    async def scenario() -> tuple[Coalescer, Flight]:
+        coalescer = Coalescer(max_waiters=8)
+        flight = coalescer.start("key", send, None)
+        for _ in range(3):
+            flight.attach()
+        await flight.finished.wait()
+        return coalescer, flight
+
+    coalescer, flight = asyncio.run(scenario())
+    assert isinstance(flight.error, httpx.ConnectError)
+    assert flight.status_code == 0
+    assert coalescer.get("key") is None
+    assert released == [True]
+
+
+def test_flight_is_cancelled_when_its_last_subscriber_leaves() -> None:
+    released = []
+
+    async def send(flight: Flight) -> httpx.Response:
+        flight.on_done = lambda: released.append(True)
+        await asyncio.Event().wait()
+        raise AssertionError("unreachable")
+
+    async def scenario() -> Coalescer:
+        coalescer = Coalescer(max_waiters=8)
+        flight = coalescer.start("key", send, None)
+        flight.attach()
+        flight.attach()
+        await asyncio.sleep(0)
+        flight.detach()
+        assert not flight.task.done()
+        flight.detach()
+        await flight.finished.wait()
+        return coalescer
+
+    coalescer = asyncio.run(scenario())
+    assert coalescer.stats.abandoned == 1
+    assert released == [True]
+
+
+def test_completed_flight_replays_its_body_and_reports_it() -> None:
+    stored = []
+
+    async def send(flight: Flight) -> httpx.Response:
+        flight.backend = "http://replica-0"
+        return httpx.Response(200, content=b'{"ok": true}')
+
+    async def scenario() -> list[bytes]:
+        coalescer = Coalescer(max_waiters=8)
+        flight = coalescer.start("key", send, stored.append)
+        flight.attach()
+        return [chunk async for chunk in flight.iter_body()]
+
+    assert asyncio.run(scenario()) == [b'{"ok": true}']
+    assert stored == [b'{"ok": true}']
+
+
+@pytest.mark.parametrize("subscribers", [0, 1])
+def test_waiter_cap(subscribers: int) -> None:
+    async def scenario() -> bool:
+        coalescer = Coalescer(max_waiters=1)
+        flight = Flight()
+        for _ in range(subscribers):
+            flight.attach()
+        return coalescer.admit(flight)
+
+    assert asyncio.run(scenario()) is (subscribers == 0)
@@ -0,0 +1,76 @@
+import json
+import random
+import sys
+from pathlib import Path
+
+import pytest
+from compare import compare, main, setup_differences
+from hdr import LogHistogram
+
+
+def _run(scale: float = 1.0, seed: int = 1, **setup) -> dict:
+    rng = random.Random(seed)
+    latency = LogHistogram()
+    for _ in range(2000):
+        latency.record(scale * rng.lognormvariate(5, 0.3))
+    return {
+        "mode": "closed",
+        "stream": False,
+        "concurrency": 8,
+        "success_count": latency.count,
+        "throughput_rps": 8000 / (scale * latency.mean),
+        "histograms": {"latency_ms": latency.to_dict()},
+        **setup,
+    }
+
+
+def _rows(base: dict, candidate: dict) -> dict[str, dict]:
+    rows = compare(base, candidate, 500, 0.95, 0.05, 0.05, random.Random(0))
+    return {row["metric"]: row for row in rows}
+
+
+def test_slower_candidate_regresses_latency_and_throughput() -> None:
+    rows = _rows(_run(), _run(scale=1.2, seed=2))
+    assert rows["latency_ms_p50"]["regression"]
+    assert rows["latency_ms_p50"]["ci_low"] > 0.05
+    assert rows["throughput_rps"]["regression"]
+
+
+def test_rerun_of_the_same_setup_is_not_a_regression() -> None:
+    rows = _rows(_run(), _run(seed=2))
+    assert not any(row["regression"] or row["improvement"] for row in rows.values())
+    faster = _rows(_run(), _run(scale=0.8, seed=2))
+    assert faster["latency_ms_p95"]["improvement"]
+
+
+def test_setup_differences() -> None:
+    base = _run()
+    assert setup_differences(base, _run(seed=2)) == []
+    assert setup_differences(base, _run(stream=True, concurrency=16)) == [
+        "stream: False != True",
+        "concurrency: 8 != 16",
+    ]
+    # Old files have no mode and were all closed loop.
+    legacy = {k: v for k, v in base.items() if k != "mode"}
+    assert setup_differences(legacy, base) == []
+
+
+def test_mismatched_runs_get_no_verdict_without_force(tmp_path: Path, monkeypatch) -> None:
+    base, candidate = tmp_path / "base.json", tmp_path / "ft.json"
+    base.write_text(json.dumps(_run()))
+    candidate.write_text(json.dumps(_run(scale=1.2, seed=2, concurrency=16)))
+    out = tmp_path / "cmp.json"
+
+    def exit_code(*flags: str) -> int:
+        argv = ["compare.py", str(base), str(candidate), "--resamples", "200", "--out", str(out)]
+        monkeypatch.setattr(sys, "argv", [*argv, *flags])
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+        return exc_info.value.code
+
+    assert exit_code() == 2
+    assert json.loads(out.read_text())["comparisons"]["ft.json"] == {
+        "not_comparable": ["concurrency: 8 != 16"]
+    }
+    assert exit_code("--force") == 1
+    assert isinstance(json.loads(out.read_text())["comparisons"]["ft.json"], list)
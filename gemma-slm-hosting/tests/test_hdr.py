@@ -0,0 +1,60 @@
+import math
+import random
+
+import pytest
+from hdr import LogHistogram
+
+
+def _exact(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(pct / 100.0 * len(ordered))) - 1]
+
+
+def test_every_value_in_a_bucket_is_within_the_relative_error() -> None:
+    hist = LogHistogram(relative_error=0.01)
+    growth = math.exp(hist._log_growth)
+    for index in (0, 1, 250, 1700):
+        low = hist.lowest * growth**index
+        value = hist._value(index)
+        assert (value - low) / low == pytest.approx(0.01)
+        assert (low * growth - value) / (low * growth) == pytest.approx(0.01)
+
+
+def test_percentiles_are_within_the_relative_error() -> None:
+    rng = random.Random(7)
+    values = [rng.lognormvariate(4, 1.2) for _ in range(20_000)]
+    hist = LogHistogram()
+    for value in values:
+        hist.record(value)
+    for pct in (1, 50, 90, 99, 99.9, 100):
+        exact = _exact(values, pct)
+        assert abs(hist.percentile(pct) - exact) <= hist.relative_error * exact
+    assert hist.mean == pytest.approx(sum(values) / len(values))
+
+
+def test_merge_adds_counts_and_rejects_other_parameters() -> None:
+    first, second, both = LogHistogram(), LogHistogram(), LogHistogram()
+    for value in range(1, 500):
+        (first if value % 3 else second).record(float(value))
+        both.record(float(value))
+    first.merge(second)
+    assert first.counts == both.counts
+    assert (first.count, first.min, first.max) == (both.count, 1.0, 499.0)
+    with pytest.raises(ValueError):
+        first.merge(LogHistogram(relative_error=0.01))
+
+
+def test_dict_round_trip() -> None:
+    hist = LogHistogram()
+    for value in (0.0001, 3.5, 3.5, 120.0, 9e9):
+        hist.record(value)
+    restored = LogHistogram.from_dict(hist.to_dict())
+    assert restored.counts == hist.counts
+    assert (restored.count, restored.sum, restored.min, restored.max) == (
+        hist.count,
+        hist.sum,
+        hist.min,
+        hist.max,
+    )
+    assert restored.percentile(50) == hist.percentile(50)
+    assert LogHistogram.from_dict(LogHistogram().to_dict()).count == 0
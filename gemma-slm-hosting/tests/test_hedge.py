@@ -0,0 +1,158 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from conftest import FakeVLLM, chat, serve_gateway, until
+
+from gateway.hedge import Hedger
+from gateway.main import app
+
+REPLICAS = {
+    "GATEWAY_CACHE_ENABLED": "0",
+    "GATEWAY_COALESCE_ENABLED": "0",
+    "GATEWAY_HEDGE_ENABLED": "1",
+}
+
+
+def _hedger(delay_s: float, budget_ratio: float = 1.0) -> Hedger:
+    """A hedger that has already seen enough latencies to hedge after ``delay_s``."""
+    hedger = Hedger(budget_ratio=budget_ratio, min_delay_s=delay_s, min_samples=1)
+    hedger._tracker("base").observe(delay_s)
+    return hedger
+
+
+def test_hedge_fires_after_the_delay_and_first_success_wins() -> None:
+    started: list[float] = []
+    cancelled: list[int] = []
+
+    async def attempt() -> str:
+        copy = len(started)
+        started.append(time.monotonic())
+        try:
+            await asyncio.sleep(10 if copy == 0 else 0.01)
+        except asyncio.CancelledError:
+            cancelled.append(copy)
+            raise
+        return f"copy {copy}"
+
+    async def scenario() -> str:
+        hedger = _hedger(0.05)
+        result = await hedger.run("base", attempt, lambda _: True, lambda: True)
+        assert vars(hedger.stats) == {"eligible": 1, "issued": 1, "won": 1, "denied": 0}
+        return result
+
+    assert asyncio.run(scenario()) == "copy 1"
+    assert started[1] - started[0] >= 0.05
+    # The loser was cancelled and had unwound by the time run returned.
+    assert cancelled == [0]
+
+
+def test_fast_answer_is_never_hedged() -> None:
+    async def scenario() -> Hedger:
+        hedger = _hedger(0.05)
+        assert await hedger.run("base", lambda: asyncio.sleep(0, "ok"), bool, lambda: True) == "ok"
+        return hedger
+
+    assert asyncio.run(scenario()).stats.issued == 0
+
+
+def test_credit_bucket_caps_hedges_at_the_budget_ratio() -> None:
+    async def scenario() -> Hedger:
+        hedger = _hedger(0.001, budget_ratio=0.25)
+        for _ in range(20):
+            await hedger.run("base", lambda: asyncio.sleep(0.01, "ok"), bool, lambda: True)
+        return hedger
+
+    stats = asyncio.run(scenario()).stats
+    assert stats.eligible == 20
+    assert stats.issued == 5
+    assert stats.denied == 15
+
+
+def _idle(pool_name: str = "base") -> bool:
+    pool = app.state.pools[pool_name]
+    busy = any(replica.in_flight or replica.tokens for replica in pool.replicas)
+    return not busy and not app.state.registry.snapshot()["in_flight"]
+
+
+def test_losing_copy_is_cancelled_and_releases_its_replica(configure, upstream: FakeVLLM) -> None:
+    configure(BASE_API_URL="http://a,http://b", **REPLICAS)
+
+    async def scenario() -> tuple[httpx.Response, Hedger]:
+        upstream.gate = asyncio.Event()
+        async with serve_gateway(upstream) as client:
+            hedger = app.state.hedger = _hedger(0.05)
+            request = asyncio.create_task(client.post("/v1/chat/completions", json=chat()))
+            await until(lambda: len(upstream.requests) == 1)
+            # Only the first replica straggles; the hedge is answered at once.
+            upstream.gated = {upstream.hosts[0]}
+            response = await request
+            assert _idle()
+            return response, hedger
+
+    response, hedger = asyncio.run(scenario())
+    assert response.status_code == 200
+    assert len(set(upstream.hosts)) == 2
+    assert upstream.cancelled == 1
+    assert (hedger.stats.issued, hedger.stats.won) == (1, 1)
+
+
+def test_no_hedge_while_the_admission_queue_is_non_empty(configure, upstream: FakeVLLM) -> None:
+    configure(BASE_API_URL="http://a,http://b", GATEWAY_ADMISSION_MAX_SEQS="1", **REPLICAS)
+
+    async def scenario() -> Hedger:
+        upstream.gate = asyncio.Event()
+        async with serve_gateway(upstream) as client:
+            hedger = app.state.hedger = _hedger(0.2)
+            admission = app.state.admission["base"]
+            hedged = asyncio.create_task(client.post("/v1/chat/completions", json=chat()))
+            await until(lambda: len(upstream.requests) == 1)
+            # Not deterministic, so never hedged: one takes the last slot, one queues.
+            others = [
+                asyncio.create_task(
+                    client.post("/v1/chat/completions", json=chat(str(idx), temperature=0.7))
+                )
+                for idx in range(2)
+            ]
+            await until(lambda: admission.snapshot()["queue_depth"] == 1)
+            await until(lambda: hedger.stats.denied == 1)
+            upstream.gate.set()
+            responses = await asyncio.gather(hedged, *others)
+            assert [r.status_code for r in responses] == [200] * 3
+            return hedger
+
+    hedger = asyncio.run(scenario())
+    assert (hedger.stats.issued, hedger.stats.denied) == (0, 1)
+    assert len(upstream.requests) == 3
+
+
+@pytest.mark.parametrize(("retries", "status", "hosts"), [(1, 503, 2), (2, 200, 3)])
+def test_both_copies_refused_fall_into_the_retry_loop(
+    configure, upstream: FakeVLLM, retries: int, status: int, hosts: int
+) -> None:
+    configure(
+        BASE_API_URL="http://a,http://b,http://c",
+        GATEWAY_RETRIES=str(retries),
+        **REPLICAS,
+    )
+
+    async def scenario() -> httpx.Response:
+        upstream.gate = asyncio.Event()
+        async with serve_gateway(upstream) as client:
+            app.state.hedger = _hedger(0.05)
+            request = asyncio.create_task(client.post("/v1/chat/completions", json=chat()))
+            await until(lambda: len(upstream.requests) == 2)
+            # Both the original and its hedge answer 503.
+            upstream.failing = set(upstream.hosts)
+            upstream.gate.set()
+            response = await request
+            assert _idle()
+            return response
+
+    response = asyncio.run(scenario())
+    assert response.status_code == status
+    # Each replica is tried at most once, and the hedge used up one attempt.
+    assert len(upstream.hosts) == hosts
+    assert len(set(upstream.hosts)) == hosts
+    assert app.state.pools["base"].retries == hosts - 2
@@ -0,0 +1,49 @@
+from conftest import chat
+
+from gateway.metrics import Histogram, _labels, _merge_expositions
+
+
+def test_histogram_renders_cumulative_buckets() -> None:
+    hist = Histogram("latency_seconds", "Latency.", ("model",), (0.1, 1.0))
+    hist.observe(("base",), 0.05)
+    hist.observe_many(("base",), [0.5, 0.7, 3.0])
+    lines = list(hist.render())
+    assert lines[:2] == ["# HELP latency_seconds Latency.", "# TYPE latency_seconds histogram"]
+    assert lines[2:] == [
+        'latency_seconds_bucket{model="base",le="0.1"} 1',
+        'latency_seconds_bucket{model="base",le="1.0"} 3',
+        'latency_seconds_bucket{model="base",le="+Inf"} 4',
+        'latency_seconds_sum{model="base"} 4.25',
+        'latency_seconds_count{model="base"} 4',
+    ]
+
+
+def test_label_values_are_escaped() -> None:
+    assert _labels(("backend",), ('a"b\\c\n',)) == '{backend="a\\"b\\\\c\\n"}'
+    assert _labels((), ()) == ""
+
+
+def test_worker_expositions_merge_by_family_mode() -> None:
+    worker_a = (
+        "# HELP requests_total Requests.\n# TYPE requests_total counter\n"
+        'requests_total{model="base"} 3\n'
+        "# HELP replica_up Up.\n# TYPE replica_up gauge\n"
+        'replica_up{backend="r0"} 1\n'
+    )
+    worker_b = worker_a.replace("} 3", "} 4").replace("} 1", "} 0")
+    merged = _merge_expositions([worker_a, worker_b], {"replica_up": "min"})
+    assert 'requests_total{model="base"} 7' in merged.splitlines()
+    assert 'replica_up{backend="r0"} 0' in merged.splitlines()
+    assert merged.count("# TYPE requests_total counter") == 1
+
+
+def test_metrics_endpoint_labels_requests_by_model_and_backend(make_gateway) -> None:
+    client = make_gateway()
+    client.post("/v1/chat/completions", json=chat())
+    client.post("/v1/chat/completions", json=chat())
+
+    text = client.get("/metrics").text
+    assert 'gateway_requests_total{model="base",backend="http://base",status="200"} 1' in text
+    assert 'gateway_requests_total{model="base",backend="cache",status="200"} 1' in text
+    assert 'gateway_cache_events_total{event="hits"} 1' in text
+    assert 'gateway_in_flight_requests{model="base"} 0' in text
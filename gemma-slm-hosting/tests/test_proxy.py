@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+from conftest import FakeVLLM, chat, post_then_leave, serve_gateway, until
+from fastapi.testclient import TestClient
+
+from gateway.main import app
+from gateway.proxy import CLIENT_CLOSED_REQUEST
+
+
+def test_stream_is_relayed_byte_for_byte(make_gateway, upstream: FakeVLLM) -> None:
+    client = make_gateway(GATEWAY_CACHE_ENABLED="0", GATEWAY_COALESCE_ENABLED="0")
+    payload = chat(stream=True, stream_options={"include_usage": True})
+    response = client.post("/v1/chat/completions", json=payload)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    # What the upstream sent, asked directly with the body the gateway forwarded.
+    with TestClient(FakeVLLM().app) as direct:
+        sent = direct.post("/v1/chat/completions", json=upstream.requests[0]).content
+    assert response.content == sent
+    assert response.content.endswith(b"data: [DONE]\n\n")
+
+
+def test_only_pool_headers_are_passed_either_way(make_gateway, upstream: FakeVLLM) -> None:
+    client = make_gateway(GATEWAY_CACHE_ENABLED="0", GATEWAY_COALESCE_ENABLED="0")
+    upstream.headers = {"cache-control": "no-store", "x-vllm-internal": "1"}
+    response = client.post(
+        "/v1/chat/completions",
+        json=chat(),
+        headers={"authorization": "Bearer k", "proxy-authorization": "Basic x", "te": "trailers"},
+    )
+    assert response.headers["cache-control"] == "no-store"
+    assert response.headers["content-type"] == "application/json"
+    assert "x-vllm-internal" not in response.headers
+
+    sent = upstream.received_headers[0]
+    assert sent["authorization"] == "Bearer k"
+    # Hop-by-hop headers stay on the client's hop.
+    assert "proxy-authorization" not in sent and "te" not in sent
+
+
+def test_upstream_error_status_and_body_pass_through(make_gateway, upstream: FakeVLLM) -> None:
+    client = make_gateway(GATEWAY_CACHE_ENABLED="0", GATEWAY_RETRIES="0")
+    upstream.status = 400
+    response = client.post("/v1/chat/completions", json=chat())
+    assert response.status_code == 400
+    assert response.json() == {"error": {"message": "boom"}}
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_client_disconnect_gives_499_and_cancels_upstream(
+    configure, upstream: FakeVLLM, stream: bool
+) -> None:
+    configure(GATEWAY_CACHE_ENABLED="0", GATEWAY_COALESCE_ENABLED="0")
+
+    async def scenario() -> tuple[list[dict], list[int]]:
+        upstream.gate = asyncio.Event()
+        leave = asyncio.Event()
+        async with serve_gateway(upstream):
+            request = asyncio.create_task(
+                post_then_leave(app, "/v1/chat/completions", chat(stream=stream), leave)
+            )
+            await until(lambda: len(upstream.requests) == 1)
+            leave.set()
+            sent = await asyncio.wait_for(request, 5)
+            pool = app.state.pools["base"]
+            held = [replica.in_flight + replica.tokens for replica in pool.replicas]
+            held.append(app.state.admission["base"].outstanding_seqs)
+            return sent, held
+
+    sent, held = asyncio.run(scenario())
+    assert sent[0]["type"] == "http.response.start"
+    assert sent[0]["status"] == CLIENT_CLOSED_REQUEST
+    assert upstream.cancelled == 1
+    # The replica slot and the admission budget were given back.
+    assert held == [0, 0]
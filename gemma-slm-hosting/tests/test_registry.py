@@ -0,0 +1,187 @@
+import asyncio
+import os
+from collections.abc import Callable
+from pathlib import Path
+
+import httpx
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from gateway.registry import ModelRegistry, SwapCoordinator, build_registry
+
+BASE = "google/gemma-3-1b-it"
+OLD = {"BASE_MODEL_ID": BASE, "ADAPTER_PATH": "/adapters/lora-old"}
+NEW = {"BASE_MODEL_ID": BASE, "ADAPTER_PATH": "/adapters/lora-new"}
+URLS = ["http://ft-0", "http://ft-1"]
+
+
+class LoraServers:
+    """FT vLLM servers with runtime LoRA updating, keyed by host."""
+
+    def __init__(self, hosts: list[str], loaded: list[str]) -> None:
+        self.models = {host: [BASE, *loaded] for host in hosts}
+        self.calls: list[tuple[str, str, str]] = []
+        self.failing_loads: set[str] = set()
+        self.on_unload: Callable[[], None] | None = None
+        self.app = Starlette(
+            routes=[
+                Route("/v1/models", self._list),
+                Route("/v1/load_lora_adapter", self._load, methods=["POST"]),
+                Route("/v1/unload_lora_adapter", self._unload, methods=["POST"]),
+            ]
+        )
+
+    async def _list(self, request: Request) -> Response:
+        models = self.models[request.url.hostname]
+        return JSONResponse({"object": "list", "data": [{"id": name} for name in models]})
+
+    async def _load(self, request: Request) -> Response:
+        host, name = request.url.hostname, (await request.json())["lora_name"]
+        self.calls.append(("load", host, name))
+        await asyncio.sleep(0.01)
+        if host in self.failing_loads:
+            return JSONResponse({"message": "out of memory"}, status_code=500)
+        if name in self.models[host]:
+            message = f"The lora adapter '{name}' has already been loaded."
+            return JSONResponse({"message": message}, status_code=400)
+        self.models[host].append(name)
+        return Response("Success")
+
+    async def _unload(self, request: Request) -> Response:
+        host, name = request.url.hostname, (await request.json())["lora_name"]
+        self.calls.append(("unload", host, name))
+        if self.on_unload is not None:
+            self.on_unload()
+        if name not in self.models[host]:
+            return JSONResponse({"message": f"{name} not found"}, status_code=404)
+        self.models[host].remove(name)
+        return Response("Success")
+
+
+def _registry(pointer: dict[str, str], coordinator: SwapCoordinator) -> ModelRegistry:
+    upstream = "ft:lora-old" if pointer is OLD else None
+    return ModelRegistry(build_registry(pointer, BASE, "ft", ft_upstream=upstream), coordinator)
+
+
+def _workers(tmp_path: Path) -> list[ModelRegistry]:
+    # Two workers of one gateway; the parent's pid stands in for the second one.
+    workers = []
+    for pid in (os.getpid(), os.getppid()):
+        registry = _registry(OLD, SwapCoordinator(tmp_path, pid=pid))
+        registry.coordinator.publish(["ft:lora-old"])
+        workers.append(registry)
+    return workers
+
+
+def _swap(registry: ModelRegistry, client: httpx.AsyncClient, timeout_s: float = 5.0):
+    return registry.hot_swap_adapter(client, URLS, NEW, BASE, "ft", drain_timeout_s=timeout_s)
+
+
+def test_only_one_worker_loads_and_unloads(tmp_path: Path) -> None:
+    servers = LoraServers(["ft-0", "ft-1"], ["ft:lora-old"])
+    workers = _workers(tmp_path)
+    routes_at_unload = []
+    servers.on_unload = lambda: routes_at_unload.append(
+        [worker.current.routes["ft"].upstream for worker in workers]
+    )
+
+    async def scenario() -> list[bool]:
+        transport = httpx.ASGITransport(servers.app)
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await asyncio.gather(*(_swap(worker, client) for worker in workers))
+
+    assert asyncio.run(scenario()) == [True, True]
+    for host in ("ft-0", "ft-1"):
+        assert servers.models[host] == [BASE, "ft:lora-new"]
+    assert sorted(call[0] for call in servers.calls) == ["load"] * 2 + ["unload"] * 2
+    # Every worker had moved to the new adapter before the old one went away.
+    assert routes_at_unload == [["ft:lora-new", "ft:lora-new"]] * 2
+    for worker in workers:
+        assert worker.current.resolve("ft").upstream == "ft:lora-new"
+        assert worker.current.resolve("ft:lora-new") is not None
+        worker.coordinator.close()
+
+
+def test_already_loaded_counts_as_loaded(tmp_path: Path) -> None:
+    servers = LoraServers(["ft-0", "ft-1"], ["ft:lora-old", "ft:lora-new"])
+    registry = _registry(OLD, SwapCoordinator(None))
+
+    async def scenario() -> bool:
+        transport = httpx.ASGITransport(servers.app)
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await _swap(registry, client)
+
+    assert asyncio.run(scenario())
+    assert registry.current.resolve("ft").upstream == "ft:lora-new"
+    for host in ("ft-0", "ft-1"):
+        assert servers.models[host] == [BASE, "ft:lora-new"]
+
+
+def test_failed_load_rolls_back_only_what_it_loaded(tmp_path: Path) -> None:
+    servers = LoraServers(["ft-0", "ft-1"], ["ft:lora-old"])
+    servers.failing_loads = {"ft-1"}
+    workers = _workers(tmp_path)
+
+    async def scenario() -> list[bool]:
+        transport = httpx.ASGITransport(servers.app)
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await asyncio.gather(*(_swap(w, client, timeout_s=0.5) for w in workers))
+
+    assert asyncio.run(scenario()) == [False, False]
+    assert ("unload", "ft-0", "ft:lora-new") in servers.calls
+    assert ("unload", "ft-1", "ft:lora-new") not in servers.calls
+    for host in ("ft-0", "ft-1"):
+        assert servers.models[host] == [BASE, "ft:lora-old"]
+    for worker in workers:
+        assert worker.current.resolve("ft").upstream == "ft:lora-old"
+        worker.coordinator.close()
+
+
+def test_leader_waits_for_requests_in_flight_on_other_workers(tmp_path: Path) -> None:
+    servers = LoraServers(["ft-0", "ft-1"], ["ft:lora-old"])
+    leader, follower = _workers(tmp_path)
+    follower.begin("ft:lora-old")
+    unloaded_while_busy = []
+    servers.on_unload = lambda: unloaded_while_busy.append("ft:lora-old" in follower._in_flight)
+
+    async def scenario() -> None:
+        transport = httpx.ASGITransport(servers.app)
+        async with httpx.AsyncClient(transport=transport) as client:
+            swaps = asyncio.gather(_swap(leader, client), _swap(follower, client))
+            await asyncio.sleep(0.5)
+            assert not any(call[0] == "unload" for call in servers.calls)
+            follower.end("ft:lora-old")
+            await swaps
+
+    asyncio.run(scenario())
+    assert unloaded_while_busy == [False, False]
+    leader.coordinator.close()
+    follower.coordinator.close()
+
+
+def test_lock_elects_a_single_leader_until_it_closes(tmp_path: Path) -> None:
+    first = SwapCoordinator(tmp_path, pid=1)
+    second = SwapCoordinator(tmp_path, pid=2)
+    assert first.is_leader()
+    assert not second.is_leader()
+    assert first.is_leader()
+    first.close()
+    assert second.is_leader()
+    second.close()
+
+
+def test_restarted_worker_resumes_on_the_live_adapter() -> None:
+    servers = LoraServers(["ft-0", "ft-1"], ["ft:lora-new"])
+    # Built from the pointer alone: routes ft to the name the servers started with.
+    registry = ModelRegistry(build_registry(NEW, BASE, "ft"))
+    assert registry.current.resolve("ft").upstream == "ft"
+
+    async def scenario() -> bool:
+        transport = httpx.ASGITransport(servers.app)
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await registry.resume(client, URLS, BASE, "ft")
+
+    assert asyncio.run(scenario())
+    assert registry.current.resolve("ft").upstream == "ft:lora-new"
@@ -0,0 +1,103 @@
+import math
+from collections import Counter
+
+import pytest
+
+from gateway.routing import ReplicaPool, render_prefix
+
+URLS = [f"http://replica-{idx}" for idx in range(4)]
+
+
+def test_same_prefix_lands_on_the_same_replica() -> None:
+    pool = ReplicaPool(URLS, policy="prefix")
+    first = pool.acquire("system prompt A")
+    pool.release(first)
+    for _ in range(20):
+        replica = pool.acquire("system prompt A")
+        pool.release(replica)
+        assert replica is first
+    assert first.warm == 20
+    assert first.cold == 1
+
+
+def test_distinct_prefixes_spread_over_the_ring() -> None:
+    pool = ReplicaPool(URLS, policy="prefix", vnodes=64)
+    owners = Counter()
+    for idx in range(2000):
+        replica = pool.acquire(f"prefix {idx}")
+        pool.release(replica)
+        owners[replica.url] += 1
+    assert set(owners) == set(URLS)
+    # 64 virtual nodes keep every replica within a factor of two of a fair share.
+    assert min(owners.values()) > 2000 / len(URLS) / 2
+
+
+def test_hot_prefix_spills_once_its_owner_is_at_capacity() -> None:
+    load_factor = 1.25
+    pool = ReplicaPool(URLS, policy="prefix", load_factor=load_factor)
+    held = [pool.acquire("hot prefix") for _ in range(40)]
+    counts = Counter(replica.url for replica in held)
+
+    owner = held[0]
+    assert counts[owner.url] < len(held)
+    assert sum(replica.spilled for replica in pool.replicas) == len(held) - counts[owner.url]
+    # No replica went past the bound in force when it took its last request.
+    assert max(counts.values()) <= math.ceil(load_factor * len(held) / len(URLS))
+
+
+def test_released_load_brings_the_prefix_home() -> None:
+    pool = ReplicaPool(URLS, policy="prefix")
+    held = [pool.acquire("hot prefix") for _ in range(20)]
+    owner = held[0]
+    for replica in held:
+        pool.release(replica)
+    assert pool.acquire("hot prefix") is owner
+
+
+def test_excluded_replicas_are_skipped() -> None:
+    pool = ReplicaPool(URLS, policy="prefix")
+    owner = pool.acquire("prefix")
+    pool.release(owner)
+    retry = pool.acquire("prefix", exclude=[owner])
+    assert retry is not owner
+    # Failover, not bounded-load spill.
+    assert retry.spilled == 0
+
+
+def test_unavailable_owner_is_failover_not_spill() -> None:
+    pool = ReplicaPool(URLS, policy="prefix")
+    owner = pool.acquire("prefix")
+    pool.release(owner)
+    owner.healthy = False
+    moved = [pool.acquire("prefix") for _ in range(6)]
+    assert owner not in moved
+    assert len(set(map(id, moved))) > 1
+    assert sum(replica.spilled for replica in pool.replicas) == 0
+
+
+def test_tokens_are_counted_until_release() -> None:
+    pool = ReplicaPool(URLS[:2], policy="least_tokens")
+    big = pool.acquire(tokens=1000)
+    small = pool.acquire(tokens=10)
+    assert small is not big
+    # The next request goes to the replica holding fewer tokens.
+    assert pool.acquire(tokens=10) is small
+    pool.release(big, 1000)
+    assert big.tokens == 0 and big.in_flight == 0
+
+
+def test_unknown_policy_is_rejected() -> None:
+    with pytest.raises(ValueError, match="Unknown routing policy"):
+        ReplicaPool(URLS, policy="fastest")
+
+
+def test_render_prefix_renders_roles_and_truncates() -> None:
+    payload = {
+        "messages": [
+            {"role": "system", "content": "Be brief."},
+            {"role": "user", "content": [{"type": "text", "text": "Hi"}, {"type": "image_url"}]},
+        ]
+    }
+    assert render_prefix(payload, 100) == "<system>Be brief.\n<user>Hi\n"
+    assert render_prefix(payload, 8) == "<system>"
+    assert render_prefix({"prompt": ["Once upon"]}, 4) == "Once"
@@ -0,0 +1,138 @@
+import asyncio
+
+import httpx
+import pytest
+from conftest import post_then_leave
+from fastapi.testclient import TestClient
+from sim_vllm import Engine, EngineConfig, Sequence, Stats, create_app
+
+
+def _engine(**config) -> Engine:
+    return Engine(EngineConfig(**config), Stats())
+
+
+def _sim(**config) -> TestClient:
+    app = create_app(
+        ["base"],
+        tokens=4,
+        latency_ms=0,
+        token_delay_ms=0,
+        engine_config=EngineConfig(decode_ms=1, **config),
+    )
+    return TestClient(app)
+
+
+def _metric(text: str, name: str) -> float:
+    """The value of the first ``name`` sample in a ``/metrics`` scrape."""
+    for line in text.splitlines():
+        if line.startswith(name):
+            return float(line.rsplit(" ", 1)[1])
+    raise KeyError(name)
+
+
+def test_at_most_max_num_seqs_run_and_the_rest_wait() -> None:
+    engine = _engine(max_num_seqs=2)
+    seqs = [Sequence(prompt_tokens=4, max_tokens=2, arrival=0.0) for _ in range(3)]
+    for seq in seqs:
+        engine.submit(seq)
+    engine._schedule(1.0)
+    assert engine.running == seqs[:2]
+    assert list(engine.waiting) == seqs[2:]
+    assert seqs[2].scheduled_at == 0.0
+
+    # A finished sequence's slot goes to the head of the queue.
+    engine.running = seqs[1:2]
+    engine._schedule(2.0)
+    assert engine.running == seqs[1:]
+    assert seqs[2].scheduled_at == 2.0
+
+
+def test_prefill_is_chunked_to_the_token_budget_after_decodes() -> None:
+    engine = _engine(max_num_batched_tokens=10)
+    decoding = Sequence(prompt_tokens=4, max_tokens=8, arrival=0.0, prefilled=4, generated=1)
+    engine.running.append(decoding)
+    first, second = Sequence(8, 4, 0.0), Sequence(8, 4, 0.0)
+    engine.submit(first)
+    engine.submit(second)
+
+    decodes, prefills = engine._schedule(0.0)
+    # One token for the decode leaves nine: all of the first prompt, one of the second.
+    assert decodes == [decoding]
+    assert prefills == [(first, 8), (second, 1)]
+
+    first.prefilled, second.prefilled = 8, 1
+    decodes, prefills = engine._schedule(0.0)
+    assert decodes == [decoding, first]
+    assert prefills == [(second, 7)]
+
+
+def test_prompt_over_the_context_length_is_rejected() -> None:
+    with _sim(max_model_len=64) as sim:
+        # 200 characters are 50 tokens; 14 more still fit.
+        body = {"model": "base", "prompt": "x" * 200}
+        assert sim.post("/v1/completions", json={**body, "max_tokens": 14}).status_code == 200
+        response = sim.post("/v1/completions", json={**body, "max_tokens": 15})
+    assert response.status_code == 400
+    assert "maximum context length is 64 tokens" in response.json()["message"]
+    assert "you requested 65 tokens" in response.json()["message"]
+
+
+def test_repeated_prompt_prefix_is_counted_as_cache_hits() -> None:
+    # 330 characters: 82 tokens, five full 16-token blocks.
+    body = {"model": "base", "prompt": "".join(f"{i:03d} " for i in range(83))[:330]}
+    with _sim(prefix_cache_blocks=100) as sim:
+        sim.post("/v1/completions", json=body)
+        first = sim.get("/metrics").text
+        sim.post("/v1/completions", json=body)
+        second = sim.get("/metrics").text
+    assert _metric(first, "vllm:prefix_cache_hits_total") == 0
+    assert _metric(second, "vllm:prefix_cache_queries_total") == 2 * 82
+    assert _metric(second, "vllm:prefix_cache_hits_total") == 5 * 16
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_disconnect_aborts_and_frees_the_slot(stream: bool) -> None:
+    app = create_app(
+        ["base"],
+        tokens=100_000,
+        latency_ms=0,
+        token_delay_ms=0,
+        engine_config=EngineConfig(max_num_seqs=1, max_model_len=200_000, decode_ms=1),
+    )
+
+    async def scenario() -> tuple[list[dict], int, str]:
+        leave = asyncio.Event()
+        transport = httpx.ASGITransport(app)
+        async with (
+            app.router.lifespan_context(app),
+            httpx.AsyncClient(transport=transport, base_url="http://sim") as client,
+        ):
+
+            async def started() -> None:
+                while _metric((await client.get("/metrics")).text, "vllm:num_requests_running") < 1:
+                    await asyncio.sleep(0.005)
+
+            body = {"model": "base", "prompt": "hello", "stream": stream}
+            hogging = asyncio.create_task(post_then_leave(app, "/v1/completions", body, leave))
+            await asyncio.wait_for(started(), 5)
+            # The only slot is taken, so this one waits until the first client leaves.
+            waiting = asyncio.create_task(
+                client.post(
+                    "/v1/completions", json={"model": "base", "prompt": "hi", "max_tokens": 2}
+                )
+            )
+            await asyncio.sleep(0.05)
+            assert not waiting.done()
+            leave.set()
+            sent = await asyncio.wait_for(hogging, 5)
+            response = await asyncio.wait_for(waiting, 5)
+            return sent, response.status_code, (await client.get("/metrics")).text
+
+    sent, status, metrics = asyncio.run(scenario())
+    if not stream:
+        assert sent[0]["status"] == 499
+    assert status == 200
+    finished = 'vllm:request_success_total{model_name="base",finished_reason="%s"}'
+    assert _metric(metrics, finished % "abort") == 1
+    assert _metric(metrics, finished % "length") == 1
+    assert _metric(metrics, "vllm:num_requests_running") == 0
@@ -0,0 +1,166 @@
+import time
+from pathlib import Path
+
+import pytest
+from conftest import FakeVLLM, chat
+
+from gateway.admission import estimate_prompt_tokens
+from gateway.main import app
+from gateway.tokens import PromptCounter, load_tokenizer
+
+tokenizers = pytest.importorskip("tokenizers")
+
+MAX_MODEL_LEN = 64
+# A chat request is 4 tokens of template, 5 per message, plus its words.
+CHAT_OVERHEAD = 4 + 5
+
+
+def _words(count: int) -> str:
+    return " ".join(["word"] * count)
+
+
+@pytest.fixture
+def tokenizer_path(tmp_path: Path) -> Path:
+    """A word-level tokenizer.json: one token per whitespace-separated word."""
+    tokenizer = tokenizers.Tokenizer(tokenizers.models.WordLevel({"[UNK]": 0}, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = tokenizers.pre_tokenizers.WhitespaceSplit()
+    path = tmp_path / "tokenizer.json"
+    tokenizer.save(str(path))
+    return path
+
+
+@pytest.fixture
+def counted_gateway(make_gateway, tokenizer_path: Path):
+    """The gateway with ``MAX_MODEL_LEN=64``, once its tokenizer has loaded."""
+
+    def start(policy: str = "clamp"):
+        client = make_gateway(
+            GATEWAY_MAX_TOKENS_POLICY=policy,
+            GATEWAY_TOKENIZER=str(tokenizer_path),
+            MAX_MODEL_LEN=str(MAX_MODEL_LEN),
+            GATEWAY_CACHE_ENABLED="0",
+            GATEWAY_COALESCE_ENABLED="0",
+        )
+        deadline = time.monotonic() + 5
+        while policy != "off" and not app.state.tokens.exact:
+            assert time.monotonic() < deadline, "tokenizer did not load"
+            time.sleep(0.01)
+        return client
+
+    return start
+
+
+def test_counts_chat_turns_and_caches_message_text(tokenizer_path: Path) -> None:
+    counter = PromptCounter()
+    payload = chat(_words(10))
+    assert counter.count(payload) == [estimate_prompt_tokens(payload)]
+    counter.tokenizer = load_tokenizer(str(tokenizer_path))
+    assert counter.count(payload) == [CHAT_OVERHEAD + 10]
+    assert counter.count(payload) == [CHAT_OVERHEAD + 10]
+    assert (counter.stats.misses, counter.stats.hits) == (1, 1)
+
+
+def test_batched_prompts_are_counted_one_by_one(tokenizer_path: Path) -> None:
+    counter = PromptCounter()
+    counter.tokenizer = load_tokenizer(str(tokenizer_path))
+    # A string gets a BOS token; token id lists are counted as they are.
+    assert counter.count({"prompt": [_words(3), _words(40), [1, 2, 3, 4]]}) == [4, 41, 4]
+    assert counter.count({"prompt": [5, 6, 7]}) == [3]
+
+
+def test_clamp_rewrites_max_tokens_and_says_so(counted_gateway, upstream: FakeVLLM) -> None:
+    client = counted_gateway("clamp")
+    response = client.post("/v1/chat/completions", json=chat(_words(21), max_tokens=100))
+    room = MAX_MODEL_LEN - (CHAT_OVERHEAD + 21)
+    assert response.status_code == 200
+    assert response.headers["x-gateway-max-tokens"] == str(room)
+    assert upstream.requests[0]["max_tokens"] == room
+    assert app.state.tokens.stats.clamped == 1
+
+    # A budget that fits is left alone.
+    response = client.post("/v1/chat/completions", json=chat(_words(21), max_tokens=room))
+    assert "x-gateway-max-tokens" not in response.headers
+    assert upstream.requests[1]["max_tokens"] == room
+
+
+def test_reject_answers_400_without_calling_upstream(counted_gateway, upstream: FakeVLLM) -> None:
+    client = counted_gateway("reject")
+    response = client.post("/v1/chat/completions", json=chat(_words(21), max_tokens=100))
+    assert response.status_code == 400
+    assert "maximum context length is 64 tokens" in response.json()["error"]["message"]
+    assert upstream.requests == []
+    assert app.state.tokens.stats.rejected == 1
+
+
+def test_off_forwards_max_tokens_untouched(counted_gateway, upstream: FakeVLLM) -> None:
+    client = counted_gateway("off")
+    response = client.post("/v1/chat/completions", json=chat(_words(200), max_tokens=100))
+    assert response.status_code == 200
+    assert "x-gateway-max-tokens" not in response.headers
+    assert upstream.requests[0]["max_tokens"] == 100
+    assert app.state.tokens is None
+
+
+@pytest.mark.parametrize(
+    ("words", "status"),
+    [(MAX_MODEL_LEN - CHAT_OVERHEAD - 1, 200), (MAX_MODEL_LEN - CHAT_OVERHEAD, 400)],
+)
+def test_prompt_at_the_context_length_is_rejected_even_when_clamping(
+    counted_gateway, upstream: FakeVLLM, words: int, status: int
+) -> None:
+    client = counted_gateway("clamp")
+    response = client.post("/v1/chat/completions", json=chat(_words(words), max_tokens=10))
+    assert response.status_code == status
+    if status == 200:
+        # One token of room left.
+        assert upstream.requests[0]["max_tokens"] == 1
+    else:
+        assert upstream.requests == []
+
+
+def test_batched_completion_prompts_are_checked_one_by_one(
+    counted_gateway, upstream: FakeVLLM
+) -> None:
+    client = counted_gateway("clamp")
+    body = {"model": "base", "prompt": [_words(10), _words(40)], "max_tokens": 30}
+    response = client.post("/v1/completions", json=body)
+    # The longest prompt (41 tokens with BOS) sets the room, not the sum of both.
+    assert response.headers["x-gateway-max-tokens"] == str(MAX_MODEL_LEN - 41)
+    assert upstream.requests[0]["max_tokens"] == MAX_MODEL_LEN - 41
+
+
+def test_max_completion_tokens_is_the_budget_over_max_tokens(
+    counted_gateway, upstream: FakeVLLM
+) -> None:
+    client = counted_gateway("clamp")
+    room = MAX_MODEL_LEN - (CHAT_OVERHEAD + 21)
+    client.post(
+        "/v1/chat/completions",
+        json=chat(_words(21), max_completion_tokens=100, max_tokens=5),
+    )
+    assert upstream.requests[0]["max_completion_tokens"] == room
+    assert upstream.requests[0]["max_tokens"] == 5
+
+    response = client.post(
+        "/v1/chat/completions",
+        json=chat(_words(21), max_completion_tokens=5, max_tokens=100),
+    )
+    assert "x-gateway-max-tokens" not in response.headers
+    assert upstream.requests[1]["max_tokens"] == 100
+
+
+def test_estimates_never_reject_or_clamp(make_gateway, upstream: FakeVLLM, tmp_path: Path) -> None:
+    broken = tmp_path / "broken" / "tokenizer.json"
+    broken.parent.mkdir()
+    broken.write_text("not a tokenizer")
+    client = make_gateway(
+        GATEWAY_MAX_TOKENS_POLICY="reject",
+        GATEWAY_TOKENIZER=str(broken),
+        MAX_MODEL_LEN=str(MAX_MODEL_LEN),
+    )
+    response = client.post("/v1/chat/completions", json=chat(_words(500), max_tokens=100))
+    assert response.status_code == 200
+    assert upstream.requests[0]["max_tokens"] == 100
+    stats = client.get("/gateway/stats").json()["prompt_tokens"]
+    assert stats["exact"] is False
+    assert stats["rejected"] == 0
@@ -0,0 +1,153 @@
+import pytest
+from conftest import FakeVLLM, chat
+
+from gateway.main import app
+from gateway.tracing import RequestTrace, Tracing, parse_traceparent
+
+pytest.importorskip("opentelemetry.sdk")
+
+TRACE_ID = 0x4BF92F3577B34DA6A3CE929D0E0E4736
+PARENT_ID = 0x00F067AA0BA902B7
+SAMPLED = f"00-{TRACE_ID:032x}-{PARENT_ID:016x}-01"
+UNSAMPLED = f"00-{TRACE_ID:032x}-{PARENT_ID:016x}-00"
+
+
+class Collector:
+    """Span processor that keeps what it is given."""
+
+    def __init__(self) -> None:
+        self.spans: list = []
+
+    def on_end(self, span) -> None:
+        self.spans.append(span)
+
+    def shutdown(self) -> None:
+        pass
+
+
+def _tracing(sample_ratio: float) -> Tracing:
+    return Tracing(Collector(), sample_ratio, slow_s=30.0, slow_first_byte_s=2.0)
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        (SAMPLED, (TRACE_ID, PARENT_ID, True)),
+        (UNSAMPLED, (TRACE_ID, PARENT_ID, False)),
+        # Only bit 0 of the flags means sampled; unknown flags are ignored.
+        (SAMPLED[:-2] + "03", (TRACE_ID, PARENT_ID, True)),
+        (SAMPLED[:-2] + "02", (TRACE_ID, PARENT_ID, False)),
+        (f"  {SAMPLED}-future-field ", (TRACE_ID, PARENT_ID, True)),
+    ],
+)
+def test_parse_traceparent(header: str, expected: tuple) -> None:
+    assert parse_traceparent(header) == expected
+
+
+@pytest.mark.parametrize(
+    "header",
+    [
+        None,
+        "",
+        "garbage",
+        f"00-{TRACE_ID:032x}-{PARENT_ID:016x}",
+        SAMPLED.replace(f"{TRACE_ID:032x}", f"{TRACE_ID:032x}"[1:]),
+        SAMPLED.replace(f"{PARENT_ID:016x}", f"{PARENT_ID:016x}0"),
+        SAMPLED[:-2] + "zz",
+        f"00-{'g' * 32}-{PARENT_ID:016x}-01",
+        f"00-{0:032x}-{PARENT_ID:016x}-01",
+        f"00-{TRACE_ID:032x}-{0:016x}-01",
+    ],
+)
+def test_parse_traceparent_rejects_malformed_headers(header: str | None) -> None:
+    assert parse_traceparent(header) is None
+
+
+def test_head_sampling_follows_the_parent_flag() -> None:
+    keep_all, keep_none = _tracing(1.0), _tracing(0.0)
+    assert keep_all.start(None).sampled
+    assert not keep_none.start(None).sampled
+    # The caller chose not to record this trace: no dice roll overrides it.
+    unsampled = keep_all.start(UNSAMPLED)
+    assert not unsampled.sampled
+    assert (unsampled.trace_id, unsampled.parent_id) == (TRACE_ID, PARENT_ID)
+    assert keep_none.start(SAMPLED).sampled
+    # A malformed header starts a fresh trace.
+    fresh = keep_none.start("garbage")
+    assert fresh.parent_id is None and fresh.trace_id != TRACE_ID
+
+
+def _decision(trace: RequestTrace) -> str:
+    tracing = _tracing(0.0)
+    tracing.finish(trace)
+    decisions = {name: count for name, count in vars(tracing.stats).items() if name != "started"}
+    return next(name for name, count in decisions.items() if count)
+
+
+def test_tail_rules_keep_failed_and_slow_unsampled_traces() -> None:
+    tracing = _tracing(0.0)
+    assert _decision(tracing.start(UNSAMPLED)) == "dropped"
+    assert _decision(tracing.start(SAMPLED)) == "kept_head"
+
+    failed = tracing.start(UNSAMPLED)
+    failed.status = 503
+    assert _decision(failed) == "kept_error"
+    errored = tracing.start(None)
+    errored.error = "ConnectError"
+    assert _decision(errored) == "kept_error"
+
+    slow = tracing.start(None)
+    slow.start -= 31 * 10**9
+    assert _decision(slow) == "kept_slow"
+    slow_first_byte = tracing.start(None)
+    slow_first_byte.first = slow_first_byte.start + 3 * 10**9
+    assert _decision(slow_first_byte) == "kept_slow"
+
+
+def _traced_gateway(make_gateway) -> tuple:
+    client = make_gateway(
+        GATEWAY_TRACING_ENABLED="1", GATEWAY_CACHE_ENABLED="0", GATEWAY_COALESCE_ENABLED="0"
+    )
+    tracing: Tracing = app.state.tracing
+    # Keep spans in memory instead of exporting them over OTLP.
+    exporting, tracing.processor = tracing.processor, Collector()
+    exporting.shutdown()
+    return client, tracing
+
+
+def test_upstream_traceparent_continues_the_callers_trace(make_gateway, upstream: FakeVLLM) -> None:
+    client, tracing = _traced_gateway(make_gateway)
+    response = client.post("/v1/chat/completions", json=chat(), headers={"traceparent": SAMPLED})
+    assert response.status_code == 200
+
+    sent = parse_traceparent(upstream.received_headers[0]["traceparent"])
+    assert sent is not None
+    trace_id, upstream_parent, sampled = sent
+    assert (trace_id, sampled) == (TRACE_ID, True)
+    spans = {span.name: span for span in tracing.processor.spans}
+    # vLLM's spans hang off the gateway's span for that attempt.
+    assert spans["upstream"].context.span_id == upstream_parent
+    assert spans["gateway.request"].parent.span_id == PARENT_ID
+    assert spans["upstream"].parent.span_id == spans["gateway.request"].context.span_id
+    assert {span.context.trace_id for span in spans.values()} == {TRACE_ID}
+
+
+def test_unsampled_caller_is_not_exported(make_gateway, upstream: FakeVLLM) -> None:
+    client, tracing = _traced_gateway(make_gateway)
+    tracing.sample_ratio = 1.0
+    client.post("/v1/chat/completions", json=chat(), headers={"traceparent": UNSAMPLED})
+
+    assert upstream.received_headers[0]["traceparent"].endswith("-00")
+    assert tracing.processor.spans == []
+    assert tracing.stats.dropped == 1
+
+
+def test_untraced_request_starts_a_trace_upstream(make_gateway, upstream: FakeVLLM) -> None:
+    client, tracing = _traced_gateway(make_gateway)
+    tracing.sample_ratio = 1.0
+    client.post("/v1/chat/completions", json=chat())
+
+    trace_id, _, sampled = parse_traceparent(upstream.received_headers[0]["traceparent"])
+    assert sampled
+    assert trace_id != TRACE_ID
+    assert {span.context.trace_id for span in tracing.processor.spans} == {trace_id}